@@ -0,0 +1,86 @@
+import threading
+import time
+import zlib
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+END_DATE = pd.Timestamp("2025-06-30")
+SOURCES = ("news", "reddit_wallstreetbets", "reddit_stocks", "reddit_investing")
+WORDS = ("stock", "price", "earnings", "beat", "miss", "guidance", "bullish", "bearish", "calls", "puts",
+         "revenue", "margin", "buyback", "downgrade", "upgrade", "rally", "selloff", "dividend", "invest", "moon")
+
+
+def synthetic_ohlc(days: int, end: pd.Timestamp = END_DATE, seed: int = 0) -> pd.DataFrame:
+    """
+    Daily OHLCV bars following a geometric random walk, ending at end.
+
+    Args:
+        days (int): Number of calendar days (bars are generated for every day, as
+            compute_indicators_on_date_range walks calendar days).
+        end (pd.Timestamp): Last bar. Default: END_DATE.
+        seed (int): Random seed. Default: 0.
+
+    Returns:
+        pd.DataFrame: Columns Open, High, Low, Close, Volume on a tz-naive DatetimeIndex.
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, days)))
+    open_ = close * (1 + rng.normal(0, 0.005, days))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.01, days))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.01, days))
+    volume = rng.integers(1_000_000, 50_000_000, days).astype(float)
+    index = pd.date_range(end=end, periods=days, freq="D", name="Date")
+    return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume}, index=index)
+
+
+def synthetic_corpus(size: int, ticker: str = "NVDA", duplicate_share: float = 0.2, seed: int = 0) -> pd.DataFrame:
+    """
+    Reddit/news-like documents in the format of SentimentFetcher.fetch_sentiment_data.
+
+    Some texts carry URLs and extra whitespace (work for the cleaner), a few are
+    URL-only (dropped by the cleaner) and duplicate_share of them repeat an
+    earlier text (cross-posts, deduplicated by the analyzer).
+    """
+    rng = np.random.default_rng(seed)
+    texts = []
+    for i in range(size):
+        if texts and rng.random() < duplicate_share:
+            texts.append(texts[rng.integers(len(texts))])
+            continue
+        words = " ".join(rng.choice(WORDS, rng.integers(5, 40)))
+        if i % 50 == 0:
+            texts.append(f"https://example.com/{i}")
+        elif i % 3 == 0:
+            texts.append(f"${ticker} {words}   see https://example.com/post/{i} \n {words}")
+        else:
+            texts.append(f"{ticker} {words}")
+    timestamps = END_DATE - pd.to_timedelta(rng.integers(0, 7 * 24 * 3600, size), unit="s")
+    return pd.DataFrame({
+        'timestamp': timestamps.tz_localize("UTC"),
+        'text': texts,
+        'source': rng.choice(SOURCES, size),
+        'ticker': ticker,
+    })
+
+
+class FakeOpenAI:
+    """
+    Offline stand-in for openai.OpenAI: client.chat.completions.create(...)
+    returns a deterministic score for the prompt after latency seconds.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model: str, messages: list, **kwargs):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        score = zlib.crc32(messages[-1]['content'].encode("utf-8")) % 201 - 100
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=str(score)))])
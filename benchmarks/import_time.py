@@ -0,0 +1,79 @@
+import argparse
+import os
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Budget di avvio (ms, import cumulativo del modulo) e librerie che non devono essere importate all'avvio
+IMPORT_BUDGETS_MS = {
+    "main": 1200,
+    "run_backtest": 900,
+    "run_portfolio_backtest": 900,
+    "run_precompute": 900,
+}
+LAZY_MODULES = ("openai", "praw", "yfinance", "matplotlib", "requests")
+
+
+def parse_importtime(stderr: str) -> dict:
+    """
+    Parse `python -X importtime` output.
+
+    Returns:
+        dict: Module name -> cumulative import time in microseconds.
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.setdefault(name.strip(), int(cumulative))
+    return modules
+
+
+def measure(entry_point: str) -> dict:
+    """Import entry_point in a fresh interpreter and return its parsed importtime output."""
+    env = dict(os.environ, HTA_WARM_UP="0", PYTHONPATH=PROJECT_ROOT)
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {entry_point}"],
+                               cwd=PROJECT_ROOT, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {entry_point} failed:\n{completed.stderr[-2000:]}")
+    return parse_importtime(completed.stderr)
+
+
+def check(entry_points: list, repeat: int = 3) -> bool:
+    """
+    Measure each entry point (best of repeat runs) against its budget.
+
+    Returns:
+        bool: True if every entry point is within budget and imports none of LAZY_MODULES.
+    """
+    ok = True
+    print(f"{'entry point':<26}{'import ms':>10}{'budget ms':>11}  status")
+    for entry_point in entry_points:
+        runs = [measure(entry_point) for _ in range(repeat)]
+        elapsed_ms = min(run[entry_point] for run in runs) / 1000
+        budget_ms = IMPORT_BUDGETS_MS[entry_point]
+        eager = sorted({name.split(".")[0] for name in runs[0]} & set(LAZY_MODULES))
+
+        status = "ok"
+        if elapsed_ms > budget_ms:
+            status = "OVER BUDGET"
+        if eager:
+            status = f"{status if status != 'ok' else 'FAIL'} (imports {', '.join(eager)} at startup)"
+        ok = ok and status == "ok"
+        print(f"{entry_point:<26}{elapsed_ms:>10.0f}{budget_ms:>11}  {status}")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fail when an entry point exceeds its import-time budget")
+    parser.add_argument("entry_points", nargs="*", default=list(IMPORT_BUDGETS_MS),
+                        help="modules to check (default: all with a budget)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per entry point; the fastest counts")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.entry_points if name not in IMPORT_BUDGETS_MS]
+    if unknown:
+        parser.error(f"no budget for {unknown}; add it to IMPORT_BUDGETS_MS")
+    sys.exit(0 if check(args.entry_points, args.repeat) else 1)
@@ -0,0 +1,369 @@
+import argparse
+import copy
+import importlib.util
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+import yaml
+
+from benchmarks.stub_providers import PROVIDERS, ProviderProfile, StandIns
+from config.settings_loader import DEFAULT_SETTINGS_PATH
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+WORKER_MODELS = ("werkzeug", "sync", "gthread")
+WORKER_HEADER = "X-HTA-Worker"
+# Universo di ticker in ordine di popolarità: la distribuzione Zipf concentra il traffico sui primi
+TICKERS = ("NVDA", "AAPL", "TSLA", "MSFT", "AMZN", "META", "GOOGL", "AMD", "PLTR", "NFLX",
+           "AVGO", "SMCI", "COIN", "INTC", "BA", "JPM", "DIS", "UBER", "SHOP", "SOFI",
+           "MU", "ORCL", "CRM", "PYPL", "BABA", "NIO", "F", "T", "KO", "XOM")
+SAMPLE_LINE = re.compile(r"^(\w+)(\{.*\})? (\S+)$")
+LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def zipf_tickers(count: int, tickers: tuple = TICKERS, exponent: float = 1.1, seed: int = 0) -> list:
+    """count tickers drawn from a Zipf distribution over tickers (most popular first)."""
+    weights = [1 / rank ** exponent for rank in range(1, len(tickers) + 1)]
+    return random.Random(seed).choices(tickers, weights=weights, k=count)
+
+
+def parse_metrics(text: str) -> dict:
+    """Prometheus text format -> {(name, ((label, value), ...)): value}."""
+    samples = {}
+    for line in text.splitlines():
+        match = SAMPLE_LINE.match(line)
+        if not match or line.startswith("#"):
+            continue
+        name, labels, value = match.groups()
+        samples[(name, tuple(LABEL.findall(labels or "")))] = float(value)
+    return samples
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class AppProcess:
+    """The app (benchmarks.loadtest_app) in a subprocess, under the chosen worker model."""
+
+    def __init__(self, settings_path: str, worker_model: str = "werkzeug", workers: int = 1, threads: int = 8):
+        self.worker_model = worker_model
+        self.workers = 1 if worker_model == "werkzeug" else workers
+        self.threads = threads
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.env = dict(os.environ, HTA_SETTINGS=settings_path)
+        self.process = None
+
+    def command(self) -> list:
+        if self.worker_model == "werkzeug":
+            return [sys.executable, "-m", "benchmarks.loadtest_app", "--port", str(self.port)]
+        return [sys.executable, "-m", "gunicorn", "--bind", f"127.0.0.1:{self.port}",
+                "--workers", str(self.workers), "--worker-class", self.worker_model,
+                "--threads", str(self.threads), "--timeout", "120", "benchmarks.loadtest_app:app"]
+
+    def start(self, timeout: float = 60.0):
+        import requests
+        self.process = subprocess.Popen(self.command(), cwd=PROJECT_ROOT, env=self.env)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"App exited with code {self.process.returncode} during startup")
+            try:
+                if requests.get(self.url + "/", timeout=1).ok:
+                    return self
+            except requests.RequestException:
+                pass
+            time.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f"App not ready after {timeout:.0f}s")
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+    def scrape(self, attempts_per_worker: int = 10) -> dict:
+        """
+        /metrics of every worker process: pid -> parsed samples.
+
+        Each process keeps its own registry and the server picks the worker, so
+        the endpoint is polled over fresh connections until every worker answered.
+        """
+        import requests
+        by_worker = {}
+        for _ in range(self.workers * attempts_per_worker):
+            response = requests.get(self.url + "/metrics", headers={"Connection": "close"}, timeout=10)
+            by_worker[response.headers.get(WORKER_HEADER, "?")] = parse_metrics(response.text)
+            if len(by_worker) >= self.workers:
+                break
+        return by_worker
+
+
+def metric_deltas(before: dict, after: dict) -> dict:
+    """Samples summed over worker processes, minus the values scraped before the run."""
+    totals = defaultdict(float)
+    for pid, samples in after.items():
+        previous = before.get(pid, {})
+        for key, value in samples.items():
+            totals[key] += value - previous.get(key, 0.0)
+    return totals
+
+
+def breakdown(deltas: dict) -> dict:
+    """Per-stage, per-provider and per-cache summaries of the metric deltas."""
+    stages, providers, caches = {}, {}, {}
+    for (name, labels), value in deltas.items():
+        labels = dict(labels)
+        if name == "hta_stage_duration_seconds_count" and value:
+            total = deltas[("hta_stage_duration_seconds_sum", (("stage", labels['stage']),))]
+            stages[labels['stage']] = {'count': int(value), 'mean_ms': 1000 * total / value, 'errors': int(
+                deltas.get(("hta_stage_errors_total", (("stage", labels['stage']),)), 0))}
+        elif name == "hta_external_call_duration_seconds_count" and value:
+            provider = labels['provider']
+            total = deltas[("hta_external_call_duration_seconds_sum", (("provider", provider),))]
+            providers[provider] = {
+                'calls': int(value), 'mean_ms': 1000 * total / value,
+                'errors': int(deltas.get(("hta_external_calls_total", (("provider", provider), ("outcome", "error"))), 0)),
+                'retries': int(deltas.get(("hta_external_retries_total", (("provider", provider),)), 0)),
+            }
+        elif name == "hta_cache_requests_total" and value:
+            entry = caches.setdefault(f"{labels['cache']}/{labels['provider']}", {'hit': 0, 'miss': 0})
+            entry[labels['result']] += int(value)
+    for entry in caches.values():
+        entry['hit_ratio'] = entry['hit'] / ((entry['hit'] + entry['miss']) or 1)
+    return {'stages': stages, 'providers': providers, 'caches': caches}
+
+
+def drive(url: str, tickers: list, concurrency: int, duration: float = None, rsi_mode: str = "standard") -> list:
+    """
+    Closed-loop load: concurrency clients each send /analyze as soon as their
+    previous response arrived, walking tickers in order (until duration seconds
+    have passed, if given).
+
+    Returns:
+        list: (start offset s, latency s, outcome) per request; outcome is 'ok',
+        'app_error' (the page reports a failed analysis) or 'http_<status>' / 'exception'.
+    """
+    import requests
+    results, lock, position = [], threading.Lock(), iter(range(len(tickers)))
+    started = time.perf_counter()
+
+    def client():
+        session = requests.Session()
+        while True:
+            with lock:
+                index = next(position, None)
+            if index is None or (duration is not None and time.perf_counter() - started > duration):
+                return
+            start = time.perf_counter()
+            try:
+                response = session.post(url + "/analyze", data={'ticker': tickers[index], 'rsi_mode': rsi_mode},
+                                        timeout=300)
+                if response.status_code != 200:
+                    outcome = f"http_{response.status_code}"
+                elif '<p class="error-msg">' in response.text:
+                    outcome = "app_error"
+                else:
+                    outcome = "ok"
+            except requests.RequestException:
+                outcome = "exception"
+            with lock:
+                results.append((start - started, time.perf_counter() - start, outcome))
+
+    threads = [threading.Thread(target=client, name=f"client_{i}") for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def summarize(results: list) -> dict:
+    if not results:
+        return {'requests': 0}
+    latencies = np.array([latency for _, latency, _ in results]) * 1000
+    elapsed = max(start + latency for start, latency, _ in results)
+    outcomes = defaultdict(int)
+    for _, _, outcome in results:
+        outcomes[outcome] += 1
+    return {
+        'requests': len(results),
+        'elapsed_s': elapsed,
+        'throughput_rps': len(results) / elapsed,
+        'outcomes': dict(outcomes),
+        'latency_ms': {'p50': float(np.percentile(latencies, 50)), 'p95': float(np.percentile(latencies, 95)),
+                       'p99': float(np.percentile(latencies, 99)), 'max': float(latencies.max()),
+                       'mean': float(latencies.mean())},
+    }
+
+
+def loadtest_settings(stand_ins: StandIns, workdir: str, cache_ttl: int) -> dict:
+    """config/settings.yaml with the providers pointed at the stand-ins and every cache under workdir."""
+    with open(DEFAULT_SETTINGS_PATH) as file:
+        settings = copy.deepcopy(yaml.safe_load(file))
+    settings.update(stand_ins.settings())
+    # Niente cassette né stato condiviso con l'installazione reale
+    settings['cassette'] = {'mode': "passthrough", 'path': os.path.join(workdir, "cassettes")}
+    settings['result_cache'] = dict(settings.get('result_cache') or {}, ttl_seconds=cache_ttl,
+                                    path=os.path.join(workdir, "results"))
+    settings['jobs'] = dict(settings.get('jobs') or {}, path=os.path.join(workdir, "jobs.sqlite3"))
+    settings['precompute'] = dict(settings.get('precompute') or {}, path=os.path.join(workdir, "signals.sqlite3"))
+    settings['profiling'] = dict(settings.get('profiling') or {}, path=os.path.join(workdir, "profiles"))
+    settings['logging'] = {'level': "WARNING"}
+    return settings
+
+
+def run(args) -> dict:
+    profiles = {provider: ProviderProfile(args.latency_ms.get(provider, args.default_latency_ms) / 1000,
+                                          args.jitter, args.error_rate.get(provider, args.default_error_rate))
+                for provider in PROVIDERS}
+    stand_ins = StandIns(profiles, seed=args.seed).start()
+    with tempfile.TemporaryDirectory(prefix="hta-loadtest-") as workdir:
+        settings_path = os.path.join(workdir, "settings.yaml")
+        with open(settings_path, "w") as file:
+            yaml.safe_dump(loadtest_settings(stand_ins, workdir, args.cache_ttl), file)
+
+        app = AppProcess(settings_path, args.worker_model, args.workers, args.threads).start()
+        try:
+            count = args.requests if args.duration is None else 1_000_000
+            tickers = zipf_tickers(args.warmup + count, TICKERS[:args.universe], args.zipf, args.seed)
+            if args.warmup:
+                drive(app.url, tickers[:args.warmup], args.concurrency, rsi_mode=args.rsi_mode)
+            before = app.scrape()
+            stand_ins_before = stand_ins.stats()
+            results = drive(app.url, tickers[args.warmup:], args.concurrency, args.duration, args.rsi_mode)
+            deltas = metric_deltas(before, app.scrape())
+        finally:
+            app.stop()
+            stand_ins.stop()
+
+    provider_requests = {name: {key: value - stand_ins_before[name][key] for key, value in stats.items()}
+                         for name, stats in stand_ins.stats().items()}
+    report = summarize(results)
+    report.update(breakdown(deltas))
+    report['stand_ins'] = provider_requests
+    report['config'] = {key: getattr(args, key) for key in (
+        'label', 'worker_model', 'workers', 'threads', 'concurrency', 'requests', 'duration', 'warmup',
+        'universe', 'zipf', 'rsi_mode', 'cache_ttl', 'default_latency_ms', 'latency_ms', 'jitter',
+        'default_error_rate', 'error_rate', 'seed')}
+    report['config']['workers'] = app.workers
+    return report
+
+
+def print_report(report: dict):
+    config = report['config']
+    print(f"== {config['label'] or config['worker_model']}: {config['worker_model']} x{config['workers']}"
+          f" (threads {config['threads']}), concurrency {config['concurrency']}, cache ttl {config['cache_ttl']}s")
+    if not report['requests']:
+        print("No requests completed")
+        return
+    latency = report['latency_ms']
+    print(f"{report['requests']} requests in {report['elapsed_s']:.1f}s: {report['throughput_rps']:.2f} req/s, "
+          f"outcomes {report['outcomes']}")
+    print(f"latency ms: p50 {latency['p50']:.0f}  p95 {latency['p95']:.0f}  p99 {latency['p99']:.0f}  "
+          f"max {latency['max']:.0f}  mean {latency['mean']:.0f}")
+
+    print(f"\n{'stage':<24}{'runs':>8}{'mean ms':>10}{'errors':>8}")
+    for stage, entry in sorted(report['stages'].items(), key=lambda item: -item[1]['mean_ms']):
+        print(f"{stage:<24}{entry['count']:>8}{entry['mean_ms']:>10.1f}{entry['errors']:>8}")
+    print(f"\n{'provider':<24}{'calls':>8}{'mean ms':>10}{'errors':>8}{'retries':>9}")
+    for provider, entry in sorted(report['providers'].items()):
+        print(f"{provider:<24}{entry['calls']:>8}{entry['mean_ms']:>10.1f}{entry['errors']:>8}{entry['retries']:>9}")
+    print(f"\n{'cache':<32}{'hits':>8}{'misses':>8}{'hit %':>8}")
+    for cache, entry in sorted(report['caches'].items()):
+        print(f"{cache:<32}{entry['hit']:>8}{entry['miss']:>8}{100 * entry['hit_ratio']:>8.1f}")
+    print("\nstand-in requests (injected errors): " + ", ".join(
+        f"{name} {stats['requests']} ({stats['errors']})" for name, stats in report['stand_ins'].items()))
+
+
+def compare(paths: list):
+    """Side-by-side summary of saved reports (--json)."""
+    reports = []
+    for path in paths:
+        with open(path) as file:
+            reports.append(json.load(file))
+    print(f"{'run':<28}{'model':<12}{'workers':>8}{'conc':>6}{'ttl':>6}{'req/s':>9}"
+          f"{'p50':>8}{'p95':>8}{'p99':>8}{'ok %':>7}")
+    for path, report in zip(paths, reports):
+        config, latency = report['config'], report.get('latency_ms') or {}
+        ok = report.get('outcomes', {}).get('ok', 0) / (report['requests'] or 1)
+        print(f"{(config['label'] or os.path.basename(path)):<28}{config['worker_model']:<12}{config['workers']:>8}"
+              f"{config['concurrency']:>6}{config['cache_ttl']:>6}{report.get('throughput_rps', 0):>9.2f}"
+              f"{latency.get('p50', 0):>8.0f}{latency.get('p95', 0):>8.0f}{latency.get('p99', 0):>8.0f}"
+              f"{100 * ok:>7.1f}")
+
+
+def _per_provider(values: list, option: str) -> dict:
+    parsed = {}
+    for value in values or ():
+        provider, _, number = value.partition("=")
+        if provider not in PROVIDERS or not number:
+            raise argparse.ArgumentTypeError(f"{option} expects provider=value with provider in {PROVIDERS}")
+        parsed[provider] = float(number)
+    return parsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test /analyze against local provider stand-ins")
+    parser.add_argument("--compare", nargs="+", metavar="REPORT", help="print saved --json reports side by side and exit")
+    parser.add_argument("--label", default="", help="name of this run in reports")
+    parser.add_argument("--worker-model", choices=WORKER_MODELS, default="werkzeug",
+                        help="werkzeug (one threaded process) or a gunicorn worker class (requires gunicorn)")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument("--threads", type=int, default=8, help="threads per gunicorn worker (gthread)")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=200, help="requests to send (ignored with --duration)")
+    parser.add_argument("--duration", type=float, help="send requests for this many seconds instead")
+    parser.add_argument("--warmup", type=int, default=0, help="requests sent before measuring")
+    parser.add_argument("--universe", type=int, default=len(TICKERS), help="number of distinct tickers")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of ticker popularity (0 = uniform)")
+    parser.add_argument("--rsi-mode", default="standard")
+    parser.add_argument("--cache-ttl", type=int, default=300, help="result_cache.ttl_seconds (0 disables the cache)")
+    parser.add_argument("--latency-ms", dest="default_latency_ms", type=float, default=50.0,
+                        help="median latency of every stand-in")
+    parser.add_argument("--provider-latency-ms", action="append", metavar="PROVIDER=MS",
+                        help=f"latency of one stand-in, e.g. openai=300 ({', '.join(PROVIDERS)})")
+    parser.add_argument("--jitter", type=float, default=0.5, help="log-normal spread of stand-in latencies")
+    parser.add_argument("--error-rate", dest="default_error_rate", type=float, default=0.0,
+                        help="share of stand-in responses that are HTTP 503")
+    parser.add_argument("--provider-error-rate", action="append", metavar="PROVIDER=RATE",
+                        help="error rate of one stand-in, e.g. newsapi=0.2")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the ticker sequence and stand-in draws")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(args.compare)
+        sys.exit(0)
+    try:
+        args.latency_ms = _per_provider(args.provider_latency_ms, "--provider-latency-ms")
+        args.error_rate = _per_provider(args.provider_error_rate, "--provider-error-rate")
+    except (argparse.ArgumentTypeError, ValueError) as e:
+        parser.error(str(e))
+    if args.worker_model != "werkzeug" and importlib.util.find_spec("gunicorn") is None:
+        parser.error(f"--worker-model {args.worker_model} needs gunicorn (pip install gunicorn)")
+    if not 1 <= args.universe <= len(TICKERS):
+        parser.error(f"--universe must be between 1 and {len(TICKERS)}")
+
+    report = run(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(report, file, indent=2, sort_keys=True)
+            file.write("\n")
+        print(f"\nReport written to {args.json}")
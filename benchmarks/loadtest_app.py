@@ -0,0 +1,97 @@
+import argparse
+import logging
+import os
+import sys
+import threading
+import types
+
+import pandas as pd
+
+from benchmarks.loadtest import WORKER_HEADER
+from config.settings_loader import load_settings
+
+_local = threading.local()
+
+
+def _session():
+    # Una sessione per thread, come farebbe un client HTTP con pool di connessioni
+    session = getattr(_local, "session", None)
+    if session is None:
+        import requests
+        session = _local.session = requests.Session()
+    return session
+
+
+def _yahoo_url() -> str:
+    return (load_settings().get('yahoo') or {})['url']
+
+
+class StandInTicker:
+    """The part of yfinance.Ticker used by the app: history() and info."""
+
+    def __init__(self, ticker: str):
+        self.ticker = ticker
+
+    def history(self, period: str = "1mo", interval: str = "1d", **kwargs) -> pd.DataFrame:
+        response = _session().get(f"{_yahoo_url()}/v8/finance/chart/{self.ticker}",
+                                  params={'range': period, 'interval': interval}, timeout=30)
+        response.raise_for_status()
+        result = response.json()['chart']['result'][0]
+        quote = result['indicators']['quote'][0]
+        index = pd.to_datetime(result['timestamp'], unit="s", utc=True).tz_convert("America/New_York")
+        return pd.DataFrame({'Open': quote['open'], 'High': quote['high'], 'Low': quote['low'],
+                             'Close': quote['close'], 'Volume': quote['volume']},
+                            index=pd.DatetimeIndex(index, name="Date"))
+
+    @property
+    def info(self) -> dict:
+        response = _session().get(f"{_yahoo_url()}/v7/finance/quote", params={'symbols': self.ticker}, timeout=30)
+        response.raise_for_status()
+        results = response.json()['quoteResponse']['result']
+        return dict(results[0]) if results else {}
+
+
+def download(tickers, period: str = "1mo", interval: str = "1d", **kwargs) -> pd.DataFrame:
+    """yfinance.download(..., group_by='ticker'): columns (ticker, field)."""
+    tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+    frames = {ticker: StandInTicker(ticker).history(period=period, interval=interval) for ticker in tickers}
+    return pd.concat(frames, axis=1)
+
+
+def install_yfinance_stand_in():
+    """
+    Replace yfinance with a module reading the Yahoo stand-in over HTTP.
+
+    Reddit, NewsAPI and OpenAI are redirected through their settings (the load
+    test passes its settings file via HTA_SETTINGS), but yfinance has no endpoint
+    setting, so this must run before main (or any module importing yfinance).
+    """
+    module = types.ModuleType("yfinance")
+    module.Ticker = StandInTicker
+    module.download = download
+    sys.modules["yfinance"] = module
+
+
+install_yfinance_stand_in()
+
+from main import app  # noqa: E402  (dopo la sostituzione di yfinance)
+
+
+@app.after_request
+def tag_worker(response):
+    # Il harness raccoglie /metrics da ogni processo: il pid distingue i worker
+    response.headers[WORKER_HEADER] = str(os.getpid())
+    return response
+
+
+if __name__ == "__main__":
+    # Con gunicorn: gunicorn -k gthread -w 4 --threads 8 benchmarks.loadtest_app:app
+    parser = argparse.ArgumentParser(description="Serve the app against the provider stand-ins (werkzeug, threaded)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    from werkzeug.serving import run_simple
+    # Una riga di log per richiesta falserebbe le misure
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    run_simple(args.host, args.port, app, threaded=True)
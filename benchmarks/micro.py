@@ -0,0 +1,223 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.fixtures import END_DATE, FakeOpenAI, synthetic_corpus, synthetic_ohlc
+from data.cassette import Cassette
+from data.price_fetcher import PriceFetcher
+from data.sentiment_cleaner import SentimentCleaner
+from data.sentiment_corpus import SentimentCorpus
+from indicators.backtest_indicator_fetcher import TechnicalIndicators
+from sentiment.sentiment_analyzer import SentimentAnalyzer
+from strategy.strategy_computation import RSI_MODES, HybridStrategy
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+OFFLINE_SETTINGS = {'openai': {'model_name': "benchmark", 'api_key': ""}}
+WARMUP_DAYS = 60  # Storico prima dell'intervallo: finestra di 40 giorni degli indicatori più margine
+
+
+def _indicators() -> TechnicalIndicators:
+    # Cassette in replay: nessuna chiamata di rete possibile, i dati arrivano sempre da price_data
+    return TechnicalIndicators("BENCH", price_fetcher=PriceFetcher(cassette=Cassette("replay")))
+
+
+def bench_compute_rsi(size: int):
+    indicators, close = _indicators(), synthetic_ohlc(size)['Close']
+    return lambda: indicators.compute_rsi(close)
+
+
+def bench_compute_adx(size: int):
+    indicators, bars = _indicators(), synthetic_ohlc(size)
+    return lambda: indicators.compute_adx(bars)
+
+
+def bench_indicators_on_date_range(size: int):
+    indicators, bars = _indicators(), synthetic_ohlc(size + WARMUP_DAYS)
+    start = END_DATE - pd.Timedelta(days=size - 1)
+    return lambda: indicators.compute_indicators_on_date_range(start, END_DATE, price_data=bars)
+
+
+def bench_clean_sentiment_data(size: int):
+    cleaner, corpus = SentimentCleaner(), synthetic_corpus(size)
+    return lambda: cleaner.clean_sentiment_data(corpus.copy())
+
+
+def bench_analyze_sentiment(size: int, latency: float = 0.0, workers: int = 8):
+    corpus = SentimentCleaner().clean_sentiment_data(synthetic_corpus(size))
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scoring") if workers > 1 else None
+    analyzer = SentimentAnalyzer(settings=OFFLINE_SETTINGS, cassette=Cassette("passthrough"),
+                                 client=FakeOpenAI(latency), executor=executor)
+    return lambda: analyzer.analyze_sentiment(corpus.copy())
+
+
+def _scored_corpus(size: int) -> pd.DataFrame:
+    corpus = SentimentCleaner().clean_sentiment_data(synthetic_corpus(size))
+    corpus['sentiment_score'] = np.random.default_rng(0).uniform(-100, 100, len(corpus))
+    return corpus
+
+
+def bench_corpus_from_frame(size: int):
+    corpus = _scored_corpus(size)
+    return lambda: SentimentCorpus.from_frame(corpus)
+
+
+def bench_corpus_to_frame(size: int):
+    corpus = SentimentCorpus.from_frame(_scored_corpus(size))
+    return lambda: corpus.to_frame()
+
+
+def bench_generate_trading_signal(size: int):
+    strategy, rng = HybridStrategy(), np.random.default_rng(0)
+    inputs = list(zip(rng.uniform(0, 100, size), rng.uniform(0, 60, size), rng.uniform(5, 40, size),
+                      rng.uniform(-100, 100, size), rng.choice(RSI_MODES, size)))
+
+    def run():
+        for rsi, adx, pe_ratio, sentiment, rsi_mode in inputs:
+            strategy.generate_trading_signal(rsi, adx, pe_ratio, sentiment, rsi_mode)
+    return run
+
+
+# Nome -> (costruttore del caso, dimensioni di default)
+BENCHMARKS = {
+    "compute_rsi": (bench_compute_rsi, (250, 2_500, 25_000)),
+    "compute_adx": (bench_compute_adx, (250, 2_500, 25_000)),
+    "compute_indicators_on_date_range": (bench_indicators_on_date_range, (20, 120, 365)),
+    "clean_sentiment_data": (bench_clean_sentiment_data, (100, 1_000, 10_000)),
+    "analyze_sentiment": (bench_analyze_sentiment, (50, 500, 2_000)),
+    "corpus_from_frame": (bench_corpus_from_frame, (1_000, 10_000, 50_000)),
+    "corpus_to_frame": (bench_corpus_to_frame, (1_000, 10_000, 50_000)),
+    "generate_trading_signal": (bench_generate_trading_signal, (100, 1_000, 10_000)),
+}
+
+
+def measure(func, min_time: float = 0.2, min_repeats: int = 5, max_repeats: int = 200) -> float:
+    """
+    Fastest run of func() in seconds, over at least min_repeats runs (and min_time
+    seconds) after one warm-up run. The minimum is the least noisy estimate of the
+    cost: slower runs only add scheduler and cache interference.
+    """
+    func()
+    times = []
+    start = time.perf_counter()
+    while len(times) < min_repeats or (time.perf_counter() - start < min_time and len(times) < max_repeats):
+        run_start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - run_start)
+    return min(times)
+
+
+def machine() -> dict:
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()}
+
+
+def load_baselines(path: str = BASELINE_PATH) -> dict:
+    if not os.path.exists(path):
+        return {'machine': None, 'cases': {}}
+    with open(path) as file:
+        return json.load(file)
+
+
+def run(names: list, scale: float = 1.0, latency: float = 0.0, min_time: float = 0.2, cases: set = None) -> dict:
+    """Run the selected benchmarks (only the given cases, if any); returns {'name[n=size]': seconds}."""
+    results = {}
+    for name in names:
+        build, sizes = BENCHMARKS[name]
+        for size in sizes:
+            size = max(1, int(size * scale))
+            case, kwargs = f"{name}[n={size}]", {}
+            if name == "analyze_sentiment" and latency:
+                # La latenza simulata cambia il caso: ha una baseline propria
+                case, kwargs = f"{name}[n={size},latency_ms={latency * 1000:g}]", {'latency': latency}
+            if cases is not None and case not in cases:
+                continue
+            results[case] = measure(build(size, **kwargs), min_time=min_time)
+    return results
+
+
+def slow_cases(results: dict, baselines: dict, tolerance: float) -> set:
+    """Cases slower than their baseline by more than tolerance."""
+    return {case for case, seconds in results.items()
+            if case in baselines['cases'] and seconds / baselines['cases'][case] > 1 + tolerance}
+
+
+def compare(results: dict, baselines: dict, tolerance: float) -> bool:
+    """
+    Print results next to their baselines.
+
+    Returns:
+        bool: False if a case is slower than its baseline by more than tolerance (e.g. 0.5 = +50%).
+    """
+    ok = True
+    print(f"{'case':<48}{'ms':>11}{'baseline ms':>13}{'ratio':>8}  status")
+    for case, seconds in results.items():
+        baseline = baselines['cases'].get(case)
+        if baseline is None:
+            print(f"{case:<48}{seconds * 1000:>11.3f}{'-':>13}{'-':>8}  new")
+            continue
+        ratio = seconds / baseline
+        status = "ok"
+        if ratio > 1 + tolerance:
+            status, ok = "REGRESSION", False
+        elif ratio < 1 / (1 + tolerance):
+            status = "faster"
+        print(f"{case:<48}{seconds * 1000:>11.3f}{baseline * 1000:>13.3f}{ratio:>8.2f}  {status}")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline micro-benchmarks compared against stored baselines")
+    parser.add_argument("names", nargs="*", default=list(BENCHMARKS),
+                        help=f"benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every input size by this factor")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="latency of each fake OpenAI call")
+    parser.add_argument("--min-time", type=float, default=0.2, help="minimum seconds spent per case")
+    parser.add_argument("--rounds", type=int, default=1,
+                        help="passes over the whole suite; each case keeps its fastest pass (use 3+ with --save)")
+    parser.add_argument("--confirm", type=int, default=3,
+                        help="re-measurements of a case over tolerance before it counts as a regression")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="allowed slowdown before a case counts as a regression (0.5 = +50%%)")
+    parser.add_argument("--save", action="store_true", help="store these results as the new baselines")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks {unknown}")
+    # I warning su finestre corte o corpus vuoti non servono qui
+    logging.basicConfig(level=logging.ERROR)
+
+    results = {}
+    for _ in range(max(1, args.rounds)):
+        # Passate intercalate: un disturbo temporaneo della macchina non pesa su un solo caso
+        for case, seconds in run(args.names, args.scale, args.latency_ms / 1000, args.min_time).items():
+            results[case] = min(seconds, results.get(case, seconds))
+    baselines = load_baselines()
+    for _ in range(max(0, args.confirm)):
+        # Un caso lento in una sola passata è quasi sempre rumore (altri processi, frequenza della CPU):
+        # conta come regressione solo se resta lento in ogni nuova misura
+        slow = slow_cases(results, baselines, args.tolerance)
+        if not slow:
+            break
+        print(f"Re-measuring {len(slow)} case(s) over tolerance: {', '.join(sorted(slow))}")
+        for case, seconds in run(args.names, args.scale, args.latency_ms / 1000, args.min_time, slow).items():
+            results[case] = min(seconds, results[case])
+    if baselines['machine'] and baselines['machine'] != machine():
+        print(f"Note: baselines were recorded on {baselines['machine']}, this is {machine()}")
+    ok = compare(results, baselines, args.tolerance)
+
+    if args.save:
+        baselines['cases'].update(results)
+        baselines['machine'] = machine()
+        with open(BASELINE_PATH, "w") as file:
+            json.dump(baselines, file, indent=2, sort_keys=True)
+            file.write("\n")
+        print(f"Baselines saved to {BASELINE_PATH}")
+    sys.exit(0 if ok or args.save else 1)
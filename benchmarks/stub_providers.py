@@ -0,0 +1,315 @@
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from benchmarks.fixtures import WORDS
+
+PROVIDERS = ("yahoo", "reddit", "newsapi", "openai")
+SUBREDDIT_POSTS = 4       # post restituiti da ogni ricerca
+POST_COMMENTS = 5         # commenti per post
+NEWS_ARTICLES = 20        # articoli per query NewsAPI
+REPORT_TEXT = ("{ticker} shows a mixed technical picture. Sentiment across news and social media is moderate, "
+               "so the signal should be read together with the broader market trend.")
+
+
+def _seed(*parts) -> int:
+    return zlib.crc32("|".join(map(str, parts)).encode("utf-8"))
+
+
+def _words(rng: random.Random, low: int = 6, high: int = 25) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+
+def _period_days(period: str) -> int:
+    match = re.fullmatch(r"(\d+)(d|wk|mo|y)", period or "")
+    if not match:
+        return 30
+    number, unit = int(match.group(1)), match.group(2)
+    return number * {'d': 1, 'wk': 7, 'mo': 31, 'y': 366}[unit]
+
+
+class ProviderProfile:
+    """Latency and failure behaviour of one stand-in."""
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.5, error_rate: float = 0.0):
+        """
+        Args:
+            latency (float): Median response time in seconds. Default: 0.05.
+            jitter (float): Spread of the response time, as a fraction of latency
+                (log-normal sigma, so a few responses are much slower). Default: 0.5.
+            error_rate (float): Share of requests answered with HTTP 503. Default: 0.
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Molti client concorrenti: la coda di default (5) rifiuterebbe connessioni
+    request_queue_size = 256
+
+    def __init__(self, address, handler, provider: str, profile: ProviderProfile, seed: int):
+        super().__init__(address, handler)
+        self.provider = provider
+        self.profile = profile
+        self.rng = random.Random(_seed(seed, provider))
+        self.rng_lock = threading.Lock()
+        self.stats = {'requests': 0, 'errors': 0}
+
+    def draw(self):
+        """(delay, fail) for the next request, from the seeded generator."""
+        with self.rng_lock:
+            self.stats['requests'] += 1
+            delay = self.profile.latency * self.rng.lognormvariate(0, self.profile.jitter) if self.profile.latency else 0.0
+            fail = self.rng.random() < self.profile.error_rate
+            if fail:
+                self.stats['errors'] += 1
+        return delay, fail
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Routes by (method, path regex); every request first waits and may fail per the profile."""
+
+    protocol_version = "HTTP/1.1"
+    # Header e corpo partono in due write: con Nagle ogni risposta keep-alive attenderebbe l'ACK ritardato
+    disable_nagle_algorithm = True
+    routes = ()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _dispatch(self, method: str):
+        url = urlparse(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        delay, fail = self.server.draw()
+        time.sleep(delay)
+        if fail:
+            return self._send(503, {"error": "stand-in failure"})
+        for route_method, pattern, name in self.routes:
+            match = re.fullmatch(pattern, url.path)
+            if route_method == method and match:
+                query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                return getattr(self, name)(*match.groups(), query=query, body=body)
+        self._send(404, {"error": f"no stand-in route for {method} {url.path}"})
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _send(self, status: int, payload, content_type: str = "application/json"):
+        data = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class YahooHandler(StandInHandler):
+    """Chart and quote endpoints shaped like Yahoo Finance's (read by benchmarks.loadtest_app)."""
+
+    routes = (("GET", r"/v8/finance/chart/([^/]+)", "chart"),
+              ("GET", r"/v7/finance/quote", "quote"))
+
+    def chart(self, ticker, query, body):
+        interval = query.get('interval', "1d")
+        days = _period_days(query.get('range', "1mo"))
+        end = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+        if interval.endswith("m") and not interval.endswith("mo"):
+            # Barre al minuto dell'ultima sessione
+            step, count = timedelta(minutes=int(interval[:-1] or 1)), 390
+        else:
+            step, count = timedelta(days=1), days
+            end = end.replace(hour=0, minute=0)
+        rng = np.random.default_rng(_seed(ticker, interval))
+        close = (50 + _seed(ticker) % 400) * np.exp(np.cumsum(rng.normal(0, 0.02, count)))
+        open_ = close * (1 + rng.normal(0, 0.005, count))
+        quote = {
+            'open': open_.round(4).tolist(),
+            'high': (np.maximum(open_, close) * (1 + rng.uniform(0, 0.01, count))).round(4).tolist(),
+            'low': (np.minimum(open_, close) * (1 - rng.uniform(0, 0.01, count))).round(4).tolist(),
+            'close': close.round(4).tolist(),
+            'volume': rng.integers(1_000_000, 50_000_000, count).tolist(),
+        }
+        timestamps = [int((end - step * (count - 1 - i)).timestamp()) for i in range(count)]
+        self._send(200, {'chart': {'result': [{'meta': {'symbol': ticker},
+                                               'timestamp': timestamps,
+                                               'indicators': {'quote': [quote]}}], 'error': None}})
+
+    def quote(self, query, body):
+        results = []
+        for symbol in filter(None, query.get('symbols', "").split(",")):
+            rng = random.Random(_seed(symbol, "quote"))
+            results.append({'symbol': symbol, 'shortName': f"{symbol.title()} Corp",
+                            'longName': f"{symbol.title()} Corporation",
+                            'trailingPE': round(rng.uniform(5, 60), 2)})
+        self._send(200, {'quoteResponse': {'result': results, 'error': None}})
+
+
+class RedditHandler(StandInHandler):
+    """OAuth token, subreddit search and comment trees, in the JSON shapes praw parses."""
+
+    routes = (("POST", r"/api/v1/access_token", "token"),
+              ("GET", r"/r/([^/]+)/search/?", "search"),
+              ("GET", r"/comments/([^/]+)/?(?:[^/]+/?)?", "comments"))
+
+    def token(self, query, body):
+        self._send(200, {'access_token': "stand-in", 'token_type': "bearer", 'expires_in': 86400, 'scope': "*"})
+
+    @staticmethod
+    def _post(ticker: str, subreddit: str, index: int) -> dict:
+        rng = random.Random(_seed(ticker, subreddit, index))
+        # L'id porta con sé il ticker: comments() ricostruisce i testi senza stato sul server
+        post_id = f"{ticker.lower()}-{_seed(subreddit, index):x}"
+        return {'kind': "t3", 'data': {
+            'id': post_id, 'name': f"t3_{post_id}", 'subreddit': subreddit,
+            'title': f"{ticker} {_words(rng, 4, 10)}", 'selftext': _words(rng),
+            'created_utc': time.time() - rng.uniform(0, 6 * 86400),
+            'permalink': f"/r/{subreddit}/comments/{post_id}/", 'num_comments': POST_COMMENTS,
+        }}
+
+    def search(self, subreddit, query, body):
+        ticker = query.get('q', "").strip().upper()
+        children = [self._post(ticker, subreddit, i) for i in range(SUBREDDIT_POSTS)]
+        self._send(200, {'kind': "Listing", 'data': {'after': None, 'before': None, 'children': children}})
+
+    def comments(self, post_id, query, body):
+        rng = random.Random(_seed(post_id))
+        ticker = post_id.rsplit("-", 1)[0].upper()
+        children = []
+        for i in range(POST_COMMENTS):
+            comment_id = f"{post_id}-{i}"
+            # Circa metà dei commenti cita il ticker in modo da passare il filtro del fetcher
+            text = f"{ticker} stock {_words(rng)}" if rng.random() < 0.5 else _words(rng)
+            children.append({'kind': "t1", 'data': {
+                'id': comment_id, 'name': f"t1_{comment_id}", 'body': text,
+                'created_utc': time.time() - rng.uniform(0, 6 * 86400),
+                'parent_id': f"t3_{post_id}", 'link_id': f"t3_{post_id}", 'replies': "",
+            }})
+        submission = {'kind': "Listing", 'data': {'children': [{'kind': "t3", 'data': {
+            'id': post_id, 'name': f"t3_{post_id}", 'title': ticker, 'selftext': "",
+            'created_utc': time.time(), 'num_comments': POST_COMMENTS}}]}}
+        listing = {'kind': "Listing", 'data': {'after': None, 'before': None, 'children': children}}
+        self._send(200, [submission, listing])
+
+
+class NewsApiHandler(StandInHandler):
+    """'everything' with OR-combined quoted phrases and pagination, NEWS_ARTICLES articles per phrase."""
+
+    routes = (("GET", r"/v2/everything", "everything"),)
+
+    def everything(self, query, body):
+        q = query.get('q', "")
+        # Una query bulk ('"Apple" OR "Microsoft"') riceve gli stessi articoli delle query singole
+        topics = re.findall(r'"([^"]+)"', q) or [q]
+        now = datetime.now(timezone.utc)
+        articles = []
+        for topic in topics:
+            rng = random.Random(_seed(topic, "news"))
+            articles += [{
+                'source': {'id': None, 'name': "Stand-in Wire"},
+                'title': f"{topic}: {_words(rng, 5, 12)}",
+                'description': _words(rng),
+                'publishedAt': (now - timedelta(seconds=rng.uniform(0, 6 * 86400))).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            } for _ in range(NEWS_ARTICLES)]
+        articles.sort(key=lambda article: article['publishedAt'], reverse=True)
+        page_size, page = int(query.get('pageSize', 100)), int(query.get('page', 1))
+        self._send(200, {'status': "ok", 'totalResults': len(articles),
+                         'articles': articles[(page - 1) * page_size:page * page_size]})
+
+
+class OpenAIHandler(StandInHandler):
+    """Chat completions: a deterministic score for short (scoring) requests, a canned report otherwise."""
+
+    routes = (("POST", r"/v1/chat/completions", "chat"),)
+
+    def chat(self, query, body):
+        request = json.loads(body or b"{}")
+        content = request.get('messages', [{}])[-1].get('content', "")
+        if (request.get('max_tokens') or 0) <= 10:
+            reply = str(zlib.crc32(content.encode("utf-8")) % 201 - 100)
+        else:
+            match = re.search(r"ticker (\S+)\.", content)
+            reply = REPORT_TEXT.format(ticker=match.group(1) if match else "The stock")
+        completion = {'id': "chatcmpl-stand-in", 'created': int(time.time()), 'model': request.get('model', "")}
+        if not request.get('stream'):
+            self._send(200, dict(completion, object="chat.completion", choices=[{
+                'index': 0, 'message': {'role': "assistant", 'content': reply}, 'finish_reason': "stop"}],
+                usage={'prompt_tokens': len(content) // 4, 'completion_tokens': len(reply) // 4,
+                       'total_tokens': (len(content) + len(reply)) // 4}))
+            return
+        events = []
+        for piece in re.findall(r"\S+\s*", reply):
+            chunk = dict(completion, object="chat.completion.chunk",
+                         choices=[{'index': 0, 'delta': {'content': piece}, 'finish_reason': None}])
+            events.append(f"data: {json.dumps(chunk)}\n\n")
+        events.append("data: [DONE]\n\n")
+        self._send(200, "".join(events).encode("utf-8"), content_type="text/event-stream")
+
+
+HANDLERS = {'yahoo': YahooHandler, 'reddit': RedditHandler, 'newsapi': NewsApiHandler, 'openai': OpenAIHandler}
+
+
+class StandIns:
+    """
+    Local HTTP stand-ins for Yahoo Finance, Reddit, NewsAPI and OpenAI, one
+    port per provider, with seeded latency and error injection.
+
+    Responses are deterministic per ticker, so two runs with the same seed
+    send the app the same data; only the timing depends on the machine.
+    """
+
+    def __init__(self, profiles: dict = None, seed: int = 0, host: str = "127.0.0.1"):
+        """
+        Args:
+            profiles (dict, optional): Provider name -> ProviderProfile. Default: ProviderProfile() each.
+            seed (int): Seed of the latency and error draws. Default: 0.
+            host (str): Interface to listen on. Default: 127.0.0.1.
+        """
+        profiles = profiles or {}
+        self.servers = {name: StandInServer((host, 0), HANDLERS[name], name,
+                                            profiles.get(name) or ProviderProfile(), seed)
+                        for name in PROVIDERS}
+        self._threads = []
+
+    def url(self, provider: str) -> str:
+        host, port = self.servers[provider].server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        for name, server in self.servers.items():
+            thread = threading.Thread(target=server.serve_forever, name=f"stand-in-{name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        for server in self.servers.values():
+            server.shutdown()
+            server.server_close()
+
+    def stats(self) -> dict:
+        return {name: dict(server.stats) for name, server in self.servers.items()}
+
+    def settings(self) -> dict:
+        """Provider sections of settings.yaml pointing the app at the stand-ins."""
+        return {
+            'reddit': {'client_id': "stand-in", 'client_secret': "stand-in", 'username': "stand-in",
+                       'password': "stand-in", 'user_agent': "hta-loadtest",
+                       'oauth_url': self.url("reddit"), 'reddit_url': self.url("reddit")},
+            'newsapi': {'api_key': "stand-in", 'url': self.url("newsapi") + "/v2/everything"},
+            'openai': {'api_key': "stand-in", 'model_name': "stand-in", 'base_url': self.url("openai") + "/v1"},
+            'yahoo': {'url': self.url("yahoo")},
+        }
@@ -1,10 +1,27 @@
 import pandas as pd
 
 class BacktestConfig:
-    def __init__(self):
-        self.ticker = "NVDA"
-        self.period = "7d"
-        self.start_date = pd.to_datetime("2025-05-06")
-        self.end_date = pd.to_datetime("2025-05-26")
-        self.initial_cash =10000
+    def __init__(self, ticker: str = "NVDA", start_date="2025-05-06", end_date="2025-05-26",
+                 period: str = "7d", initial_cash: float = 10000,
+                 resume: bool = True, checkpoint_dir: str = None,
+                 fetch_concurrency: int = 4, scoring_concurrency: int = 8, profile: bool = False,
+                 interval: str = "1d", sentiment_window=None):
+        self.ticker = ticker
+        self.period = period
+        self.start_date = pd.to_datetime(start_date)
+        self.end_date = pd.to_datetime(end_date)
+        self.initial_cash = initial_cash
+        self.resume = resume                  # riusa le feature salvate in checkpoint_dir
+        self.checkpoint_dir = checkpoint_dir  # None = cartella 'checkpoints' del progetto
+        self.fetch_concurrency = fetch_concurrency      # giorni in fetch Reddit/NewsAPI contemporaneamente
+        self.scoring_concurrency = scoring_concurrency  # giorni in scoring LLM contemporaneamente
+        self.profile = profile                # profilo a campionamento dell'intero run (vedi monitoring/profiling.py)
+        self.interval = interval              # '1d' = backtest giornaliero; '1h', '5m', ... = backtest intraday per barra
+        # Solo intraday: finestra del sentiment di ogni barra, durata ('6h', '90min') o numero di barre (int);
+        # None = period
+        self.sentiment_window = sentiment_window
+
+    @property
+    def intraday(self) -> bool:
+        return self.interval != "1d"
 
@@ -0,0 +1,326 @@
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+from config.settings_loader import load_settings
+from data.cassette import Cassette
+from data.result_cache import LRUCache, ResultCache
+from data.job_store import JobStore
+from data.signal_store import SignalStore
+from data.news_ingest import NewsIngestor, bulk_news_enabled
+from data.price_fetcher import PriceFetcher
+from data.sentiment_fetcher import SentimentFetcher, reddit_endpoints
+from data.sentiment_cleaner import SentimentCleaner
+from sentiment.aggregation import DecayedSentiment
+from sentiment.sentiment_analyzer import SentimentAnalyzer
+from indicators.indicator_fetcher import TechnicalIndicators
+from evaluation.report_generator import GenerateReport
+from monitoring.metrics import cache_lookup, note_request, note_retry
+
+if TYPE_CHECKING:
+    import praw
+    import requests
+    from openai import OpenAI
+    from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+
+def _retry_policy(total: int) -> 'Retry':
+    """urllib3 retry policy for idempotent requests; every retry is counted on the current external call."""
+    from urllib3.util.retry import Retry
+
+    class CountingRetry(Retry):
+        def increment(self, *args, **kwargs):
+            retry = super().increment(*args, **kwargs)
+            note_retry()
+            return retry
+
+    # raise_on_status=False: esauriti i tentativi torna l'ultima risposta e raise_for_status decide
+    return CountingRetry(total=total, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                         allowed_methods=frozenset({"GET"}), raise_on_status=False)
+
+
+class ClientPool:
+    """Reuses clients that must not be shared by two threads at once (e.g. praw.Reddit)."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._idle = queue.LifoQueue()
+
+    @contextmanager
+    def acquire(self):
+        """Check out an idle client (or build a new one) and give it back afterwards."""
+        try:
+            client = self._idle.get_nowait()
+        except queue.Empty:
+            client = self._factory()
+        try:
+            yield client
+        finally:
+            self._idle.put(client)
+
+    def warm(self, size: int = 1):
+        while self._idle.qsize() < size:
+            self._idle.put(self._factory())
+
+
+class RequestHandles:
+    """Per-request pipeline objects built on the container's shared clients."""
+
+    def __init__(self, ticker: str, price_fetcher, sentiment_fetcher, sentiment_cleaner,
+                 sentiment_analyzer, indicators, report_generator):
+        self.ticker = ticker
+        self.price_fetcher = price_fetcher
+        self.sentiment_fetcher = sentiment_fetcher
+        self.sentiment_cleaner = sentiment_cleaner
+        self.sentiment_analyzer = sentiment_analyzer
+        self.indicators = indicators
+        self.report_generator = report_generator
+
+
+class ServiceContainer:
+    """
+    Application-level services: settings loaded once, long-lived pooled clients.
+
+    The OpenAI client and the NewsAPI HTTP session keep their connection pools
+    across requests and are safe to share between threads. Reddit clients are
+    not thread-safe, so they are kept in a ClientPool and checked out for the
+    duration of one request.
+    """
+
+    def __init__(self, config_path: str = None, pool_size: int = 10, stage_workers: int = 16,
+                 scoring_workers: int = 8, http_retries: int = 2):
+        """
+        Args:
+            config_path (str, optional): settings.yaml path. Default: config/settings.yaml.
+            pool_size (int): Max keep-alive connections per host for the HTTP session. Default: 10.
+            http_retries (int): Retries of failed GETs (connection errors, 429 and 5xx) by the HTTP session. Default: 2.
+            stage_workers (int): Threads shared by the pipeline stages of all requests. Default: 16.
+            scoring_workers (int): Concurrent OpenAI scoring calls across all requests. Default: 8.
+        """
+        self.settings = load_settings(config_path)
+        self.pool_size = pool_size
+        self.stage_workers = stage_workers
+        self.scoring_workers = scoring_workers
+        self.http_retries = http_retries
+        self._lock = threading.Lock()
+        self._openai_client = None
+        self._http = None
+        self._cassette = None
+        self._result_cache = None
+        self._job_store = None
+        self._report_generator = None
+        self._signal_store = None
+        self._stage_executor = None
+        self._scoring_executor = None
+        self._news_ingestor = None
+        self._decayed_sentiment = {}
+        self.reddit_pool = ClientPool(self._new_reddit)
+
+    def _new_reddit(self) -> 'praw.Reddit':
+        import praw
+        reddit_config = self.settings['reddit']
+        return praw.Reddit(
+            client_id=reddit_config['client_id'],
+            client_secret=reddit_config['client_secret'],
+            username=reddit_config['username'],
+            password=reddit_config['password'],
+            user_agent=reddit_config['user_agent'],
+            **reddit_endpoints(reddit_config)
+        )
+
+    @property
+    def openai_client(self) -> 'OpenAI':
+        with self._lock:
+            if self._openai_client is None:
+                from openai import DefaultHttpxClient, OpenAI
+                # L'hook conta i tentativi HTTP: quelli oltre il primo sono retry interni del client
+                self._openai_client = OpenAI(api_key=self.settings['openai']['api_key'],
+                                             base_url=self.settings['openai'].get('base_url'),
+                                             http_client=DefaultHttpxClient(event_hooks={"request": [note_request]}))
+            return self._openai_client
+
+    @property
+    def http(self) -> 'requests.Session':
+        with self._lock:
+            if self._http is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size,
+                                      max_retries=_retry_policy(self.http_retries))
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._http = session
+            return self._http
+
+    @property
+    def cassette(self) -> Cassette:
+        with self._lock:
+            if self._cassette is None:
+                self._cassette = Cassette.from_settings(self.settings)
+            return self._cassette
+
+    @property
+    def result_cache(self) -> ResultCache:
+        with self._lock:
+            if self._result_cache is None:
+                self._result_cache = ResultCache.from_settings(self.settings)
+            return self._result_cache
+
+    @property
+    def job_store(self) -> JobStore:
+        with self._lock:
+            if self._job_store is None:
+                self._job_store = JobStore.from_settings(self.settings)
+            return self._job_store
+
+    @property
+    def signal_store(self) -> SignalStore:
+        with self._lock:
+            if self._signal_store is None:
+                self._signal_store = SignalStore.from_settings(self.settings)
+            return self._signal_store
+
+    def precomputed(self, ticker: str, rsi_mode: str) -> dict:
+        """Result written by the precomputation daemon, if fresh enough (precompute.max_age_minutes)."""
+        max_age = (self.settings.get('precompute') or {}).get('max_age_minutes', 90) * 60
+        return self.signal_store.get_signal(ticker, rsi_mode, max_age=max_age)
+
+    def analysis(self, ticker: str, rsi_mode: str, compute, variant: str = "full") -> dict:
+        """
+        Analysis result served from the cheapest place available: the precomputed
+        store, then the result cache, and only then compute() (coalesced, see
+        ResultCache.get_or_compute).
+        """
+        result = self.precomputed(ticker, rsi_mode)
+        cache_lookup("precomputed", "analysis", hit=result is not None)
+        if result is not None:
+            return result
+        return self.result_cache.get_or_compute(ticker, rsi_mode, compute, variant=variant)
+
+    @property
+    def report_generator(self) -> GenerateReport:
+        """Shared report generator; its LLM report cache is shared by every request."""
+        openai_client, cassette = self.openai_client, self.cassette
+        with self._lock:
+            if self._report_generator is None:
+                cache_entries = (self.settings.get('report') or {}).get('cache_entries', 1024)
+                self._report_generator = GenerateReport(cassette=cassette, settings=self.settings,
+                                                        client=openai_client, cache=LRUCache(cache_entries))
+            return self._report_generator
+
+    @property
+    def stage_executor(self) -> ThreadPoolExecutor:
+        """Thread pool running the stages of pipeline.analysis graphs."""
+        with self._lock:
+            if self._stage_executor is None:
+                self._stage_executor = ThreadPoolExecutor(max_workers=self.stage_workers,
+                                                          thread_name_prefix="stage")
+            return self._stage_executor
+
+    @property
+    def scoring_executor(self) -> ThreadPoolExecutor:
+        """Thread pool for the sentiment scoring calls, bounding OpenAI concurrency."""
+        with self._lock:
+            if self._scoring_executor is None:
+                self._scoring_executor = ThreadPoolExecutor(max_workers=self.scoring_workers,
+                                                            thread_name_prefix="scoring")
+            return self._scoring_executor
+
+    @property
+    def news_ingestor(self) -> NewsIngestor:
+        """Shared bulk NewsAPI ingestion; None unless newsapi.mode is 'bulk' (one query per ticker)."""
+        if not bulk_news_enabled(self.settings):
+            return None
+        http, cassette = self.http, self.cassette
+        with self._lock:
+            if self._news_ingestor is None:
+                self._news_ingestor = NewsIngestor.from_settings(self.settings, http=http, cassette=cassette)
+            return self._news_ingestor
+
+    def decayed_sentiment(self, ticker: str) -> DecayedSentiment:
+        """
+        Live time-decayed aggregator of a ticker, fed by every analysis of the process;
+        None unless sentiment.aggregation is 'decayed'.
+        """
+        sentiment_config = self.settings.get('sentiment') or {}
+        if sentiment_config.get('aggregation', "flat") != "decayed":
+            return None
+        with self._lock:
+            if ticker not in self._decayed_sentiment:
+                self._decayed_sentiment[ticker] = DecayedSentiment(
+                    sentiment_config.get('half_life_hours'), min_weight=float(sentiment_config.get('min_weight', 0.0)))
+            return self._decayed_sentiment[ticker]
+
+    def warm_up(self, background: bool = False):
+        """
+        Build every shared client ahead of the first request.
+
+        Failures (e.g. missing API keys) are reported but not raised, so that the
+        app still starts; the same error then surfaces in the request that needs
+        the client. With background=True the clients (and their libraries, which
+        are imported lazily) are built on a daemon thread so startup is not delayed.
+        """
+        if background:
+            threading.Thread(target=self.warm_up, name="warm-up", daemon=True).start()
+            return
+
+        for name, build in (("cassette", lambda: self.cassette),
+                            ("http", lambda: self.http),
+                            ("openai", lambda: self.openai_client),
+                            ("reddit", lambda: self.reddit_pool.warm(1))):
+            try:
+                build()
+            except Exception as e:
+                logger.warning("Warm-up of %s client failed: %s", name, e)
+
+    @contextmanager
+    def request_handles(self, ticker: str, corpus_cache: dict = None, score_memo: dict = None):
+        """
+        Pipeline objects for one /analyze request.
+
+        The objects are cheap wrappers around the shared clients; the Reddit
+        client is returned to the pool when the block exits.
+
+        Args:
+            ticker (str): Upper-case ticker.
+            corpus_cache (dict, optional): Reddit comment cache shared by the tickers of a watchlist.
+            score_memo (dict, optional): Known sentiment scores by (text, ticker), see SentimentAnalyzer.
+        """
+        cassette = self.cassette
+        with self.reddit_pool.acquire() as reddit:
+            price_fetcher = PriceFetcher(cassette=cassette)
+            yield RequestHandles(
+                ticker=ticker,
+                price_fetcher=price_fetcher,
+                sentiment_fetcher=SentimentFetcher(cassette=cassette, settings=self.settings,
+                                                   reddit=reddit, http=self.http,
+                                                   corpus_cache=corpus_cache,
+                                                   news_ingestor=self.news_ingestor),
+                sentiment_cleaner=SentimentCleaner(),
+                sentiment_analyzer=SentimentAnalyzer(cassette=cassette, settings=self.settings,
+                                                     client=self.openai_client,
+                                                     executor=self.scoring_executor,
+                                                     score_memo=score_memo,
+                                                     decayed=self.decayed_sentiment(ticker)),
+                indicators=TechnicalIndicators(ticker, price_fetcher=price_fetcher),
+                report_generator=self.report_generator,
+            )
+
+
+_services = None
+_services_lock = threading.Lock()
+
+
+def get_services() -> ServiceContainer:
+    """Process-wide ServiceContainer, created on first use."""
+    global _services
+    with _services_lock:
+        if _services is None:
+            _services = ServiceContainer()
+        return _services
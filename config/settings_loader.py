@@ -0,0 +1,31 @@
+import os
+import threading
+import yaml
+
+DEFAULT_SETTINGS_PATH = os.path.join(os.path.dirname(__file__), "settings.yaml")
+
+_settings_cache = {}
+_settings_lock = threading.Lock()
+
+
+def load_settings(config_path: str = None) -> dict:
+    """
+    Load config/settings.yaml (or config_path) once per process.
+
+    The parsed dict is cached by absolute path and shared by every caller, so
+    it must be treated as read-only.
+
+    Args:
+        config_path (str, optional): Path of the YAML file. Default: $HTA_SETTINGS if set,
+            otherwise config/settings.yaml.
+
+    Returns:
+        dict: Parsed settings.
+    """
+    # HTA_SETTINGS: configurazione alternativa per tutto il processo (es. il load test)
+    path = os.path.abspath(config_path or os.environ.get("HTA_SETTINGS") or DEFAULT_SETTINGS_PATH)
+    with _settings_lock:
+        if path not in _settings_cache:
+            with open(path, 'r') as file:
+                _settings_cache[path] = yaml.safe_load(file)
+        return _settings_cache[path]
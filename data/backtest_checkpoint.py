@@ -0,0 +1,92 @@
+import hashlib
+import json
+import logging
+import os
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class BacktestCheckpoint:
+    """Append-only per-day store of backtest features, keyed by a hash of the run configuration."""
+
+    def __init__(self, key_fields: dict, checkpoint_dir: str = None):
+        """
+        Open (or create) the checkpoint for a run configuration.
+
+        Args:
+            key_fields (dict): Everything that determines the stored features
+                (ticker, sentiment window, model, ...). Strategy parameters should
+                not be included, so that strategy-only changes reuse the store.
+            checkpoint_dir (str, optional): Directory of the store. Default: 'checkpoints'
+                next to the project root.
+        """
+        if checkpoint_dir is None:
+            checkpoint_dir = os.path.join(os.path.dirname(__file__), "..", "checkpoints")
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+        self.key_fields = key_fields
+        self.key = self.config_hash(key_fields)
+        self.path = os.path.join(checkpoint_dir, f"{self.key}.jsonl")
+        self.records = self._load()
+
+    @staticmethod
+    def config_hash(key_fields: dict) -> str:
+        """Stable short hash of the configuration fields."""
+        payload = json.dumps(key_fields, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    def _load(self) -> dict:
+        records = {}
+        if not os.path.exists(self.path):
+            return records
+
+        # Un crash durante la scrittura può lasciare l'ultima riga incompleta: la si elimina
+        with open(self.path, "rb+") as file:
+            content = file.read()
+            if content and not content.endswith(b"\n"):
+                file.truncate(content.rfind(b"\n") + 1)
+
+        with open(self.path, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get("_type") == "header":
+                    continue
+                if record.get("RSI") is None:
+                    # Giorno senza indicatori (checkpoint di versioni precedenti): va ricalcolato
+                    continue
+                records[record["Date"]] = record
+        if records:
+            logger.info("Checkpoint %s: %d giorni già calcolati", self.key, len(records))
+        return records
+
+    @staticmethod
+    def _date_key(date) -> str:
+        return pd.Timestamp(date).isoformat()
+
+    def __contains__(self, date) -> bool:
+        return self._date_key(date) in self.records
+
+    def get(self, date) -> dict:
+        """Stored features for a day, or None."""
+        return self.records.get(self._date_key(date))
+
+    def append(self, date, features: dict):
+        """
+        Persist the features of one day.
+
+        The line is flushed and fsync'ed before returning, so a crash loses at
+        most the day being computed.
+        """
+        record = {"Date": self._date_key(date), **features}
+        new_file = not os.path.exists(self.path)
+        with open(self.path, "a", encoding="utf-8") as file:
+            if new_file:
+                file.write(json.dumps({"_type": "header", "key": self.key, **self.key_fields}, default=str) + "\n")
+            file.write(json.dumps(record, default=float) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        self.records[record["Date"]] = record
@@ -1,33 +1,51 @@
-import praw
-import requests
+import logging
 import pandas as pd
-import yaml
+from config.settings_loader import load_settings
+from monitoring.metrics import external_call
 import re
-import os
+from typing import TYPE_CHECKING
 from datetime import datetime, timedelta, timezone
-import yfinance as yf 
 from config.backtest_config import BacktestConfig
+from data.cassette import Cassette
+from data.sentiment_fetcher import NEWSAPI_URL, reddit_endpoints
+
+if TYPE_CHECKING:
+    import praw
+    import requests
+    from data.news_ingest import NewsIngestor
+
+logger = logging.getLogger(__name__)
 
 class SentimentFetcher:
     """Fetches sentiment data from Reddit and NewsAPI with in-memory caching."""
 
-    def __init__(self, config_path: str = None):
-        if config_path is None:
-            config_path = os.path.join(os.path.dirname(__file__), "..", "config", "settings.yaml")
-        with open(config_path, 'r') as file:
-            config = yaml.safe_load(file)
+    def __init__(self, config_path: str = None, cassette: Cassette = None, settings: dict = None,
+                 reddit: 'praw.Reddit' = None, http: 'requests.Session' = None,
+                 news_ingestor: 'NewsIngestor' = None):
+        config = settings or load_settings(config_path)
 
-        reddit_config = config['reddit']
-        self.reddit = praw.Reddit(
-            client_id=reddit_config['client_id'],
-            client_secret=reddit_config['client_secret'],
-            username=reddit_config['username'],
-            password=reddit_config['password'],
-            user_agent=reddit_config['user_agent']
-        )
+        self.cassette = cassette or Cassette.from_settings(config)
 
+        reddit_config = config['reddit']
+        if reddit is None:
+            import praw
+            reddit = praw.Reddit(
+                client_id=reddit_config['client_id'],
+                client_secret=reddit_config['client_secret'],
+                username=reddit_config['username'],
+                password=reddit_config['password'],
+                user_agent=reddit_config['user_agent'],
+                **reddit_endpoints(reddit_config)
+            )
+        self.reddit = reddit
+
+        if http is None:
+            import requests as http
+        self.http = http
         self.newsapi_key = config['newsapi']['api_key']
-        self.newsapi_url = "https://newsapi.org/v2/everything"
+        self.newsapi_url = config['newsapi'].get('url') or NEWSAPI_URL
+        # Con l'ingestione bulk i giorni di un intervallo già scaricato non interrogano NewsAPI
+        self.news_ingestor = news_ingestor
         self.cache = {}
 
     def fetch_sentiment_data(self, ticker: str, start_time, end_time, 
@@ -38,53 +56,91 @@ class SentimentFetcher:
         if news_sources is None:
             news_sources = []
 
-        data = []
-
         cache_key = f"{ticker}_{start_time.date()}_{end_time.date()}_{'_'.join(subreddits)}"
         if cache_key in self.cache:
-            print(f"Using cached sentiment data for {cache_key}")
+            logger.debug("Using cached sentiment data for %s", cache_key)
             return self.cache[cache_key]
 
+        request = {"ticker": ticker, "start_time": start_time.isoformat(), "end_time": end_time.isoformat(),
+                   "subreddits": subreddits, "news_sources": news_sources}
+        if self.news_ingestor is not None:
+            request["news"] = "bulk"
+        return self.cassette.call(
+            "sentiment.backtest",
+            request,
+            lambda: self._fetch_from_sources(ticker, start_time, end_time, subreddits, news_sources),
+            composite=True,
+        )
+
+    def _fetch_from_sources(self, ticker: str, start_time, end_time, subreddits: list, news_sources: list) -> pd.DataFrame:
+        """
+        Query Reddit and NewsAPI (the network part of fetch_sentiment_data).
 
+        A failing source is skipped; its errors are listed in df.attrs['fetch_errors'],
+        so callers can tell an incomplete window from one without documents.
+        """
+        data = []
+        errors = []
 
         for subreddit_name in subreddits:
             try:
                 subreddit = self.reddit.subreddit(subreddit_name)
-                print(f"Searching Reddit r/{subreddit_name} for {ticker}")
+                logger.debug("Searching Reddit r/%s for %s", subreddit_name, ticker)
                 results_count = 0
-                for submission in subreddit.search(f"{ticker}", limit=200, time_filter="all"):
+                with external_call("reddit.search"):
+                    submissions = list(subreddit.search(f"{ticker}", limit=200, time_filter="all"))
+                for submission in submissions:
                     created_at = datetime.fromtimestamp(submission.created_utc)
                     if not (start_time <= created_at < end_time):
                         continue
                     text = submission.title + " " + (submission.selftext or "")
                     if not re.search(r'\b' + re.escape(ticker), text, re.IGNORECASE):
                         continue
-                    print(f"Reddit r/{subreddit_name} post: {text[:50]}...")
+                    logger.debug("Reddit r/%s post: %s...", subreddit_name, text[:50])
                     data.append({
                         "timestamp": created_at,
                         "text": text,
                         "source": f"reddit_{subreddit_name}",
                         "ticker": ticker
                     })
-                    submission.comments.replace_more(limit=0)
-                    for comment in submission.comments.list()[:20]:
+                    with external_call("reddit.comments"):
+                        submission.comments.replace_more(limit=0)
+                        comments = submission.comments.list()[:20]
+                    for comment in comments:
                         if comment.created_utc < start_time.timestamp():
                             continue
                         if not re.search(r'\b' + re.escape(ticker) + r'\b.*(stock|price|earnings|invest|apple)', comment.body, re.IGNORECASE):
                             continue
-                        print(f"Reddit r/{subreddit_name} comment: {comment.body[:50]}...")
+                        logger.debug("Reddit r/%s comment: %s...", subreddit_name, comment.body[:50])
                         data.append({
                             "timestamp": datetime.fromtimestamp(comment.created_utc, tz=timezone.utc),
                             "text": comment.body,
                             "source": f"reddit_{subreddit_name}",
                             "ticker": ticker
                         })
-                print(f"Reddit r/{subreddit_name} returned {len([d for d in data if d['source'] == f'reddit_{subreddit_name}'])} items")
+                logger.debug("Reddit r/%s returned %d items for %s", subreddit_name,
+                             sum(1 for d in data if d['source'] == f'reddit_{subreddit_name}'), ticker)
             except Exception as e:
-                print(f"Error fetching from Reddit r/{subreddit_name}: {str(e)}")
+                logger.warning("Error fetching from Reddit r/%s: %s", subreddit_name, e)
+                errors.append(f"reddit r/{subreddit_name}: {e}")
 
 
      #NewsAPI           
+        if self.news_ingestor is not None:
+            try:
+                articles = self.news_ingestor.articles(ticker, start_time, end_time, news_sources=news_sources)
+            except Exception as e:
+                logger.warning("Error fetching from NewsAPI: %s", e)
+                errors.append(f"newsapi: {e}")
+                articles = []
+            logger.debug("NewsAPI bulk ingestion returned %d articles for %s", len(articles), ticker)
+            # Il backtest lavora con orari senza fuso
+            data.extend({"timestamp": published_at.replace(tzinfo=None), "text": title, "source": "news",
+                         "ticker": ticker} for published_at, title in articles)
+            df = pd.DataFrame(data)
+            df.attrs['fetch_errors'] = errors
+            return df
+
         try:
             news_query = ticker_to_company(ticker)
             params = {
@@ -97,11 +153,12 @@ class SentimentFetcher:
             }
             if news_sources:
                 params["sources"] = ",".join(news_sources)
-            print(f"Searching NewsAPI with query: {news_query}")
-            response = requests.get(self.newsapi_url, params=params)
-            response.raise_for_status()
-            articles = response.json().get("articles", [])
-            print(f"NewsAPI returned {len(articles)} articles for {news_query}")
+            logger.debug("Searching NewsAPI with query: %s", news_query)
+            with external_call("newsapi.everything"):
+                response = self.http.get(self.newsapi_url, params=params)
+                response.raise_for_status()
+                articles = response.json().get("articles", [])
+            logger.debug("NewsAPI returned %d articles for %s", len(articles), news_query)
             for article in articles[:50]:
                 try:
                     published_at_str = article.get("publishedAt")
@@ -113,7 +170,7 @@ class SentimentFetcher:
                     title = article.get("title", "")
                     if not title:
                         continue
-                    print(f"NewsAPI article added: {title[:50]}...")
+                    logger.debug("NewsAPI article added: %s...", title[:50])
                     data.append({
                         "timestamp": published_at,
                         "text": title,
@@ -121,19 +178,23 @@ class SentimentFetcher:
                         "ticker": ticker
                     })
                 except Exception as e:
-                    print(f"NewsAPI article skipped: error processing {str(e)}")
+                    logger.debug("NewsAPI article skipped: error processing %s", e)
         except Exception as e:
-            print(f"Error fetching from NewsAPI: {str(e)}")
+            logger.warning("Error fetching from NewsAPI: %s", e)
+            errors.append(f"newsapi: {e}")
 
         df = pd.DataFrame(data)
+        df.attrs['fetch_errors'] = errors
         return df
 
 def ticker_to_company(ticker: str) -> str:
+    import yfinance as yf
     try:
-        info = yf.Ticker(ticker).info
+        with external_call("yahoo.info"):
+            info = yf.Ticker(ticker).info
         return info.get("shortName") or info.get("longName") or ticker
     except Exception as e:
-        print(f"Errore ottenendo nome azienda per {ticker}: {e}")
+        logger.warning("Errore ottenendo nome azienda per %s: %s", ticker, e)
         return ticker
 
 
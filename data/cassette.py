@@ -0,0 +1,118 @@
+import gzip
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from config.settings_loader import load_settings
+from monitoring.metrics import cache_lookup, external_call
+
+CASSETTE_MODES = ("passthrough", "record", "replay")
+
+
+class CassetteMissError(LookupError):
+    """Raised in replay mode when a request was never recorded."""
+
+
+class Cassette:
+    """
+    Record/replay layer for external providers (Yahoo Finance, Reddit, NewsAPI, OpenAI).
+
+    - passthrough: every call goes to the provider (default).
+    - record: every call goes to the provider and its response is archived.
+    - replay: responses are served from the archive, with no network access.
+
+    Each response is stored as a gzip-compressed pickle named after the hash of
+    the provider and request, so replayed runs are bit-for-bit reproducible and
+    several processes can record into the same archive.
+    """
+
+    def __init__(self, mode: str = "passthrough", path: str = None):
+        """
+        Args:
+            mode (str): One of CASSETTE_MODES. Default: 'passthrough'.
+            path (str, optional): Archive directory. Default: 'cassettes' next to the project root.
+        """
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Invalid cassette mode '{mode}', expected one of {CASSETTE_MODES}")
+        if path is None:
+            path = os.path.join(os.path.dirname(__file__), "..", "cassettes")
+        self.mode = mode
+        self.path = os.path.abspath(path)
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_settings(cls, settings: dict = None, config_path: str = None):
+        """
+        Build the cassette from the 'cassette' section of settings.yaml.
+
+        The HTA_CASSETTE_MODE and HTA_CASSETTE_PATH environment variables take
+        precedence, so a backtest can be recorded or replayed without editing
+        the configuration.
+        """
+        if settings is None:
+            settings = load_settings(config_path)
+
+        section = (settings or {}).get('cassette') or {}
+        mode = os.environ.get("HTA_CASSETTE_MODE") or section.get('mode') or "passthrough"
+        path = os.environ.get("HTA_CASSETTE_PATH") or section.get('path')
+        if path and not os.path.isabs(path):
+            # I percorsi relativi in settings.yaml sono relativi alla radice del progetto
+            path = os.path.join(os.path.dirname(__file__), "..", path)
+        return cls(mode, path)
+
+    @staticmethod
+    def request_key(provider: str, request: dict) -> str:
+        payload = json.dumps({"provider": provider, "request": request}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, provider: str, key: str) -> str:
+        return os.path.join(self.path, provider, f"{key}.pkl.gz")
+
+    def call(self, provider: str, request: dict, fetch, composite: bool = False):
+        """
+        Serve a provider call according to the cassette mode.
+
+        Args:
+            provider (str): Provider/endpoint name, e.g. 'yahoo.history' or 'openai.chat'.
+            request (dict): Everything that identifies the request (JSON-serializable).
+            fetch (callable): Zero-argument function performing the live call.
+            composite (bool): fetch makes several provider calls that time themselves
+                (e.g. 'sentiment.live': Reddit + NewsAPI); the entry is recorded and
+                replayed as one, but not counted as an external call. Default: False.
+
+        Returns:
+            The live or replayed response. Live calls are timed and counted per
+            provider, replayed ones as cassette cache hits (monitoring.metrics).
+        """
+        if composite:
+            live_call = fetch
+        else:
+            def live_call():
+                with external_call(provider):
+                    return fetch()
+
+        if self.mode == "passthrough":
+            return live_call()
+
+        entry_path = self._entry_path(provider, self.request_key(provider, request))
+
+        if self.mode == "replay":
+            if not os.path.exists(entry_path):
+                self.misses += 1
+                cache_lookup("cassette", provider, hit=False)
+                raise CassetteMissError(f"No recorded response for {provider} {request}")
+            self.hits += 1
+            cache_lookup("cassette", provider, hit=True)
+            with gzip.open(entry_path, "rb") as file:
+                return pickle.load(file)
+
+        response = live_call()
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        # Scrittura atomica: i processi concorrenti non leggono mai un file parziale
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(entry_path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as file:
+            pickle.dump(response, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, entry_path)
+        return response
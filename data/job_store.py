@@ -0,0 +1,142 @@
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import closing, contextmanager
+from config.settings_loader import load_settings
+
+JOB_STATUSES = ("queued", "running", "done", "failed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    ticker TEXT NOT NULL,
+    rsi_mode TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS job_events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    payload TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS job_events_job ON job_events (job_id, seq);
+"""
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, default=str)
+
+
+class JobStore:
+    """
+    SQLite-backed queue of analysis jobs and their per-stage progress events.
+
+    Every call opens its own short-lived connection, so the store can be used
+    from any thread and by several processes (e.g. gunicorn workers) at once;
+    claiming a job is atomic across all of them.
+    """
+
+    def __init__(self, path: str = None):
+        """
+        Args:
+            path (str, optional): Database file. Default: 'cache/jobs.sqlite3' next to the project root.
+        """
+        if path is None:
+            path = os.path.join(os.path.dirname(__file__), "..", "cache", "jobs.sqlite3")
+        self.path = os.path.abspath(path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @classmethod
+    def from_settings(cls, settings: dict = None, config_path: str = None):
+        """Build the store from the 'jobs' section of settings.yaml."""
+        if settings is None:
+            settings = load_settings(config_path)
+
+        path = ((settings or {}).get('jobs') or {}).get('path')
+        if path and not os.path.isabs(path):
+            # I percorsi relativi in settings.yaml sono relativi alla radice del progetto
+            path = os.path.join(os.path.dirname(__file__), "..", path)
+        return cls(path)
+
+    @contextmanager
+    def _connect(self):
+        with closing(sqlite3.connect(self.path, timeout=30, isolation_level=None)) as conn:
+            conn.row_factory = sqlite3.Row
+            yield conn
+
+    def submit(self, ticker: str, rsi_mode: str) -> str:
+        """Queue an analysis and return its job ID."""
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute("INSERT INTO jobs (id, ticker, rsi_mode, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+                         (job_id, ticker, rsi_mode, time.time()))
+        return job_id
+
+    def claim(self) -> dict:
+        """Mark the oldest queued job as running and return it (None if the queue is empty)."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT id, ticker, rsi_mode FROM jobs WHERE status = 'queued' "
+                                   "ORDER BY created_at LIMIT 1").fetchone()
+                if row is not None:
+                    conn.execute("UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?",
+                                 (time.time(), row['id']))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return dict(row) if row is not None else None
+
+    def add_event(self, job_id: str, stage: str, payload: dict = None):
+        """Record the completion of a stage, with its partial result."""
+        with self._connect() as conn:
+            conn.execute("INSERT INTO job_events (job_id, stage, payload, created_at) VALUES (?, ?, ?, ?)",
+                         (job_id, stage, _dumps(payload), time.time()))
+
+    def complete(self, job_id: str, result: dict):
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET status = 'done', finished_at = ?, result = ? WHERE id = ?",
+                         (time.time(), _dumps(result), job_id))
+
+    def fail(self, job_id: str, error: str):
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET status = 'failed', finished_at = ?, error = ? WHERE id = ?",
+                         (time.time(), error, job_id))
+
+    def requeue_stale(self, timeout: float) -> int:
+        """Put jobs running for more than timeout seconds (crashed worker) back in the queue; returns how many."""
+        with self._connect() as conn:
+            return conn.execute("UPDATE jobs SET status = 'queued', started_at = NULL "
+                                "WHERE status = 'running' AND started_at < ?",
+                                (time.time() - timeout,)).rowcount
+
+    def get(self, job_id: str) -> dict:
+        """Job status and result (None if the ID is unknown)."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def events(self, job_id: str, after: int = 0) -> list:
+        """Progress events of a job with seq > after, oldest first."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT seq, stage, payload, created_at FROM job_events "
+                                "WHERE job_id = ? AND seq > ? ORDER BY seq", (job_id, after)).fetchall()
+        return [{'seq': row['seq'], 'stage': row['stage'], 'created_at': row['created_at'],
+                 'payload': json.loads(row['payload']) if row['payload'] else None} for row in rows]
@@ -0,0 +1,342 @@
+import logging
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from urllib.parse import quote
+
+from config.settings_loader import load_settings
+from data.cassette import Cassette
+from data.sentiment_fetcher import NEWSAPI_URL, ticker_to_company
+
+NEWS_MODES = ("per_ticker", "bulk")
+MAX_QUERY_LENGTH = 500   # limite di NewsAPI per q, URL-encoded
+PAGE_SIZE = 100          # massimo di NewsAPI per pagina
+
+# Suffissi societari che gli articoli di solito omettono ("Apple Inc." -> "Apple")
+_COMPANY_SUFFIX = re.compile(
+    r"(,?\s+(inc|incorporated|corp|corporation|co|company|ltd|limited|plc|llc|lp|holdings?|group|"
+    r"n\.?v|s\.?a|ag|se|class [a-c])\.?|\.com)$", re.IGNORECASE)
+
+logger = logging.getLogger(__name__)
+
+
+def _utc(value: datetime) -> datetime:
+    # Gli orari senza fuso (backtest) sono UTC
+    if value is None:
+        return None
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def bulk_news_enabled(settings: dict) -> bool:
+    """True if newsapi.mode in settings.yaml is 'bulk'."""
+    mode = ((settings or {}).get('newsapi') or {}).get('mode', "per_ticker")
+    if mode not in NEWS_MODES:
+        raise ValueError(f"Invalid newsapi mode '{mode}', expected one of {NEWS_MODES}")
+    return mode == "bulk"
+
+
+def company_alias(name: str) -> str:
+    """Name used to query and match news about a company: the short name without corporate suffixes."""
+    alias = name.strip()
+    while True:
+        stripped = _COMPANY_SUFFIX.sub("", alias).strip(" ,")
+        if stripped == alias or not stripped:
+            return alias
+        alias = stripped
+
+
+def pack_queries(aliases: dict, max_length: int = MAX_QUERY_LENGTH, max_names: int = None) -> list:
+    """
+    Pack quoted company names into as few OR-combined NewsAPI queries as the length limit allows.
+
+    Args:
+        aliases (dict): ticker -> name to search for.
+        max_length (int): Maximum URL-encoded length of one query. Default: 500.
+        max_names (int, optional): Maximum names per query. Default: no limit.
+
+    Returns:
+        list: (query, tickers) pairs, in ticker order. A name longer than the
+        limit gets a query of its own.
+    """
+    queries, phrases, tickers = [], [], []
+    for ticker, alias in aliases.items():
+        phrase = '"' + alias.replace('"', "") + '"'
+        candidate = " OR ".join(phrases + [phrase])
+        if phrases and (len(quote(candidate)) > max_length or (max_names and len(phrases) >= max_names)):
+            queries.append((" OR ".join(phrases), tickers))
+            phrases, tickers = [], []
+        phrases.append(phrase)
+        tickers.append(ticker)
+    if phrases:
+        queries.append((" OR ".join(phrases), tickers))
+    return queries
+
+
+def route_articles(articles: list, aliases: dict, tickers: list) -> dict:
+    """
+    Assign the articles of one query to every ticker they mention.
+
+    An article belongs to a ticker when its title, description or content
+    contains the company name (whole words, any case) or the ticker as a
+    cashtag or exchange symbol ('$NVDA', '(NVDA)', 'NASDAQ: NVDA'). The
+    articles of a single-ticker query all belong to that ticker, as with the
+    per-ticker queries.
+
+    Returns:
+        dict: ticker -> list of (published_at, title), for every ticker of the query.
+    """
+    routed = {ticker: [] for ticker in tickers}
+    patterns = {ticker: re.compile(r"(?i:\b" + re.escape(aliases[ticker]) + r"\b)|(\$|\(|:\s?)"
+                                   + re.escape(ticker) + r"\b") for ticker in tickers}
+    unmatched = 0
+    for article in articles:
+        title = article.get("title") or ""
+        try:
+            published_at = datetime.strptime(article.get("publishedAt") or "", "%Y-%m-%dT%H:%M:%SZ")
+        except ValueError:
+            continue
+        if not title:
+            continue
+        published_at = published_at.replace(tzinfo=timezone.utc)
+        if len(tickers) == 1:
+            routed[tickers[0]].append((published_at, title))
+            continue
+        text = " ".join(article.get(field) or "" for field in ("title", "description", "content"))
+        matches = [ticker for ticker in tickers if patterns[ticker].search(text)]
+        unmatched += not matches
+        for ticker in matches:
+            routed[ticker].append((published_at, title))
+    if unmatched:
+        logger.debug("%d NewsAPI articles matched no ticker of %s", unmatched, tickers)
+    return routed
+
+
+class NewsIngestor:
+    """
+    Bulk NewsAPI ingestion shared by the sentiment fetchers.
+
+    Instead of one 'everything' query per ticker and call, the company names of
+    many tickers (the requested one plus a universe, by default the precompute
+    watchlist) are packed into OR-combined queries, every page of each query is
+    read, and each article is routed locally to the tickers it mentions.
+    Articles are kept per time window, so the other tickers of the universe,
+    and every backtest day inside a prefetched range, cost no further request.
+
+    Thread-safe: concurrent requests for uncached tickers wait for one fetch.
+    """
+
+    def __init__(self, http=None, api_key: str = "", url: str = NEWSAPI_URL, cassette: Cassette = None,
+                 universe: list = (), max_query_length: int = MAX_QUERY_LENGTH, max_names_per_query: int = 10,
+                 max_results: int = 100, ttl: float = 900, chunk_days: float = 1):
+        """
+        Args:
+            http (requests.Session, optional): HTTP session. Default: module-level requests.
+            api_key (str): NewsAPI key.
+            url (str): 'everything' endpoint. Default: NEWSAPI_URL.
+            cassette (Cassette, optional): Record/replay layer for the NewsAPI pages.
+            universe (list): Tickers fetched together with any requested ticker.
+            max_query_length (int): Maximum URL-encoded length of a query. Default: 500.
+            max_names_per_query (int): Company names per query. The results of a query
+                are capped at max_results, so fewer names per query keep more articles
+                per company. Default: 10.
+            max_results (int): Articles read per query, in pages of 100 (the developer
+                plan stops at 100). Default: 100.
+            ttl (float): Seconds an open-ended (live) window stays fresh. Default: 900.
+            chunk_days (float): A closed window (e.g. a backtest range) is queried in
+                chunks of this many days. Results come newest first and are capped at
+                max_results, so one query for a long range would miss its oldest days.
+                Default: 1.
+        """
+        if http is None:
+            import requests as http
+        self.http = http
+        self.api_key = api_key
+        self.url = url
+        self.cassette = cassette or Cassette()
+        self.universe = [ticker.upper() for ticker in universe]
+        self.max_query_length = max_query_length
+        self.max_names_per_query = max_names_per_query
+        self.max_results = max_results
+        self.ttl = ttl
+        self.chunk_days = chunk_days
+        self.requests = 0
+        self._names = {}
+        self._windows = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings: dict = None, config_path: str = None, http=None, cassette: Cassette = None):
+        """Ingestor from the 'newsapi' section of settings.yaml (universe: newsapi.universe or precompute.watchlist)."""
+        if settings is None:
+            settings = load_settings(config_path)
+
+        section = settings.get('newsapi') or {}
+        universe = section.get('universe') or (settings.get('precompute') or {}).get('watchlist') or []
+        return cls(http=http, api_key=section.get('api_key', ""), url=section.get('url') or NEWSAPI_URL,
+                   cassette=cassette or Cassette.from_settings(settings), universe=universe,
+                   max_query_length=int(section.get('max_query_length', MAX_QUERY_LENGTH)),
+                   max_names_per_query=int(section.get('max_names_per_query', 10)),
+                   max_results=int(section.get('max_results', 100)),
+                   ttl=float(section.get('cache_minutes', 15)) * 60,
+                   chunk_days=float(section.get('chunk_days', 1)))
+
+    def alias(self, ticker: str) -> str:
+        if ticker not in self._names:
+            self._names[ticker] = company_alias(ticker_to_company(ticker))
+        return self._names[ticker]
+
+    def _window(self, ticker: str, start_time: datetime, end_time: datetime, sources: tuple):
+        now = time.time()
+        for window in self._windows:
+            # Una finestra aperta (live) scade dopo ttl; una chiusa resta valida
+            fresh = window['end'] is not None or now - window['fetched_at'] < self.ttl
+            covers = window['start'] <= start_time and (
+                window['end'] is None if end_time is None else window['end'] is None or window['end'] >= end_time)
+            if fresh and covers and window['sources'] == sources and ticker in window['articles']:
+                return window
+        return None
+
+    def articles(self, ticker: str, start_time: datetime, end_time: datetime = None, news_sources: list = None) -> list:
+        """
+        News about a ticker published in [start_time, end_time).
+
+        Args:
+            ticker (str): Upper-case ticker.
+            start_time, end_time (datetime): Window; naive times are taken as UTC.
+                end_time None means up to now.
+            news_sources (list, optional): NewsAPI source ids.
+
+        Returns:
+            list: (published_at, title) pairs, published_at timezone-aware (UTC), oldest first.
+
+        Raises:
+            RuntimeError: The NewsAPI query of the ticker failed (it is tried again on the next call).
+        """
+        start_time, end_time = _utc(start_time), _utc(end_time)
+        sources = tuple(news_sources or ())
+        with self._lock:
+            window = self._window(ticker, start_time, end_time, sources)
+            if window is None:
+                pending = [t for t in dict.fromkeys([ticker] + self.universe)
+                           if self._window(t, start_time, end_time, sources) is None]
+                window = self._fetch(pending, start_time, end_time, sources)
+        if ticker not in window['articles']:
+            raise RuntimeError(f"NewsAPI query failed for {ticker}: {window['errors'][ticker]}")
+        return [(published_at, title) for published_at, title in window['articles'][ticker]
+                if published_at >= start_time and (end_time is None or published_at < end_time)]
+
+    def prefetch(self, tickers: list, start_time: datetime, end_time: datetime = None, news_sources: list = None):
+        """Fetch one window for many tickers at once, e.g. a whole backtest range or a watchlist."""
+        start_time, end_time = _utc(start_time), _utc(end_time)
+        sources = tuple(news_sources or ())
+        with self._lock:
+            pending = [ticker for ticker in dict.fromkeys(ticker.upper() for ticker in tickers)
+                       if self._window(ticker, start_time, end_time, sources) is None]
+            if pending:
+                window = self._fetch(pending, start_time, end_time, sources)
+                if window['errors']:
+                    logger.warning("NewsAPI prefetch failed for %s; they are fetched again on request",
+                                   ", ".join(window['errors']))
+
+    def _fetch(self, tickers: list, start_time: datetime, end_time: datetime, sources: tuple) -> dict:
+        aliases = {ticker: self.alias(ticker) for ticker in tickers}
+        articles = {ticker: [] for ticker in tickers}
+        errors = {}
+        requests_before = self.requests
+        for query, query_tickers in pack_queries(aliases, self.max_query_length, self.max_names_per_query):
+            for chunk_start, chunk_end in self._chunks(start_time, end_time):
+                try:
+                    found, truncated = self._query(query, chunk_start, chunk_end, sources)
+                except Exception as e:
+                    logger.warning("Error fetching from NewsAPI (%s): %s", query, e)
+                    errors.update((ticker, f"{type(e).__name__}: {e}") for ticker in query_tickers)
+                    break
+                if truncated and chunk_end is not None:
+                    # Gli articoli arrivano dal più recente: mancano i più vecchi del tratto
+                    logger.warning("NewsAPI returned only %d articles for %s between %s and %s; older ones are "
+                                   "missing (lower newsapi.chunk_days or max_names_per_query)",
+                                   len(found), query, chunk_start, chunk_end)
+                for ticker, items in route_articles(found, aliases, query_tickers).items():
+                    articles[ticker].extend(items)
+
+        for ticker in errors:
+            # Senza finestra il ticker viene riscaricato: un errore non diventa "nessuna notizia"
+            del articles[ticker]
+        seen = set()
+        for ticker, items in articles.items():
+            # Lo stesso articolo può arrivare da più pagine o query
+            items = sorted(set(items))
+            articles[ticker] = items
+            seen.update(items)
+        logger.info("NewsAPI bulk: %d articles for %d tickers in %d requests", len(seen), len(tickers),
+                    self.requests - requests_before)
+
+        window = {'start': start_time, 'end': end_time, 'sources': sources, 'fetched_at': time.time(),
+                  'articles': articles, 'errors': errors}
+        # Le finestre aperte scadute non servono più
+        self._windows = [w for w in self._windows if w['end'] is not None or time.time() - w['fetched_at'] < self.ttl]
+        if articles:
+            self._windows.append(window)
+        return window
+
+    def _chunks(self, start_time: datetime, end_time: datetime) -> list:
+        """[start, end) pieces of chunk_days each; an open-ended (live) window is a single piece."""
+        if end_time is None or self.chunk_days <= 0:
+            return [(start_time, end_time)]
+        step = timedelta(days=self.chunk_days)
+        chunks = []
+        while start_time < end_time:
+            chunks.append((start_time, min(start_time + step, end_time)))
+            start_time += step
+        return chunks
+
+    def _query(self, query: str, start_time: datetime, end_time: datetime, sources: tuple) -> tuple:
+        """
+        Every page of one query (up to max_results articles), newest first.
+
+        Returns:
+            Tuple[list, bool]: The articles, and whether more matched than were read.
+        """
+        params = {
+            "q": query,
+            "language": "en",
+            "from": start_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "sortBy": "publishedAt",
+            "pageSize": PAGE_SIZE,
+        }
+        if end_time is not None:
+            params["to"] = end_time.strftime("%Y-%m-%dT%H:%M:%SZ")
+        if sources:
+            params["sources"] = ",".join(sources)
+
+        articles = []
+        truncated = False
+        page = 1
+        while len(articles) < self.max_results:
+            request = dict(params, page=page)
+            body = self.cassette.call("newsapi.everything", request, lambda: self._get(request))
+            self.requests += 1
+            if body.get("code") == "maximumResultsReached":
+                logger.info("NewsAPI result limit reached after %d articles for %s", len(articles), query)
+                truncated = True
+                break
+            batch = body.get("articles", [])
+            articles.extend(batch)
+            # Una pagina non piena è l'ultima, anche se totalResults è una stima più alta
+            truncated = len(batch) == PAGE_SIZE and len(articles) < body.get("totalResults", 0)
+            if not truncated:
+                break
+            page += 1
+        truncated = truncated or len(articles) > self.max_results
+        return articles[:self.max_results], truncated
+
+    def _get(self, params: dict) -> dict:
+        response = self.http.get(self.url, params=dict(params, apiKey=self.api_key))
+        if response.status_code in (400, 426):
+            body = response.json()
+            # Oltre il limite del piano NewsAPI risponde con un errore: è la fine della paginazione
+            if body.get("code") == "maximumResultsReached":
+                return body
+        response.raise_for_status()
+        return response.json()
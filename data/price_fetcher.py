@@ -1,30 +1,52 @@
-import yfinance as yf
+import logging
 import pandas as pd
+from data.cassette import Cassette
+
+logger = logging.getLogger(__name__)
+
+
+def _yfinance():
+    # Import al primo download: yfinance è lento da importare e non serve in modalità replay
+    import yfinance
+    return yfinance
+
 
 class PriceFetcher:
     """Fetches price data from Yahoo Finance."""
 
+    def __init__(self, cassette: Cassette = None):
+        """
+        Args:
+            cassette (Cassette, optional): Record/replay layer. Default: from config/settings.yaml.
+        """
+        self.cassette = cassette or Cassette.from_settings()
+
     def fetch_price_data(self, ticker: str, period: str = "1y", interval: str = "1d") -> pd.DataFrame:
         
-        stock = yf.Ticker(ticker)
-        df = stock.history(period=period, interval=interval)
+        df = self.cassette.call(
+            "yahoo.history",
+            {"ticker": ticker, "period": period, "interval": interval},
+            lambda: _yfinance().Ticker(ticker).history(period=period, interval=interval),
+        )
 
         if df.empty:
-            print(f"No price data for {ticker}")
+            logger.warning("No price data for %s", ticker)
             return pd.DataFrame()
 
-        print("Preview of data fetched:")
         return df[['Open', 'High', 'Low', 'Close', 'Volume']]
 
 
     
     def fetch_latest_price(self, ticker: str) -> dict:
         
-        stock = yf.Ticker(ticker)
-        df = stock.history(period="1d", interval="1m")
+        df = self.cassette.call(
+            "yahoo.history",
+            {"ticker": ticker, "period": "1d", "interval": "1m"},
+            lambda: _yfinance().Ticker(ticker).history(period="1d", interval="1m"),
+        )
 
         if df.empty:
-            print(f"No latest price data for {ticker}")
+            logger.warning("No latest price data for %s", ticker)
             return {}
 
         latest = df.iloc[-1]
@@ -35,6 +57,51 @@ class PriceFetcher:
             "volume": latest["Volume"]
         }
 
+    def fetch_info(self, ticker: str) -> dict:
+        """Company information from Yahoo Finance (name, trailing P/E, ...)."""
+        return self.cassette.call(
+            "yahoo.info",
+            {"ticker": ticker},
+            lambda: dict(_yfinance().Ticker(ticker).info),
+        )
+
+    def fetch_price_panel(self, tickers: list, period: str = "1y", interval: str = "1d") -> dict:
+        """
+        Price history of several tickers with a single Yahoo Finance download.
+
+        Args:
+            tickers (list): Ticker symbols.
+            period (str): Data period. Default: '1y'.
+            interval (str): Data interval. Default: '1d'.
+
+        Returns:
+            dict: Ticker -> OHLCV DataFrame (same columns as fetch_price_data); tickers
+            without data are left out.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        if not tickers:
+            return {}
+
+        df = self.cassette.call(
+            "yahoo.download",
+            {"tickers": tickers, "period": period, "interval": interval},
+            lambda: _yfinance().download(tickers, period=period, interval=interval, group_by="ticker",
+                                         auto_adjust=True, progress=False, threads=True),
+        )
+
+        panel = {}
+        for ticker in tickers:
+            if df.empty or ticker not in df.columns.get_level_values(0):
+                logger.warning("No price data for %s", ticker)
+                continue
+            # Le date sono allineate tra i ticker: le righe senza scambi del singolo ticker sono NaN
+            ticker_df = df[ticker][['Open', 'High', 'Low', 'Close', 'Volume']].dropna(subset=['Close'])
+            if ticker_df.empty:
+                logger.warning("No price data for %s", ticker)
+                continue
+            panel[ticker] = ticker_df
+        return panel
+
 if __name__ == "__main__":
     # Example usage
     fetcher = PriceFetcher()
@@ -0,0 +1,252 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from config.settings_loader import load_settings
+from monitoring.metrics import cache_lookup
+
+try:
+    import fcntl
+except ImportError:  # Windows: niente coalescenza tra processi, solo tra thread
+    fcntl = None
+
+_MISS = object()
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU mapping of at most max_entries items."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._items:
+                return default
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._items
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+
+class ResultCache:
+    """
+    Two-tier cache of analysis results keyed by (ticker, rsi_mode, freshness bucket).
+
+    Time is divided into buckets of ttl seconds: every request for the same
+    ticker and RSI profile within a bucket gets the same result, so a hot
+    ticker costs one pipeline run per bucket.
+
+    - Memory tier: per-process LRU of at most max_entries results.
+    - Disk tier: gzip pickles under path, shared by every worker process.
+
+    Concurrent misses for the same key are coalesced: threads of one process
+    wait on the in-flight computation, and processes serialize on a file lock
+    and re-read the disk tier, so only the first one runs the pipeline.
+    """
+
+    def __init__(self, ttl: int = 300, max_entries: int = 256, path: str = None):
+        """
+        Args:
+            ttl (int): Bucket width in seconds; 0 disables the cache (every request
+                runs the pipeline, e.g. to load-test it). Default: 300.
+            max_entries (int): Size of the in-process LRU tier. Default: 256.
+            path (str, optional): Disk tier directory. Default: 'cache/results' next to the project root.
+        """
+        if ttl < 0:
+            raise ValueError(f"ttl must be positive (or 0 to disable the cache), got {ttl}")
+        if path is None:
+            path = os.path.join(os.path.dirname(__file__), "..", "cache", "results")
+        self.ttl = ttl
+        self.enabled = ttl > 0
+        self.max_entries = max_entries
+        self.path = os.path.abspath(path)
+        self._memory = LRUCache(max_entries)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._last_prune = None
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'coalesced': 0, 'computed': 0}
+
+    @classmethod
+    def from_settings(cls, settings: dict = None, config_path: str = None):
+        """Build the cache from the 'result_cache' section of settings.yaml."""
+        if settings is None:
+            settings = load_settings(config_path)
+
+        section = (settings or {}).get('result_cache') or {}
+        path = section.get('path')
+        if path and not os.path.isabs(path):
+            # I percorsi relativi in settings.yaml sono relativi alla radice del progetto
+            path = os.path.join(os.path.dirname(__file__), "..", path)
+        return cls(int(section.get('ttl_seconds', 300)), int(section.get('max_entries', 256)), path)
+
+    def bucket(self, now: float = None) -> int:
+        """Freshness bucket of a timestamp (default: now)."""
+        return int((time.time() if now is None else now) // self.ttl)
+
+    def _key(self, ticker: str, rsi_mode: str, variant: str) -> tuple:
+        return (variant, ticker, rsi_mode, self.bucket())
+
+    @staticmethod
+    def _stem(key: tuple) -> str:
+        digest = hashlib.sha256(json.dumps(key).encode("utf-8")).hexdigest()[:32]
+        return f"{key[-1]}-{digest}"
+
+    def _disk_get(self, key: tuple):
+        entry_path = os.path.join(self.path, self._stem(key) + ".pkl.gz")
+        try:
+            with gzip.open(entry_path, "rb") as file:
+                return pickle.load(file)
+        except FileNotFoundError:
+            return _MISS
+        except Exception as e:
+            logger.warning("Unreadable cache entry %s: %s", entry_path, e)
+            return _MISS
+
+    def _disk_put(self, key: tuple, value):
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            # Scrittura atomica: gli altri processi non leggono mai un file parziale
+            fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as file:
+                pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, os.path.join(self.path, self._stem(key) + ".pkl.gz"))
+        except Exception as e:
+            # La cache su disco è un'ottimizzazione: un errore di scrittura non fa fallire la richiesta
+            logger.warning("Could not write cache entry for %s: %s", key, e)
+        self._prune_if_due()
+
+    @contextmanager
+    def _process_lock(self, key: tuple):
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, self._stem(key) + ".lock"), "a") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _prune_if_due(self):
+        current = self.bucket()
+        with self._lock:
+            if self._last_prune == current:
+                return
+            self._last_prune = current
+        self.prune(current)
+
+    def prune(self, current_bucket: int = None):
+        """Delete disk entries (and lock files) older than the previous bucket."""
+        current_bucket = self.bucket() if current_bucket is None else current_bucket
+        try:
+            names = os.listdir(self.path)
+        except FileNotFoundError:
+            return
+        for name in names:
+            bucket, _, rest = name.partition("-")
+            if not bucket.isdigit() or not rest or int(bucket) >= current_bucket - 1:
+                continue
+            try:
+                os.remove(os.path.join(self.path, name))
+            except OSError:
+                pass
+
+    def _count(self, stat: str):
+        # Le letture a vuoto di get() non contano come miss: solo i calcoli effettivi
+        with self._lock:
+            self.stats[stat] += 1
+        cache_lookup("result", "analysis", hit=stat != 'computed')
+
+    def get(self, ticker: str, rsi_mode: str, variant: str = "full"):
+        """Cached result for the current bucket, or None."""
+        if not self.enabled:
+            return None
+        key = self._key(ticker, rsi_mode, variant)
+        value = self._memory.get(key, _MISS)
+        if value is not _MISS:
+            self._count('memory_hits')
+            return value
+        value = self._disk_get(key)
+        if value is not _MISS:
+            self._count('disk_hits')
+            self._memory.put(key, value)
+            return value
+        return None
+
+    def get_or_compute(self, ticker: str, rsi_mode: str, compute, variant: str = "full"):
+        """
+        Cached result for the current bucket, computing it at most once.
+
+        Args:
+            ticker (str): Upper-case ticker.
+            rsi_mode (str): RSI profile.
+            compute (callable): Zero-argument function running the pipeline.
+            variant (str): Kind of result, e.g. 'full' (with report) or 'signal'. Default: 'full'.
+
+        Returns:
+            The cached or freshly computed result. If compute raises, the error is
+            propagated to every coalesced caller and nothing is cached.
+        """
+        if not self.enabled:
+            self._count('computed')
+            return compute()
+        value = self.get(ticker, rsi_mode, variant)
+        if value is not None:
+            return value
+
+        key = self._key(ticker, rsi_mode, variant)
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            self._count('coalesced')
+            return future.result()
+
+        try:
+            with self._process_lock(key):
+                # Un altro processo potrebbe aver appena finito lo stesso calcolo
+                value = self._disk_get(key)
+                if value is _MISS:
+                    self._count('computed')
+                    value = compute()
+                    self._disk_put(key, value)
+                else:
+                    self._count('disk_hits')
+                self._memory.put(key, value)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
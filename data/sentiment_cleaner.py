@@ -1,6 +1,9 @@
+import logging
 import pandas as pd
 import re
 
+logger = logging.getLogger(__name__)
+
 class SentimentCleaner:
     """Simple cleaner for sentiment text data, removing only links."""
     
@@ -25,7 +28,7 @@ class SentimentCleaner:
     def clean_sentiment_data(self, df: pd.DataFrame) -> pd.DataFrame:
         
         if df.empty or 'text' not in df.columns:
-            print("Warning: Empty DataFrame or missing 'text' column. Returning empty DataFrame.")
+            logger.warning("Empty DataFrame or missing 'text' column. Returning empty DataFrame.")
             return pd.DataFrame(columns=['timestamp', 'text', 'cleaned_text', 'source', 'ticker'])
         
         # Applica la pulizia alla colonna 'text'
@@ -36,7 +39,7 @@ class SentimentCleaner:
         df = df[df['cleaned_text'] != '']
         removed_rows = initial_rows - len(df)
         if removed_rows > 0:
-            print(f"Removed {removed_rows} rows with empty or invalid cleaned_text.")
+            logger.debug("Removed %d rows with empty or invalid cleaned_text.", removed_rows)
         
         return df
 
@@ -0,0 +1,207 @@
+import numpy as np
+import pandas as pd
+
+COLUMNS = ['timestamp', 'text', 'source', 'ticker']
+OPTIONAL_COLUMNS = ['cleaned_text', 'sentiment_score']
+
+
+def _codes(values, dtype=None) -> tuple:
+    """(integer codes, labels) of a column; missing values get code -1."""
+    codes, labels = pd.factorize(np.asarray(values, dtype=object), use_na_sentinel=True)
+    if dtype is None:
+        dtype = np.int8 if len(labels) < 2 ** 7 else np.int16 if len(labels) < 2 ** 15 else np.int32
+    return codes.astype(dtype), list(labels)
+
+
+def _take_labels(labels, codes: np.ndarray) -> np.ndarray:
+    # Il codice -1 (valore mancante) punta all'ultimo elemento: None
+    return np.asarray(list(labels) + [None], dtype=object)[codes]
+
+
+class SentimentCorpus:
+    """
+    Compact columnar form of a sentiment corpus (the DataFrames of
+    SentimentFetcher, SentimentCleaner and SentimentAnalyzer).
+
+    - timestamp: int64 nanoseconds since the epoch (UTC);
+    - source, ticker: small integer codes into a list of labels;
+    - text, cleaned_text: int32 ids into one buffer of the distinct strings,
+      UTF-8 encoded and addressed by offsets, so cross-posts and texts that
+      cleaning leaves unchanged are stored once;
+    - sentiment_score: float32.
+
+    Columns that are not present (cleaned_text before cleaning,
+    sentiment_score before scoring) are None. A corpus is immutable: take(),
+    between() and concat() return new corpora.
+    """
+
+    def __init__(self, timestamps: np.ndarray, source_codes: np.ndarray, sources: list,
+                 ticker_codes: np.ndarray, tickers: list, text_ids: np.ndarray, buffer: bytes,
+                 offsets: np.ndarray, cleaned_ids: np.ndarray = None, scores: np.ndarray = None):
+        self.timestamps = timestamps
+        self.source_codes = source_codes
+        self.sources = sources
+        self.ticker_codes = ticker_codes
+        self.tickers = tickers
+        self.text_ids = text_ids
+        self.cleaned_ids = cleaned_ids
+        self.buffer = buffer
+        self.offsets = offsets
+        self.scores = scores
+        self._strings = None
+
+    @classmethod
+    def empty(cls) -> 'SentimentCorpus':
+        return cls(np.empty(0, np.int64), np.empty(0, np.int8), [], np.empty(0, np.int8), [],
+                   np.empty(0, np.int32), b"", np.zeros(1, np.int64))
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'SentimentCorpus':
+        """
+        Encode a DataFrame with columns timestamp, text, source, ticker and
+        optionally cleaned_text and sentiment_score (other columns are dropped).
+        """
+        if df.empty or 'text' not in df.columns:
+            return cls.empty()
+
+        timestamps = pd.DatetimeIndex(pd.to_datetime(df['timestamp'], utc=True)).as_unit("ns").asi8
+        source_codes, sources = _codes(df['source'])
+        ticker_codes, tickers = _codes(df['ticker'])
+
+        # Testi originali e puliti condividono il buffer: il testo pulito spesso coincide con l'originale
+        has_cleaned = 'cleaned_text' in df.columns
+        texts = df['text'].to_numpy(dtype=object)
+        if has_cleaned:
+            texts = np.concatenate([texts, df['cleaned_text'].to_numpy(dtype=object)])
+        texts = np.where([isinstance(text, str) for text in texts], texts, None)
+        ids, strings = _codes(texts, np.int32)
+        buffer, offsets = cls._pack(strings)
+
+        scores = None
+        if 'sentiment_score' in df.columns:
+            scores = pd.to_numeric(df['sentiment_score'], errors='coerce').to_numpy(dtype=np.float32)
+
+        corpus = cls(timestamps, source_codes, sources, ticker_codes, tickers, ids[:len(df)], buffer, offsets,
+                     cleaned_ids=ids[len(df):] if has_cleaned else None, scores=scores)
+        corpus._strings = strings
+        return corpus
+
+    @staticmethod
+    def _pack(strings: list) -> tuple:
+        encoded = [string.encode("utf-8") for string in strings]
+        offsets = np.zeros(len(encoded) + 1, np.int64)
+        np.cumsum([len(data) for data in encoded], out=offsets[1:])
+        return b"".join(encoded), offsets
+
+    def strings(self) -> list:
+        """The distinct texts, in id order (decoded once and kept)."""
+        if self._strings is None:
+            buffer, offsets = self.buffer, self.offsets
+            self._strings = [buffer[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+        return self._strings
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the arrays and the text buffer (labels excluded)."""
+        arrays = (self.timestamps, self.source_codes, self.ticker_codes, self.text_ids, self.offsets,
+                  self.cleaned_ids, self.scores)
+        return len(self.buffer) + sum(array.nbytes for array in arrays if array is not None)
+
+    def to_frame(self, categorical: bool = False) -> pd.DataFrame:
+        """
+        Decode into the DataFrame schema of the sentiment modules.
+
+        Args:
+            categorical (bool): Return source and ticker as pandas categoricals
+                instead of object columns. Default: False.
+
+        Returns:
+            pd.DataFrame: Columns timestamp (datetime64[ns, UTC]), text, source, ticker and,
+            if present, cleaned_text and sentiment_score; a fresh RangeIndex.
+        """
+        if not len(self):
+            columns = COLUMNS + [column for column, values in zip(OPTIONAL_COLUMNS, (self.cleaned_ids, self.scores))
+                                 if values is not None]
+            return pd.DataFrame(columns=columns)
+
+        if categorical:
+            source = pd.Categorical.from_codes(self.source_codes, self.sources)
+            ticker = pd.Categorical.from_codes(self.ticker_codes, self.tickers)
+        else:
+            source = _take_labels(self.sources, self.source_codes)
+            ticker = _take_labels(self.tickers, self.ticker_codes)
+        strings = self.strings()
+        data = {
+            'timestamp': pd.DatetimeIndex(self.timestamps.view("datetime64[ns]")).tz_localize("UTC"),
+            'text': _take_labels(strings, self.text_ids),
+            'source': source,
+            'ticker': ticker,
+        }
+        if self.cleaned_ids is not None:
+            data['cleaned_text'] = _take_labels(strings, self.cleaned_ids)
+        if self.scores is not None:
+            data['sentiment_score'] = self.scores.astype(np.float64)
+        return pd.DataFrame(data)
+
+    def take(self, rows) -> 'SentimentCorpus':
+        """Rows selected by integer positions or a boolean mask (the text buffer is shared, not copied)."""
+        rows = np.asarray(rows)
+        corpus = SentimentCorpus(
+            self.timestamps[rows], self.source_codes[rows], self.sources, self.ticker_codes[rows], self.tickers,
+            self.text_ids[rows], self.buffer, self.offsets,
+            cleaned_ids=None if self.cleaned_ids is None else self.cleaned_ids[rows],
+            scores=None if self.scores is None else self.scores[rows],
+        )
+        corpus._strings = self._strings
+        return corpus
+
+    def between(self, start, end) -> 'SentimentCorpus':
+        """Rows with start <= timestamp <= end (naive times are taken as UTC)."""
+        start, end = (pd.Timestamp(value) for value in (start, end))
+        start, end = (value.tz_localize("UTC") if value.tzinfo is None else value for value in (start, end))
+        return self.take((self.timestamps >= start.value) & (self.timestamps <= end.value))
+
+    @classmethod
+    def concat(cls, corpora: list) -> 'SentimentCorpus':
+        """
+        Join corpora (e.g. the days or tickers of a backtest) into one, with a
+        single label list per column and texts deduplicated across corpora.
+
+        cleaned_text and sentiment_score are kept only if every corpus has them.
+        """
+        corpora = [corpus for corpus in corpora if len(corpus)]
+        if not corpora:
+            return cls.empty()
+
+        def remap(labels_of, codes_of, dtype=None):
+            codes, labels = _codes([label for corpus in corpora for label in labels_of(corpus)], dtype)
+            remapped, start = [], 0
+            for corpus in corpora:
+                count = len(labels_of(corpus))
+                # Tabella vecchio codice -> nuovo; l'ultima voce mappa -1 su -1
+                table = np.append(codes[start:start + count], -1).astype(codes.dtype)
+                remapped.append([table[values] for values in codes_of(corpus)])
+                start += count
+            return remapped, labels
+
+        sources, source_labels = remap(lambda c: c.sources, lambda c: [c.source_codes])
+        tickers, ticker_labels = remap(lambda c: c.tickers, lambda c: [c.ticker_codes])
+        has_cleaned = all(corpus.cleaned_ids is not None for corpus in corpora)
+        has_scores = all(corpus.scores is not None for corpus in corpora)
+        texts, strings = remap(lambda c: c.strings(),
+                               lambda c: [c.text_ids] + ([c.cleaned_ids] if has_cleaned else []), np.int32)
+        buffer, offsets = cls._pack(strings)
+
+        corpus = cls(
+            np.concatenate([c.timestamps for c in corpora]),
+            np.concatenate([codes[0] for codes in sources]), source_labels,
+            np.concatenate([codes[0] for codes in tickers]), ticker_labels,
+            np.concatenate([ids[0] for ids in texts]), buffer, offsets,
+            cleaned_ids=np.concatenate([ids[1] for ids in texts]) if has_cleaned else None,
+            scores=np.concatenate([c.scores for c in corpora]) if has_scores else None,
+        )
+        corpus._strings = strings
+        return corpus
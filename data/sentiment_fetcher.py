@@ -1,37 +1,84 @@
-import praw
-import requests
+import logging
 import pandas as pd
-import yaml
+from config.settings_loader import load_settings
+from monitoring.metrics import cache_lookup, external_call
 import re
-import os
+from typing import TYPE_CHECKING
 from datetime import datetime, timedelta, timezone
-import yfinance as yf  # Needed for ticker_to_company
+from data.cassette import Cassette
+from data.sentiment_corpus import SentimentCorpus
+
+if TYPE_CHECKING:
+    import praw
+    import requests
+    from data.news_ingest import NewsIngestor
+
+logger = logging.getLogger(__name__)
+
+NEWSAPI_URL = "https://newsapi.org/v2/everything"
+
+
+def reddit_endpoints(reddit_config: dict) -> dict:
+    """
+    praw.Reddit keyword arguments for the optional 'oauth_url' and 'reddit_url'
+    of the reddit settings (e.g. local stand-ins); empty if they are not set.
+    """
+    return {key: reddit_config[key] for key in ('oauth_url', 'reddit_url') if reddit_config.get(key)}
+
 
 class SentimentFetcher:
-    """Fetches sentiment data from Reddit and NewsAPI with in-memory caching."""
+    """
+    Fetches sentiment data from Reddit and NewsAPI with in-memory caching.
+
+    Cached corpora are kept as SentimentCorpus and decoded into a new
+    DataFrame on every hit, so callers may modify what they receive.
+    """
     
-    def __init__(self, config_path: str = None):
-        """Initialize APIs and cache."""
-        if config_path is None:
-            config_path = os.path.join(os.path.dirname(__file__), "..", "config", "settings.yaml")
-        with open(config_path, 'r') as file:
-            config = yaml.safe_load(file)
+    def __init__(self, config_path: str = None, cassette: Cassette = None, settings: dict = None,
+                 reddit: 'praw.Reddit' = None, http: 'requests.Session' = None, corpus_cache: dict = None,
+                 news_ingestor: 'NewsIngestor' = None):
+        """
+        Initialize APIs and cache.
+
+        Args:
+            config_path (str, optional): settings.yaml path, used when settings is not given.
+            cassette (Cassette, optional): Record/replay layer. Default: from settings.
+            settings (dict, optional): Already loaded settings.
+            reddit (praw.Reddit, optional): Shared Reddit client. Default: a new one.
+            http (requests.Session, optional): Pooled HTTP session for NewsAPI. Default: module-level requests.
+            corpus_cache (dict, optional): Reddit comment trees by submission id, shared by the
+                fetchers of a watchlist so a post matching several tickers is expanded once.
+            news_ingestor (NewsIngestor, optional): Shared bulk NewsAPI ingestion (newsapi.mode 'bulk').
+                Default: one NewsAPI query per ticker.
+        """
+        config = settings or load_settings(config_path)
+
+        self.cassette = cassette or Cassette.from_settings(config)
         
         # Reddit config
         reddit_config = config['reddit']
-        self.reddit = praw.Reddit(
-            client_id=reddit_config['client_id'],
-            client_secret=reddit_config['client_secret'],
-            username=reddit_config['username'],
-            password=reddit_config['password'],
-            user_agent=reddit_config['user_agent']
-        )
+        if reddit is None:
+            import praw
+            reddit = praw.Reddit(
+                client_id=reddit_config['client_id'],
+                client_secret=reddit_config['client_secret'],
+                username=reddit_config['username'],
+                password=reddit_config['password'],
+                user_agent=reddit_config['user_agent'],
+                **reddit_endpoints(reddit_config)
+            )
+        self.reddit = reddit
         
         # NewsAPI
+        if http is None:
+            import requests as http
+        self.http = http
         self.newsapi_key = config['newsapi']['api_key']
-        self.newsapi_url = "https://newsapi.org/v2/everything"
+        self.newsapi_url = config['newsapi'].get('url') or NEWSAPI_URL
+        self.news_ingestor = news_ingestor
         
         self.cache = {}
+        self.corpus_cache = {} if corpus_cache is None else corpus_cache
     
     def fetch_sentiment_data(self, ticker: str, period: str = "7d", 
                              subreddits: list = None, 
@@ -46,9 +93,28 @@ class SentimentFetcher:
         
         cache_key = f"{ticker}_{period}_{'_'.join(subreddits)}"
         if cache_key in self.cache:
-            print(f"Using cached sentiment data for {cache_key}")
-            return self.cache[cache_key]
+            logger.debug("Using cached sentiment data for %s", cache_key)
+            return self.cache[cache_key].to_frame()
+
+        request = {"ticker": ticker, "period": period, "subreddits": subreddits, "news_sources": news_sources}
+        if self.news_ingestor is not None:
+            # Le registrazioni per-ticker esistenti restano valide
+            request["news"] = "bulk"
+        df = self.cassette.call(
+            "sentiment.live",
+            request,
+            lambda: self._fetch_from_sources(ticker, period, subreddits, news_sources),
+            composite=True,
+        )
+        if df.empty:
+            logger.info("No sentiment data for %s in %s", ticker, period)
+            return df
         
+        self.cache[cache_key] = SentimentCorpus.from_frame(df)
+        return df
+
+    def _fetch_from_sources(self, ticker: str, period: str, subreddits: list, news_sources: list) -> pd.DataFrame:
+        """Query Reddit and NewsAPI (the network part of fetch_sentiment_data)."""
         days = int(period.replace("d", ""))
         start_time = datetime.now(timezone.utc) - timedelta(days=days)
         
@@ -60,38 +126,51 @@ class SentimentFetcher:
         for subreddit_name in subreddits:
             try:
                 subreddit = self.reddit.subreddit(subreddit_name)
-                print(f"Searching Reddit r/{subreddit_name} for {ticker}")
-                for submission in subreddit.search(f"{ticker}", limit=100, time_filter="month"):
+                logger.debug("Searching Reddit r/%s for %s", subreddit_name, ticker)
+                with external_call("reddit.search"):
+                    submissions = list(subreddit.search(f"{ticker}", limit=100, time_filter="month"))
+                for submission in submissions:
                     if submission.created_utc < start_time.timestamp():
                         continue
                     text = submission.title + " " + (submission.selftext or "")
                     if not re.search(r'\b' + re.escape(ticker), text, re.IGNORECASE):
                         continue
-                    print(f"Reddit r/{subreddit_name} post: {text[:50]}...")
+                    logger.debug("Reddit r/%s post: %s...", subreddit_name, text[:50])
                     data.append({
                         "timestamp": datetime.fromtimestamp(submission.created_utc, tz=timezone.utc),
                         "text": text,
                         "source": f"reddit_{subreddit_name}",
                         "ticker": ticker
                     })
-                    submission.comments.replace_more(limit=0)
-                    for comment in submission.comments.list()[:20]:
-                        if comment.created_utc < start_time.timestamp():
+                    for created_utc, body in self._comments(submission):
+                        if created_utc < start_time.timestamp():
                             continue
-                        if not re.search(r'\b' + re.escape(ticker) + r'\b.*(stock|price|earnings|invest|apple)', comment.body, re.IGNORECASE):
+                        if not re.search(r'\b' + re.escape(ticker) + r'\b.*(stock|price|earnings|invest|apple)', body, re.IGNORECASE):
                             continue
-                        print(f"Reddit r/{subreddit_name} comment: {comment.body[:50]}...")
+                        logger.debug("Reddit r/%s comment: %s...", subreddit_name, body[:50])
                         data.append({
-                            "timestamp": datetime.fromtimestamp(comment.created_utc, tz=timezone.utc),
-                            "text": comment.body,
+                            "timestamp": datetime.fromtimestamp(created_utc, tz=timezone.utc),
+                            "text": body,
                             "source": f"reddit_{subreddit_name}",
                             "ticker": ticker
                         })
-                print(f"Reddit r/{subreddit_name} returned {len([d for d in data if d['source'] == f'reddit_{subreddit_name}'])} items")
+                logger.info("Reddit r/%s returned %d items for %s", subreddit_name,
+                            sum(1 for d in data if d['source'] == f'reddit_{subreddit_name}'), ticker)
             except Exception as e:
-                print(f"Error fetching from Reddit r/{subreddit_name}: {str(e)}")
+                logger.warning("Error fetching from Reddit r/%s: %s", subreddit_name, e)
         
         # NewsAPI
+        if self.news_ingestor is not None:
+            try:
+                articles = self.news_ingestor.articles(ticker, start_time, news_sources=news_sources)
+            except Exception as e:
+                logger.warning("Error fetching from NewsAPI: %s", e)
+                articles = []
+            logger.info("NewsAPI bulk ingestion returned %d articles for %s", len(articles), ticker)
+            data.extend({"timestamp": published_at, "text": title, "source": "news", "ticker": ticker}
+                        for published_at, title in articles)
+            return pd.DataFrame(data)
+
         try:
             news_query = ticker_to_company(ticker)
             params = {
@@ -103,11 +182,12 @@ class SentimentFetcher:
             }
             if news_sources:
                 params["sources"] = ",".join(news_sources)
-            print(f"Searching NewsAPI with query: {news_query}")
-            response = requests.get(self.newsapi_url, params=params)
-            response.raise_for_status()
-            articles = response.json().get("articles", [])
-            print(f"NewsAPI returned {len(articles)} articles for {news_query}")
+            logger.debug("Searching NewsAPI with query: %s", news_query)
+            with external_call("newsapi.everything"):
+                response = self.http.get(self.newsapi_url, params=params)
+                response.raise_for_status()
+                articles = response.json().get("articles", [])
+            logger.info("NewsAPI returned %d articles for %s", len(articles), news_query)
             for article in articles[:50]:
                 try:
                     published_at_str = article.get("publishedAt")
@@ -123,7 +203,7 @@ class SentimentFetcher:
                     text = title 
                     if not text:
                         continue
-                    print(f"NewsAPI article added: {text[:50]}...")
+                    logger.debug("NewsAPI article added: %s...", text[:50])
                     data.append({
                         "timestamp": published_at,
                         "text": text,
@@ -131,26 +211,33 @@ class SentimentFetcher:
                         "ticker": ticker
                     })
                 except Exception as e:
-                    print(f"NewsAPI article skipped: error processing {str(e)}")
+                    logger.debug("NewsAPI article skipped: error processing %s", e)
         except Exception as e:
-            print(f"Error fetching from NewsAPI: {str(e)}")
-        
-        df = pd.DataFrame(data)
-        if df.empty:
-            print(f"No sentiment data for {ticker} in {period}")
-            return df
+            logger.warning("Error fetching from NewsAPI: %s", e)
         
-        self.cache[cache_key] = df
-        return df
+        return pd.DataFrame(data)
+
+    def _comments(self, submission) -> list:
+        """First 20 comments of a submission as (created_utc, body), expanded once per corpus_cache."""
+        comments = self.corpus_cache.get(submission.id)
+        cache_lookup("corpus", "reddit.comments", hit=comments is not None)
+        if comments is None:
+            with external_call("reddit.comments"):
+                submission.comments.replace_more(limit=0)
+                comments = [(comment.created_utc, comment.body) for comment in submission.comments.list()[:20]]
+            self.corpus_cache[submission.id] = comments
+        return comments
 
 def ticker_to_company(ticker: str) -> str:
+    import yfinance as yf
     try:
-        info = yf.Ticker(ticker).info
+        with external_call("yahoo.info"):
+            info = yf.Ticker(ticker).info
         name = info.get("shortName") or info.get("longName")
         if name:
             return name
     except Exception as e:
-        print(f"Errore ottenendo nome azienda per {ticker}: {e}")
+        logger.warning("Errore ottenendo nome azienda per %s: %s", ticker, e)
     return ticker
 
 if __name__ == "__main__":
@@ -0,0 +1,145 @@
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing, contextmanager
+import pandas as pd
+from config.settings_loader import load_settings
+
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS signals (
+    ticker TEXT NOT NULL,
+    rsi_mode TEXT NOT NULL,
+    computed_at REAL NOT NULL,
+    result TEXT NOT NULL,
+    PRIMARY KEY (ticker, rsi_mode)
+);
+CREATE TABLE IF NOT EXISTS bars (
+    ticker TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    open REAL, high REAL, low REAL, close REAL, volume REAL,
+    PRIMARY KEY (ticker, ts)
+);
+CREATE TABLE IF NOT EXISTS doc_scores (
+    ticker TEXT NOT NULL,
+    text TEXT NOT NULL,
+    score REAL NOT NULL,
+    PRIMARY KEY (ticker, text)
+);
+"""
+
+
+class SignalStore:
+    """
+    SQLite store of precomputed analyses, served by main.py.
+
+    Besides the latest result per (ticker, rsi_mode) it keeps what the
+    precomputation needs to refresh incrementally: the daily bars already
+    downloaded and the sentiment score of every document already rated.
+    """
+
+    def __init__(self, path: str = None):
+        """
+        Args:
+            path (str, optional): Database file. Default: 'cache/signals.sqlite3' next to the project root.
+        """
+        if path is None:
+            path = os.path.join(os.path.dirname(__file__), "..", "cache", "signals.sqlite3")
+        self.path = os.path.abspath(path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @classmethod
+    def from_settings(cls, settings: dict = None, config_path: str = None):
+        """Build the store from the 'precompute' section of settings.yaml."""
+        if settings is None:
+            settings = load_settings(config_path)
+
+        path = ((settings or {}).get('precompute') or {}).get('path')
+        if path and not os.path.isabs(path):
+            # I percorsi relativi in settings.yaml sono relativi alla radice del progetto
+            path = os.path.join(os.path.dirname(__file__), "..", path)
+        return cls(path)
+
+    @contextmanager
+    def _connect(self):
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn:
+            with conn:
+                yield conn
+
+    # === Risultati ===
+
+    def put_signal(self, ticker: str, rsi_mode: str, result: dict):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO signals (ticker, rsi_mode, computed_at, result) VALUES (?, ?, ?, ?)",
+                         (ticker, rsi_mode, time.time(), json.dumps(result, default=str)))
+
+    def get_signal(self, ticker: str, rsi_mode: str, max_age: float = None) -> dict:
+        """
+        Latest precomputed result, or None if missing or older than max_age seconds.
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT computed_at, result FROM signals WHERE ticker = ? AND rsi_mode = ?",
+                               (ticker, rsi_mode)).fetchone()
+        if row is None or (max_age is not None and time.time() - row[0] > max_age):
+            return None
+        return json.loads(row[1])
+
+    # === Barre giornaliere ===
+
+    def last_bar_time(self, ticker: str) -> pd.Timestamp:
+        with self._connect() as conn:
+            (ts,) = conn.execute("SELECT MAX(ts) FROM bars WHERE ticker = ?", (ticker,)).fetchone()
+        return None if ts is None else pd.Timestamp(ts, unit='s', tz='UTC')
+
+    def append_bars(self, ticker: str, df: pd.DataFrame) -> int:
+        """
+        Store OHLCV bars; bars already stored are overwritten (the last one may
+        have been a partial session). Returns the number of bars written.
+        """
+        if df.empty:
+            return 0
+        index = df.index if df.index.tz is not None else df.index.tz_localize('UTC')
+        timestamps = index.tz_convert('UTC').as_unit('s').asi8
+        rows = [(ticker, int(ts), *map(float, values))
+                for ts, values in zip(timestamps, df[BAR_COLUMNS].itertuples(index=False))]
+        with self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO bars (ticker, ts, open, high, low, close, volume) "
+                             "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def load_bars(self, ticker: str, since: pd.Timestamp = None) -> pd.DataFrame:
+        """Stored bars (UTC index, BAR_COLUMNS), optionally from a start time."""
+        since_ts = 0 if since is None else int(since.timestamp())
+        with self._connect() as conn:
+            rows = conn.execute("SELECT ts, open, high, low, close, volume FROM bars "
+                                "WHERE ticker = ? AND ts >= ? ORDER BY ts", (ticker, since_ts)).fetchall()
+        df = pd.DataFrame(rows, columns=['ts'] + BAR_COLUMNS)
+        df.index = pd.to_datetime(df.pop('ts'), unit='s', utc=True)
+        df.index.name = 'Date'
+        return df
+
+    def prune_bars(self, ticker: str, before: pd.Timestamp) -> int:
+        """Delete the stored bars older than before (no longer needed by the indicators). Returns the number deleted."""
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM bars WHERE ticker = ? AND ts < ?",
+                                (ticker, int(before.timestamp()))).rowcount
+
+    # === Punteggi dei documenti ===
+
+    def load_scores(self, ticker: str) -> dict:
+        """Known scores as {(text, ticker): score}, the format of SentimentAnalyzer.score_memo."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT text, score FROM doc_scores WHERE ticker = ?", (ticker,)).fetchall()
+        return {(text, ticker): score for text, score in rows}
+
+    def replace_scores(self, ticker: str, scores: dict):
+        """Keep only the given {(text, ticker): score} entries (documents still in the window)."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM doc_scores WHERE ticker = ?", (ticker,))
+            conn.executemany("INSERT OR REPLACE INTO doc_scores (ticker, text, score) VALUES (?, ?, ?)",
+                             [(ticker, text, float(score)) for (text, _), score in scores.items()])
@@ -0,0 +1,226 @@
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import closing, contextmanager
+from config.settings_loader import load_settings
+
+TASK_STATUSES = ("queued", "leased", "done", "failed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS work_tasks (
+    run_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_token TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    finished_at REAL,
+    PRIMARY KEY (run_id, id)
+);
+CREATE INDEX IF NOT EXISTS work_tasks_ready ON work_tasks (run_id, status, available_at);
+"""
+
+
+def task_id(kind: str, ticker: str, day=None) -> str:
+    """Deterministic task ID, e.g. 'analyze:NVDA' or 'sentiment_day:NVDA:2025-05-06'."""
+    return f"{kind}:{ticker}" if day is None else f"{kind}:{ticker}:{str(day)[:10]}"
+
+
+def _dumps(value) -> str:
+    # Chiavi ordinate: lo stesso risultato produce sempre lo stesso testo
+    return json.dumps(value, default=str, sort_keys=True)
+
+
+class SqliteWorkQueue:
+    """
+    SQLite-backed work queue of a distributed run (see pipeline.distributed).
+
+    Tasks are identified by (run_id, task id), so submitting a run twice does
+    not duplicate work. A worker leases a task for a limited time and renews
+    the lease while it works; a task whose lease expires (crashed or
+    partitioned worker) is leased again. Failed attempts are retried with
+    exponential backoff up to max_attempts. Result writes are idempotent: the
+    first result of a task is kept and later ones are ignored.
+
+    Like JobStore, every call opens a short-lived connection, so the queue can
+    be shared by threads and processes. Several hosts can use it only through a
+    filesystem with working POSIX locks.
+    """
+
+    def __init__(self, path: str = None, max_attempts: int = 3, retry_delay: float = 30.0):
+        """
+        Args:
+            path (str, optional): Database file. Default: 'cache/work_queue.sqlite3' next to the project root.
+            max_attempts (int): Leases of a task before it is marked failed. Default: 3.
+            retry_delay (float): Seconds before the first retry of a failed task, doubled
+                at every further attempt. Default: 30.
+        """
+        if path is None:
+            path = os.path.join(os.path.dirname(__file__), "..", "cache", "work_queue.sqlite3")
+        self.path = os.path.abspath(path)
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        with closing(sqlite3.connect(self.path, timeout=30, isolation_level=None)) as conn:
+            conn.row_factory = sqlite3.Row
+            yield conn
+
+    @contextmanager
+    def _transaction(self):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def enqueue(self, run_id: str, tasks: list) -> int:
+        """
+        Add tasks ({'id', 'kind', 'payload'}) to a run; tasks already in the run are left as they are.
+
+        Returns:
+            int: Number of new tasks.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            return sum(conn.execute(
+                "INSERT OR IGNORE INTO work_tasks (run_id, id, kind, payload, status, available_at) "
+                "VALUES (?, ?, ?, ?, 'queued', ?)",
+                (run_id, task['id'], task['kind'], _dumps(task['payload']), now)).rowcount for task in tasks)
+
+    def lease(self, run_id: str, owner: str, lease_seconds: float) -> dict:
+        """
+        Lease the next ready task of a run: queued and due, or leased by a worker
+        whose lease has expired.
+
+        Returns:
+            dict: run_id, id, kind, payload, attempt and token (needed by renew,
+            complete and fail), or None if no task is ready.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            while True:
+                row = conn.execute(
+                    "SELECT id, kind, payload, status, attempts FROM work_tasks WHERE run_id = ? AND "
+                    "((status = 'queued' AND available_at <= ?) OR (status = 'leased' AND lease_expires < ?)) "
+                    "ORDER BY available_at, id LIMIT 1", (run_id, now, now)).fetchone()
+                if row is None:
+                    return None
+                if row['status'] == 'leased' and row['attempts'] >= self.max_attempts:
+                    # Ogni lease scaduto è un tentativo perso: oltre il limite il task è fallito
+                    conn.execute("UPDATE work_tasks SET status = 'failed', error = 'lease expired', "
+                                 "finished_at = ?, lease_token = NULL WHERE run_id = ? AND id = ?",
+                                 (now, run_id, row['id']))
+                    continue
+                token = uuid.uuid4().hex
+                conn.execute("UPDATE work_tasks SET status = 'leased', attempts = attempts + 1, lease_owner = ?, "
+                             "lease_token = ?, lease_expires = ? WHERE run_id = ? AND id = ?",
+                             (owner, token, now + lease_seconds, run_id, row['id']))
+                return {'run_id': run_id, 'id': row['id'], 'kind': row['kind'], 'payload': json.loads(row['payload']),
+                        'attempt': row['attempts'] + 1, 'token': token}
+
+    def renew(self, task: dict, lease_seconds: float) -> bool:
+        """Extend a lease; False if it was lost (expired and taken by another worker, or the task is done)."""
+        with self._connect() as conn:
+            return conn.execute("UPDATE work_tasks SET lease_expires = ? WHERE run_id = ? AND id = ? "
+                                "AND status = 'leased' AND lease_token = ?",
+                                (time.time() + lease_seconds, task['run_id'], task['id'], task['token'])).rowcount > 0
+
+    def complete(self, task: dict, result) -> bool:
+        """
+        Store the result of a task, even if its lease was lost meanwhile.
+
+        Returns:
+            bool: False if the task already had a result (which is kept).
+        """
+        with self._connect() as conn:
+            return conn.execute("UPDATE work_tasks SET status = 'done', result = ?, error = NULL, finished_at = ?, "
+                                "lease_token = NULL WHERE run_id = ? AND id = ? AND status != 'done'",
+                                (_dumps(result), time.time(), task['run_id'], task['id'])).rowcount > 0
+
+    def fail(self, task: dict, error: str) -> str:
+        """
+        Record a failed attempt: the task is queued again after the backoff, or
+        marked failed after max_attempts.
+
+        Returns:
+            str: 'queued' or 'failed'; None if the lease was lost (the task is someone else's).
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT attempts FROM work_tasks WHERE run_id = ? AND id = ? AND status = 'leased' "
+                               "AND lease_token = ?", (task['run_id'], task['id'], task['token'])).fetchone()
+            if row is None:
+                return None
+            status = 'failed' if row['attempts'] >= self.max_attempts else 'queued'
+            conn.execute("UPDATE work_tasks SET status = ?, error = ?, available_at = ?, lease_token = NULL, "
+                         "finished_at = ? WHERE run_id = ? AND id = ?",
+                         (status, error, now + self.retry_delay * 2 ** (row['attempts'] - 1),
+                          now if status == 'failed' else None, task['run_id'], task['id']))
+            return status
+
+    def retry_failed(self, run_id: str) -> int:
+        """Queue the failed tasks of a run again, with a fresh attempt count; returns how many."""
+        with self._connect() as conn:
+            return conn.execute("UPDATE work_tasks SET status = 'queued', attempts = 0, available_at = ?, "
+                                "finished_at = NULL WHERE run_id = ? AND status = 'failed'",
+                                (time.time(), run_id)).rowcount
+
+    def counts(self, run_id: str) -> dict:
+        """Number of tasks of a run per status (see TASK_STATUSES)."""
+        counts = dict.fromkeys(TASK_STATUSES, 0)
+        with self._connect() as conn:
+            for row in conn.execute("SELECT status, COUNT(*) AS n FROM work_tasks WHERE run_id = ? GROUP BY status",
+                                    (run_id,)):
+                counts[row['status']] = row['n']
+        return counts
+
+    def results(self, run_id: str) -> list:
+        """Completed tasks of a run ({'id', 'kind', 'payload', 'result'}), ordered by task ID."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id, kind, payload, result FROM work_tasks WHERE run_id = ? "
+                                "AND status = 'done' ORDER BY id", (run_id,)).fetchall()
+        return [{'id': row['id'], 'kind': row['kind'], 'payload': json.loads(row['payload']),
+                 'result': json.loads(row['result'])} for row in rows]
+
+    def failures(self, run_id: str) -> list:
+        """Failed tasks of a run ({'id', 'kind', 'attempts', 'error'}), ordered by task ID."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id, kind, attempts, error FROM work_tasks WHERE run_id = ? "
+                                "AND status = 'failed' ORDER BY id", (run_id,)).fetchall()
+        return [dict(row) for row in rows]
+
+
+def open_work_queue(url: str = None, max_attempts: int = 3, retry_delay: float = 30.0) -> SqliteWorkQueue:
+    """Work queue for a URL: an SQLite file path (optionally 'sqlite:///path')."""
+    path = url[len("sqlite:///"):] if url and url.startswith("sqlite:///") else url
+    if path and not os.path.isabs(path):
+        # I percorsi relativi in settings.yaml sono relativi alla radice del progetto
+        path = os.path.join(os.path.dirname(__file__), "..", path)
+    return SqliteWorkQueue(path, max_attempts=max_attempts, retry_delay=retry_delay)
+
+
+def work_queue_from_settings(settings: dict = None, config_path: str = None, url: str = None):
+    """Work queue from the 'work_queue' section of settings.yaml (url overrides its url)."""
+    if settings is None:
+        settings = load_settings(config_path)
+
+    section = (settings or {}).get('work_queue') or {}
+    return open_work_queue(url or section.get('url'), int(section.get('max_attempts', 3)),
+                           float(section.get('retry_delay_seconds', 30)))
@@ -0,0 +1,184 @@
+import numpy as np
+import pandas as pd
+
+from strategy.strategy_computation import SIGNAL_CODES
+from evaluation.performance import performance_metrics, positions_from_signals, strategy_returns
+
+# Layout di una riga del ledger: indici di barra, direzione (1 long, -1 short), prezzi e rendimento
+TRADE_DTYPE = np.dtype([
+    ('entry_index', np.int64),
+    ('exit_index', np.int64),
+    ('direction', np.int8),
+    ('entry_price', np.float64),
+    ('exit_price', np.float64),
+    ('return', np.float64),
+    ('is_open', np.bool_),
+])
+
+
+class TradeLedger:
+    """Typed, array-backed record of the trades of one backtest."""
+
+    def __init__(self, trades: np.ndarray, index=None):
+        """
+        Args:
+            trades (np.ndarray): Structured array with dtype TRADE_DTYPE.
+            index (pd.Index, optional): Bar timestamps, used to label entries and exits.
+        """
+        self.trades = trades
+        self.index = index
+
+    def __len__(self):
+        return len(self.trades)
+
+    @property
+    def closed(self) -> np.ndarray:
+        """Trades that were closed within the backtest period."""
+        return self.trades[~self.trades['is_open']]
+
+    @property
+    def open(self) -> np.ndarray:
+        """Trade still open at the end of the period (zero or one row)."""
+        return self.trades[self.trades['is_open']]
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Ledger as a DataFrame, with entry/exit dates when an index is available."""
+        df = pd.DataFrame(self.trades)
+        df['direction'] = df['direction'].map({1: 'long', -1: 'short'})
+        if self.index is not None and len(df):
+            df.insert(0, 'entry_date', self.index[df['entry_index']])
+            df.insert(1, 'exit_date', self.index[df['exit_index']])
+        return df
+
+
+class BacktestResult:
+    """Positions, returns, equity curve, drawdown and trade ledger of a backtest."""
+
+    def __init__(self, positions, returns, equity, drawdown, ledger, initial_cash, index=None):
+        self.positions = positions
+        self.returns = returns
+        self.equity = equity
+        self.drawdown = drawdown
+        self.ledger = ledger
+        self.initial_cash = initial_cash
+        self.index = index
+
+    def summary(self) -> dict:
+        """
+        Final figures of the backtest.
+
+        'gain_pct' follows the convention of the original run_backtest.py
+        report: the sum of closed-trade returns, or the mark-to-market of the
+        open trade when nothing was closed. Compounded equity figures are
+        reported alongside.
+        """
+        closed = self.ledger.closed
+        open_trade = self.ledger.open
+        if len(closed):
+            status = "Opened and closed"
+            gain = closed['return'].sum()
+        elif len(open_trade):
+            status = "Opened but not closed"
+            gain = open_trade['return'].sum()
+        else:
+            status = "No positions opened"
+            gain = 0.0
+
+        metrics = performance_metrics(self.returns, self.positions)
+        return {
+            'status': status,
+            'final_value': float(self.initial_cash * (1 + gain)),
+            'gain_pct': float(gain * 100),
+            'equity_final_value': float(self.equity[-1]) if len(self.equity) else self.initial_cash,
+            'equity_return': metrics['total_return'],
+            'max_drawdown': metrics['max_drawdown'],
+            'sharpe': metrics['sharpe'],
+            'n_trades': len(self.ledger),
+            'trade_hit_rate': float((closed['return'] > 0).mean()) if len(closed) else 0.0,
+        }
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Per-bar positions, strategy returns, equity and drawdown."""
+        return pd.DataFrame({
+            'Position': self.positions,
+            'StrategyReturn': self.returns,
+            'Equity': self.equity,
+            'Drawdown': self.drawdown,
+        }, index=self.index)
+
+
+class BacktestEngine:
+    """Vectorized signal-following backtest over price and signal arrays."""
+
+    def __init__(self, initial_cash: float = 10000):
+        self.initial_cash = initial_cash
+
+    def build_ledger(self, positions: np.ndarray, close: np.ndarray, index=None) -> TradeLedger:
+        """
+        Extract trades from a position series without a Python loop.
+
+        Every maximal run of a constant non-zero position is one trade: it is
+        entered at the close of its first bar and exited at the close of the bar
+        where the position changes (a reversal closes and opens on the same bar).
+        A run reaching the last bar is marked open and valued at the last close.
+        """
+        n = len(positions)
+        previous = np.empty_like(positions)
+        if n:
+            previous[0] = 0
+            previous[1:] = positions[:-1]
+        starts = np.flatnonzero(positions != previous)
+        ends = np.append(starts[1:], n)
+
+        direction = positions[starts]
+        in_market = direction != 0
+        starts, ends, direction = starts[in_market], ends[in_market], direction[in_market]
+
+        is_open = ends >= n
+        exit_index = np.minimum(ends, n - 1)
+        entry_price = close[starts]
+        exit_price = close[exit_index]
+
+        trades = np.empty(len(starts), dtype=TRADE_DTYPE)
+        trades['entry_index'] = starts
+        trades['exit_index'] = exit_index
+        trades['direction'] = direction
+        trades['entry_price'] = entry_price
+        trades['exit_price'] = exit_price
+        trades['return'] = direction * (exit_price - entry_price) / entry_price
+        trades['is_open'] = is_open
+        return TradeLedger(trades, index)
+
+    def run(self, close, signals, index=None) -> BacktestResult:
+        """
+        Run the backtest.
+
+        Args:
+            close (array-like): Closing prices, one per bar.
+            signals (array-like): Signal per bar, as codes (1/-1/0) or labels
+                ('Buy'/'Sell'/'Hold'); missing signals count as Hold.
+            index (pd.Index, optional): Bar timestamps. Taken from close if it is a Series.
+
+        Returns:
+            BacktestResult: Positions, returns, equity curve, drawdown and ledger.
+        """
+        if index is None and isinstance(close, pd.Series):
+            index = close.index
+        signals = pd.Series(np.asarray(signals))
+        if not pd.api.types.is_numeric_dtype(signals):
+            signals = signals.map(SIGNAL_CODES)
+        close = np.asarray(close, dtype=float)
+        if len(close) != len(signals):
+            raise ValueError("close and signals must have the same length")
+
+        positions = positions_from_signals(signals.fillna(0).to_numpy())
+        returns = strategy_returns(positions, close)
+
+        # Equity alla chiusura t: rendimenti maturati fino a t (il rendimento di t matura in t+1)
+        growth = np.cumprod(1 + returns)
+        equity = self.initial_cash * np.concatenate(([1.0], growth[:-1])) if len(close) else np.empty(0)
+        peak = np.maximum.accumulate(equity) if len(close) else equity
+        drawdown = 1 - equity / peak if len(close) else equity
+
+        ledger = self.build_ledger(positions, close, index)
+        return BacktestResult(positions, returns, equity, drawdown, ledger, self.initial_cash, index)
@@ -0,0 +1,95 @@
+import numpy as np
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+def positions_from_signals(signals) -> np.ndarray:
+    """
+    Convert signal codes into held positions.
+
+    The strategy is signal-following: a Buy opens (or keeps) a long, a Sell opens
+    (or keeps) a short, and a Hold, or the opposite signal, closes the position.
+    The position held from close t to close t+1 is therefore the signal at t.
+
+    Args:
+        signals (array-like): Signal codes (1 Buy, -1 Sell, 0 Hold), shape (..., n_days).
+
+    Returns:
+        np.ndarray: Positions (int8) with the same shape.
+    """
+    return np.sign(np.asarray(signals)).astype(np.int8)
+
+
+def strategy_returns(positions, close) -> np.ndarray:
+    """
+    Daily returns of the strategy.
+
+    Args:
+        positions (array-like): Positions, shape (..., n_days).
+        close (array-like): Closing prices, shape (n_days,) or broadcastable.
+
+    Returns:
+        np.ndarray: Returns, shape (..., n_days); the last day is always 0.
+    """
+    close = np.asarray(close, dtype=float)
+    asset_returns = np.zeros(close.shape)
+    asset_returns[..., :-1] = close[..., 1:] / close[..., :-1] - 1
+    return np.asarray(positions, dtype=float) * asset_returns
+
+
+def max_drawdown(returns) -> np.ndarray:
+    """
+    Maximum drawdown of the compounded equity curve, as a positive fraction.
+
+    Args:
+        returns (array-like): Periodic returns, shape (..., n_days).
+
+    Returns:
+        np.ndarray: Drawdown per series, shape (...).
+    """
+    equity = np.cumprod(1 + np.asarray(returns, dtype=float), axis=-1)
+    peak = np.maximum.accumulate(np.maximum(equity, 1.0), axis=-1)
+    return np.max(1 - equity / peak, axis=-1, initial=0.0)
+
+
+def performance_metrics(returns, positions) -> dict:
+    """
+    Summary metrics for one or many return series at once.
+
+    Args:
+        returns (array-like): Strategy returns, shape (..., n_days).
+        positions (array-like): Positions used to generate them, same shape.
+
+    Returns:
+        dict: Arrays (or floats for 1-D input) 'total_return', 'sharpe',
+        'max_drawdown', 'hit_rate' (share of in-market days with a gain),
+        'exposure' and 'n_trades'.
+    """
+    returns = np.asarray(returns, dtype=float)
+    positions = np.asarray(positions)
+
+    in_market = positions != 0
+    days_in_market = in_market.sum(axis=-1)
+    wins = ((returns > 0) & in_market).sum(axis=-1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = returns.mean(axis=-1) if returns.shape[-1] else np.zeros(returns.shape[:-1])
+        std = returns.std(axis=-1) if returns.shape[-1] else np.zeros(returns.shape[:-1])
+        sharpe = np.where(std > 0, mean / std * np.sqrt(TRADING_DAYS_PER_YEAR), 0.0)
+        hit_rate = np.where(days_in_market > 0, wins / days_in_market, 0.0)
+
+    previous = np.zeros_like(positions)
+    previous[..., 1:] = positions[..., :-1]
+    n_trades = (in_market & (positions != previous)).sum(axis=-1)
+
+    metrics = {
+        'total_return': np.prod(1 + returns, axis=-1) - 1,
+        'sharpe': sharpe,
+        'max_drawdown': max_drawdown(returns),
+        'hit_rate': hit_rate,
+        'exposure': days_in_market / returns.shape[-1] if returns.shape[-1] else np.zeros(returns.shape[:-1]),
+        'n_trades': n_trades,
+    }
+    if returns.ndim == 1:
+        metrics = {name: float(value) if name != 'n_trades' else int(value) for name, value in metrics.items()}
+    return metrics
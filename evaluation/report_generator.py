@@ -1,39 +1,134 @@
-from openai import OpenAI
-import yaml
+from config.settings_loader import load_settings
 import os
+from typing import TYPE_CHECKING
+from data.cassette import Cassette
+from data.result_cache import LRUCache
+from monitoring.metrics import cache_lookup, external_call
+from strategy.strategy_computation import DEFAULT_PARAMS
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+
+def template_report(ticker: str, sentiment_score, final_signal: str, confidence: str, explanation: str) -> str:
+    """
+    Deterministic report built from the strategy outputs, with no model call.
+
+    Args:
+        ticker (str): Stock ticker.
+        sentiment_score (float or str): Overall sentiment score (-100..100).
+        final_signal (str): 'Buy', 'Sell' or 'Hold'.
+        confidence (str): Confidence level, e.g. '72%'.
+        explanation (str): Strategy explanation.
+    """
+    score = float(sentiment_score)
+    threshold = DEFAULT_PARAMS["sentiment_threshold"]
+    if score >= threshold:
+        tone = "positive"
+    elif score <= -threshold:
+        tone = "negative"
+    else:
+        tone = "broadly neutral"
+
+    return (
+        f"{ticker}: the hybrid strategy signals {final_signal} with {confidence} confidence. "
+        f"Market sentiment from news and Reddit is {tone}, with a score of {score:.2f} on a -100 to +100 scale. "
+        f"{explanation}"
+    )
+
 
 class GenerateReport:
     """Analyzes sentiment using OpenAI's GPT model."""
 
-    def __init__(self, config_path: str = None):
-        """Initialize the OpenAI API client with settings from config/settings.yaml."""
-        if config_path is None:
+    def __init__(self, config_path: str = None, cassette: Cassette = None,
+                 settings: dict = None, client: 'OpenAI' = None, cache: LRUCache = None):
+        """
+        Initialize the OpenAI API client with settings from config/settings.yaml (or a shared client).
 
-            config_path = os.path.join(os.path.dirname(__file__), "..", "config", "settings.yaml")
-        
-        config_path = os.path.abspath(config_path)
+        LLM reports are cached by their inputs (model, ticker, score, signal,
+        confidence, explanation) in cache, which can be shared between instances.
+        """
+        settings = settings or load_settings(config_path)
 
-        with open(config_path, 'r') as file:
-            settings = yaml.safe_load(file)
-
-        os.environ["OPENAI_API_KEY"] = settings['openai']['api_key']
-        self.client = OpenAI()
+        if client is None:
+            from openai import OpenAI
+            os.environ["OPENAI_API_KEY"] = settings['openai']['api_key']
+            client = OpenAI(base_url=settings['openai'].get('base_url'))
+        self.client = client
+        self.cassette = cassette or Cassette.from_settings(settings)
         self.model_name = settings['openai']['model_name']
+        self.cache = cache if cache is not None else LRUCache(256)
         self.prompt_template = (
             "You are a financial analyst. Make a report of few sentences for the stock ticker {ticker}. "
             "The sentiment score is {sentiment_score}, the final signal computed by the strategy is '{final_signal}' and the confidence level is'{confidence}'."
             "Our analysis suggests that {explanation}. "
         )
 
+    def _messages(self, ticker, sentiment_score, final_signal, confidence, explanation) -> list:
+        prompt = self.prompt_template.format(ticker=ticker, sentiment_score=sentiment_score, final_signal=final_signal, confidence=confidence, explanation=explanation)
+        return [{"role": "user", "content": prompt}]
+
+    def _cache_key(self, ticker, sentiment_score, final_signal, confidence, explanation) -> tuple:
+        return (self.model_name, ticker, str(sentiment_score), final_signal, confidence, explanation)
+
     def generate_report(self, ticker=str, sentiment_score=str, final_signal=str, confidence=str, explanation=str):
 
-        prompt = self.prompt_template.format(ticker=ticker, sentiment_score=sentiment_score, final_signal=final_signal, confidence=confidence, explanation=explanation)
+        key = self._cache_key(ticker, sentiment_score, final_signal, confidence, explanation)
+        cached = self.cache.get(key)
+        cache_lookup("report", "openai.chat", hit=cached is not None)
+        if cached is not None:
+            return cached
 
-        response = self.client.chat.completions.create(
+        messages = self._messages(ticker, sentiment_score, final_signal, confidence, explanation)
+        content = self.cassette.call(
+            "openai.chat",
+            {"model": self.model_name, "messages": messages, "temperature": 0.7, "max_tokens": 150},
+            lambda: self.client.chat.completions.create(
                         model=self.model_name,
-                        messages=[{"role": "user", "content": prompt}],
+                        messages=messages,
                         temperature=0.7,
                         max_tokens=150,
-                    )
+                    ).choices[0].message.content,
+        )
+
+        content = content.strip()
+        self.cache.put(key, content)
+        return content
+
+    def stream_report(self, ticker: str, sentiment_score: str, final_signal: str, confidence: str, explanation: str):
+        """
+        Yield the LLM report piece by piece as the model generates it.
+
+        A cached report, or a recorded/replayed one (the cassette stores whole
+        responses), is yielded as a single piece. The complete text is cached.
+        """
+        key = self._cache_key(ticker, sentiment_score, final_signal, confidence, explanation)
+        cached = self.cache.get(key)
+        if cached is not None:
+            cache_lookup("report", "openai.chat", hit=True)
+            yield cached
+            return
+
+        if self.cassette.mode != "passthrough":
+            yield self.generate_report(ticker, sentiment_score, final_signal, confidence, explanation)
+            return
 
-        return response.choices[0].message.content.strip()
+        cache_lookup("report", "openai.chat", hit=False)
+        parts = []
+        # Il tempo misurato comprende l'intero stream, non solo il primo token
+        with external_call("openai.chat_stream"):
+            stream = self.client.chat.completions.create(
+                model=self.model_name,
+                messages=self._messages(ticker, sentiment_score, final_signal, confidence, explanation),
+                temperature=0.7,
+                max_tokens=150,
+                stream=True,
+            )
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        self.cache.put(key, "".join(parts).strip())
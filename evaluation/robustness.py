@@ -0,0 +1,157 @@
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from strategy.strategy_computation import SIGNAL_CODES
+from evaluation.performance import performance_metrics, positions_from_signals, strategy_returns
+
+# Metriche analizzate e verso "migliore" (True = più alto è meglio)
+ROBUSTNESS_METRICS = {
+    'total_return': True,
+    'sharpe': True,
+    'hit_rate': True,
+    'max_drawdown': False,
+}
+
+# Resample per task: fisso, così il risultato dipende solo dal seed e non dal numero di worker
+BATCH_SIZE = 500
+
+
+def _block_bootstrap_batch(positions, asset_returns, block_size, n_resamples, seed):
+    """Circular block bootstrap of (position, asset return) pairs, one row per resample."""
+    rng = np.random.default_rng(seed)
+    n_days = len(asset_returns)
+    n_blocks = -(-n_days // block_size)
+
+    starts = rng.integers(0, n_days, size=(n_resamples, n_blocks))
+    idx = (starts[:, :, None] + np.arange(block_size)) % n_days
+    idx = idx.reshape(n_resamples, -1)[:, :n_days]
+
+    sampled_positions = positions[idx]
+    metrics = performance_metrics(sampled_positions * asset_returns[idx], sampled_positions)
+    return {name: metrics[name] for name in ROBUSTNESS_METRICS}
+
+
+def _permutation_batch(positions, asset_returns, n_permutations, seed):
+    """Shuffle the signal sequence against the fixed market path, one row per permutation."""
+    rng = np.random.default_rng(seed)
+    shuffled = rng.permuted(np.broadcast_to(positions, (n_permutations, len(positions))), axis=1)
+    metrics = performance_metrics(shuffled * asset_returns, shuffled)
+    return {name: metrics[name] for name in ROBUSTNESS_METRICS}
+
+
+class RobustnessAnalyzer:
+    """Bootstrap confidence intervals and permutation tests for a backtest's signals."""
+
+    def __init__(self, close, signals, block_size: int = 5, seed: int = None, max_workers: int = None):
+        """
+        Args:
+            close (array-like): Daily closing prices.
+            signals (array-like): Daily signals, as codes (1/-1/0) or labels ('Buy'/'Sell'/'Hold').
+            block_size (int): Days per bootstrap block, preserves short-range dependence. Default: 5.
+            seed (int, optional): Random seed; results are reproducible for a given seed.
+            max_workers (int, optional): Process pool size. Default: os.cpu_count().
+        """
+        signals = pd.Series(signals)
+        if not pd.api.types.is_numeric_dtype(signals):
+            signals = signals.map(SIGNAL_CODES)
+        self.close = np.asarray(close, dtype=float)
+        if len(self.close) != len(signals) or len(self.close) < 2:
+            raise ValueError("close and signals must have the same length (at least 2 days)")
+
+        self.positions = positions_from_signals(signals.fillna(0).to_numpy())
+        self.returns = strategy_returns(self.positions, self.close)
+        self.asset_returns = strategy_returns(np.ones_like(self.positions), self.close)
+        self.block_size = max(1, min(block_size, len(self.close)))
+        self.seed = seed
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    @classmethod
+    def from_backtest_output(cls, path: str = "backtest_output.csv", **kwargs):
+        """Build the analyzer from the CSV written by run_backtest.py."""
+        df = pd.read_csv(path)
+        return cls(df['Close'], df['Signal'], **kwargs)
+
+    def _run_batches(self, function, n_total, fixed_args):
+        sizes = [min(BATCH_SIZE, n_total - start) for start in range(0, n_total, BATCH_SIZE)]
+        seeds = np.random.SeedSequence(self.seed).spawn(len(sizes))
+        tasks = [(*fixed_args, size, seed) for size, seed in zip(sizes, seeds)]
+
+        if self.max_workers == 1 or len(tasks) == 1:
+            results = [function(*task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(tasks))) as pool:
+                results = list(pool.map(function, *zip(*tasks)))
+
+        return {name: np.concatenate([batch[name] for batch in results]) for name in ROBUSTNESS_METRICS}
+
+    def observed(self) -> dict:
+        """Point estimates of ROBUSTNESS_METRICS on the actual series."""
+        metrics = performance_metrics(self.returns, self.positions)
+        return {name: metrics[name] for name in ROBUSTNESS_METRICS}
+
+    def bootstrap(self, n_resamples: int = 5000) -> dict:
+        """
+        Block-bootstrap distribution of each metric.
+
+        Whole blocks of consecutive (position, market return) days are resampled,
+        so the strategy's exposure pattern and volatility clustering are kept.
+
+        Args:
+            n_resamples (int): Number of resampled histories. Default: 5000.
+
+        Returns:
+            dict: Metric name -> np.ndarray of n_resamples values.
+        """
+        return self._run_batches(_block_bootstrap_batch, n_resamples,
+                                 (self.positions, self.asset_returns, self.block_size))
+
+    def permutation_test(self, n_permutations: int = 5000) -> dict:
+        """
+        Null distribution of each metric when signals carry no timing information.
+
+        Args:
+            n_permutations (int): Number of shuffles. Default: 5000.
+
+        Returns:
+            dict: Metric name -> np.ndarray of n_permutations values.
+        """
+        return self._run_batches(_permutation_batch, n_permutations,
+                                 (self.positions, self.asset_returns))
+
+    def run(self, n_resamples: int = 5000, n_permutations: int = 5000, confidence: float = 0.95) -> pd.DataFrame:
+        """
+        Confidence intervals and permutation p-values for every metric.
+
+        Args:
+            n_resamples (int): Bootstrap resamples. Default: 5000.
+            n_permutations (int): Signal permutations. Default: 5000.
+            confidence (float): Confidence level of the intervals. Default: 0.95.
+
+        Returns:
+            pd.DataFrame: Index ROBUSTNESS_METRICS, columns ['observed', 'ci_low',
+            'ci_high', 'p_value']. The p-value is the share of permutations at
+            least as good as the observed value.
+        """
+        observed = self.observed()
+        bootstrap = self.bootstrap(n_resamples)
+        permutations = self.permutation_test(n_permutations)
+        alpha = (1 - confidence) / 2
+
+        rows = {}
+        for name, higher_is_better in ROBUSTNESS_METRICS.items():
+            null = permutations[name]
+            as_good = null >= observed[name] if higher_is_better else null <= observed[name]
+            rows[name] = {
+                'observed': observed[name],
+                'ci_low': np.quantile(bootstrap[name], alpha),
+                'ci_high': np.quantile(bootstrap[name], 1 - alpha),
+                'p_value': (1 + as_good.sum()) / (1 + len(null)),
+            }
+        return pd.DataFrame.from_dict(rows, orient='index')
+
+
+if __name__ == "__main__":
+    analyzer = RobustnessAnalyzer.from_backtest_output("backtest_output.csv", seed=42)
+    print(analyzer.run())
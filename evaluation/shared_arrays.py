@@ -0,0 +1,61 @@
+import numpy as np
+from multiprocessing import shared_memory
+
+
+class SharedArrays:
+    """Publishes read-only NumPy arrays to worker processes through shared memory."""
+
+    def __init__(self, arrays: dict):
+        """
+        Copy each array into its own shared memory block.
+
+        Args:
+            arrays (dict): Name -> array-like. Arrays are copied once, in the parent.
+        """
+        self._blocks = []
+        self.spec = {}
+        for name, values in arrays.items():
+            values = np.ascontiguousarray(values)
+            block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)[...] = values
+            self._blocks.append(block)
+            self.spec[name] = (block.name, values.shape, values.dtype.str)
+
+    def close(self):
+        """Release and unlink every block (call once, in the parent)."""
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+_attached_blocks = []
+
+
+def attach_shared_arrays(spec: dict) -> dict:
+    """
+    Map the arrays described by SharedArrays.spec into the current process.
+
+    Meant to be called from a pool initializer; the blocks stay mapped for the
+    lifetime of the worker and the returned arrays are marked read-only.
+
+    Args:
+        spec (dict): Name -> (block name, shape, dtype string).
+
+    Returns:
+        dict: Name -> np.ndarray view on shared memory.
+    """
+    arrays = {}
+    for name, (block_name, shape, dtype) in spec.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        _attached_blocks.append(block)
+        view = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        view.flags.writeable = False
+        arrays[name] = view
+    return arrays
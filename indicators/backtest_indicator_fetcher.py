@@ -1,19 +1,25 @@
-import yfinance as yf
+import logging
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 from typing import Optional
 from datetime import datetime, timedelta
 from config.backtest_config import BacktestConfig
 from data.price_fetcher import PriceFetcher  # Assumed to return OHLC DataFrame
 
+logger = logging.getLogger(__name__)
+
 class TechnicalIndicators:
     """Computes technical indicators (RSI, ADX, P/E ratio) for a stock."""
 
     def __init__(self, ticker: str, price_fetcher: Optional[PriceFetcher] = None):
         self.ticker = ticker.upper()
         self.price_fetcher = price_fetcher or PriceFetcher()
-        self.stock = yf.Ticker(ticker)
+
+    @property
+    def stock(self):
+        """yfinance Ticker of the stock (yfinance is imported on first use)."""
+        import yfinance as yf
+        return yf.Ticker(self.ticker)
 
     def fetch_price_data(self, period = '6mo', interval ='1d') -> pd.DataFrame:
         try:
@@ -23,12 +29,12 @@ class TechnicalIndicators:
                 raise ValueError(f"Insufficient data for {self.ticker}. Required columns: {required_columns}")
             return df
         except Exception as e:
-            print(f"Error fetching price data for {self.ticker}: {e}")
+            logger.error("Error fetching price data for %s: %s", self.ticker, e)
             return pd.DataFrame()
 
     def compute_rsi(self, price_series: pd.Series, period: int = 14) -> pd.Series:
         if len(price_series) < period:
-            print(f"Warning: Insufficient data for RSI calculation (need {period} periods, got {len(price_series)})")
+            logger.warning("Insufficient data for RSI calculation (need %d periods, got %d)", period, len(price_series))
             return pd.Series(index=price_series.index, dtype=float)
 
         try:
@@ -43,17 +49,17 @@ class TechnicalIndicators:
             rsi = 100 - (100 / (1 + rs))
             return rsi.rename('RSI')
         except Exception as e:
-            print(f"Error computing RSI: {e}")
+            logger.error("Error computing RSI: %s", e)
             return pd.Series(index=price_series.index, dtype=float)
 
     def compute_adx(self, data: pd.DataFrame, period: int = 14) -> pd.DataFrame:
         required_columns = {'High', 'Low', 'Close'}
         if not required_columns.issubset(data.columns):
-            print(f"Error: Missing required columns for ADX: {required_columns - set(data.columns)}")
+            logger.error("Missing required columns for ADX: %s", required_columns - set(data.columns))
             return pd.DataFrame(index=data.index)
 
         if len(data) < period:
-            print(f"Warning: Insufficient data for ADX calculation (need {period} periods, got {len(data)})")
+            logger.warning("Insufficient data for ADX calculation (need %d periods, got %d)", period, len(data))
             return pd.DataFrame(index=data.index, columns=['PlusDI', 'MinusDI', 'ADX'])
 
         try:
@@ -83,32 +89,38 @@ class TechnicalIndicators:
                 'ADX': adx
             }, index=data.index)
         except Exception as e:
-            print(f"Error computing ADX: {e}")
+            logger.error("Error computing ADX: %s", e)
             return pd.DataFrame(index=data.index, columns=['PlusDI', 'MinusDI', 'ADX'])
 
     def get_pe_ratio(self) -> Optional[float]:
         try:
-            info = self.stock.info
+            info = self.price_fetcher.fetch_info(self.ticker)
             pe_ratio = info.get('trailingPE')
             if pe_ratio is None:
-                print(f"Warning: P/E ratio not available for {self.ticker}")
+                logger.info("P/E ratio not available for %s", self.ticker)
             return pe_ratio
         except Exception as e:
-            print(f"Error fetching P/E ratio for {self.ticker}: {e}")
+            logger.warning("Error fetching P/E ratio for %s: %s", self.ticker, e)
             return None
 
-    def compute_indicators_on_date_range(self, start_date, end_date, interval: str = '1d', rsi_period: int = 14, adx_period: int = 14) -> pd.DataFrame:
+    def compute_indicators_on_date_range(self, start_date, end_date, interval: str = '1d', rsi_period: int = 14, adx_period: int = 14,
+                                         price_data: Optional[pd.DataFrame] = None) -> pd.DataFrame:
         results = []
         start_dt = pd.to_datetime(start_date)
         end_dt = pd.to_datetime(end_date)
 
-        full_data = self.fetch_price_data(period='1y', interval=interval)
+        if price_data is not None:
+            # Storico già disponibile (es. condiviso dal runner di portafoglio)
+            full_data = price_data.copy()
+        else:
+            full_data = self.fetch_price_data(period='1y', interval=interval)
         if full_data.empty:
-            print("No price data available.")
+            logger.warning("No price data available for %s", self.ticker)
             return pd.DataFrame()
 
         # Rimuovi il timezone dall'indice
-        full_data.index = full_data.index.tz_localize(None)
+        if full_data.index.tz is not None:
+            full_data.index = full_data.index.tz_localize(None)
 
 
         for single_date in pd.date_range(start=start_dt, end=end_dt):
@@ -116,7 +128,7 @@ class TechnicalIndicators:
             start_window = end_window - timedelta(days=40)
 
 
-            print(f"→ {single_date.date()} | Window: {start_window.date()} to {end_window.date()}")
+            logger.debug("%s | Window: %s to %s", single_date.date(), start_window.date(), end_window.date())
 
 
             window_data = full_data[(full_data.index >= start_window) & (full_data.index <= end_window)]
@@ -128,9 +140,9 @@ class TechnicalIndicators:
 
 
             if rsi_series.empty:
-                print(f"  - RSI is empty after dropna()")
+                logger.debug("%s: RSI is empty after dropna()", single_date.date())
             if adx_df['ADX'].empty:
-                print(f"  - ADX is empty after dropna()")
+                logger.debug("%s: ADX is empty after dropna()", single_date.date())
 
             try:
                 rsi_value = rsi_series.iloc[-1]
@@ -141,10 +153,10 @@ class TechnicalIndicators:
                     'RSI': rsi_value,
                     'ADX': adx_value
                 })
-                print(f"\n Appended indicators: RSI={rsi_value:.2f}, ADX={adx_value:.2f}")
+                logger.debug("%s: RSI=%.2f, ADX=%.2f", single_date.date(), rsi_value, adx_value)
 
             except Exception as e:
-                print(f"   Skipping due to error: {e}")
+                logger.debug("%s: skipping due to error: %s", single_date.date(), e)
 
         df = pd.DataFrame(results)
 
@@ -152,25 +164,51 @@ class TechnicalIndicators:
             
 
         if df.empty:
-            print("\nFinal result: No indicators computed.\n")
+            logger.warning("No indicators computed for %s", self.ticker)
             return df
 
         df['Date'] = pd.to_datetime(df['Date'])
         df.set_index('Date', inplace=True)
 
-        print(f"\nFinal DataFrame with {len(df)} rows computed.")
+        logger.info("%s: indicators computed for %d days", self.ticker, len(df))
         return df
 
 
 
         if df.empty:
-            print("\nFinal result: No indicators computed.\n")
+            logger.warning("No indicators computed for %s", self.ticker)
             return df
 
         df['Date'] = pd.to_datetime(df['Date'])
         df.set_index('Date', inplace=True)
 
-        print(f"\n Final DataFrame with {len(df)} rows computed.")
+        logger.info("%s: indicators computed for %d days", self.ticker, len(df))
+        return df
+
+    def compute_indicators_on_bars(self, price_data: pd.DataFrame, start=None, end=None, rsi_period: int = 14,
+                                   adx_period: int = 14) -> pd.DataFrame:
+        """
+        RSI and ADX of every bar of an intraday (or any) series, computed once over
+        the full series instead of over a calendar window per day.
+
+        Bars before start are the warm-up of the indicators; periods are in bars.
+
+        Args:
+            price_data (pd.DataFrame): OHLC bars, sorted, one row per bar.
+            start, end (optional): Bars to return (inclusive). Default: all.
+            rsi_period, adx_period (int): Periods in bars. Default: 14.
+
+        Returns:
+            pd.DataFrame: Index = bar times; columns RSI and ADX (bars where either is
+            not defined yet are dropped).
+        """
+        rsi = self.compute_rsi(price_data['Close'], rsi_period)
+        adx = self.compute_adx(price_data, adx_period)
+        if 'ADX' not in adx.columns:
+            return pd.DataFrame(columns=['RSI', 'ADX'])
+        df = pd.DataFrame({'RSI': rsi, 'ADX': adx['ADX']}, index=price_data.index).loc[start:end].dropna()
+
+        logger.info("%s: indicators computed for %d bars", self.ticker, len(df))
         return df
  
 # === MAIN EXECUTION BLOCK ===
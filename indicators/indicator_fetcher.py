@@ -1,11 +1,12 @@
-import yfinance as yf
+import logging
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 from typing import Optional, Tuple
 
 from data.price_fetcher import PriceFetcher  # Assumed to return OHLC DataFrame
 
+logger = logging.getLogger(__name__)
+
 class TechnicalIndicators:
     """Computes technical indicators (RSI, ADX, P/E ratio) for a stock."""
 
@@ -19,7 +20,12 @@ class TechnicalIndicators:
         """
         self.ticker = ticker.upper()
         self.price_fetcher = price_fetcher or PriceFetcher()
-        self.stock = yf.Ticker(ticker)
+
+    @property
+    def stock(self):
+        """yfinance Ticker of the stock (yfinance is imported on first use)."""
+        import yfinance as yf
+        return yf.Ticker(self.ticker)
 
     def fetch_price_data(self, period: str = '6mo', interval: str = '1d') -> pd.DataFrame:
         """
@@ -39,7 +45,7 @@ class TechnicalIndicators:
                 raise ValueError(f"Insufficient data for {self.ticker}. Required columns: {required_columns}")
             return df
         except Exception as e:
-            print(f"Error fetching price data for {self.ticker}: {e}")
+            logger.error("Error fetching price data for %s: %s", self.ticker, e)
             return pd.DataFrame()
 
     def compute_rsi(self, price_series: pd.Series, period: int = 14) -> pd.Series:
@@ -54,7 +60,7 @@ class TechnicalIndicators:
             pd.Series: RSI values.
         """
         if len(price_series) < period:
-            print(f"Warning: Insufficient data for RSI calculation (need {period} periods, got {len(price_series)})")
+            logger.warning("Insufficient data for RSI calculation (need %d periods, got %d)", period, len(price_series))
             return pd.Series(index=price_series.index, dtype=float)
 
         try:
@@ -70,7 +76,7 @@ class TechnicalIndicators:
             rsi = 100 - (100 / (1 + rs))
             return rsi.rename('RSI')
         except Exception as e:
-            print(f"Error computing RSI: {e}")
+            logger.error("Error computing RSI: %s", e)
             return pd.Series(index=price_series.index, dtype=float)
 
     def compute_adx(self, data: pd.DataFrame, period: int = 14) -> pd.DataFrame:
@@ -86,11 +92,11 @@ class TechnicalIndicators:
         """
         required_columns = {'High', 'Low', 'Close'}
         if not required_columns.issubset(data.columns):
-            print(f"Error: Missing required columns for ADX: {required_columns - set(data.columns)}")
+            logger.error("Missing required columns for ADX: %s", required_columns - set(data.columns))
             return pd.DataFrame(index=data.index)
 
         if len(data) < period:
-            print(f"Warning: Insufficient data for ADX calculation (need {period} periods, got {len(data)})")
+            logger.warning("Insufficient data for ADX calculation (need %d periods, got %d)", period, len(data))
             return pd.DataFrame(index=data.index, columns=['PlusDI', 'MinusDI', 'ADX'])
 
         try:
@@ -127,7 +133,7 @@ class TechnicalIndicators:
                 'ADX': adx
             }, index=data.index)
         except Exception as e:
-            print(f"Error computing ADX: {e}")
+            logger.error("Error computing ADX: %s", e)
             return pd.DataFrame(index=data.index, columns=['PlusDI', 'MinusDI', 'ADX'])
 
     def get_pe_ratio(self) -> Optional[float]:
@@ -138,17 +144,18 @@ class TechnicalIndicators:
             Optional[float]: P/E ratio or None if unavailable.
         """
         try:
-            info = self.stock.info
+            info = self.price_fetcher.fetch_info(self.ticker)
             pe_ratio = info.get('trailingPE')
             if pe_ratio is None:
-                print(f"Warning: P/E ratio not available for {self.ticker}")
+                logger.info("P/E ratio not available for %s", self.ticker)
             return pe_ratio
         except Exception as e:
-            print(f"Error fetching P/E ratio for {self.ticker}: {e}")
+            logger.warning("Error fetching P/E ratio for %s: %s", self.ticker, e)
             return None
 
     def compute_indicators(self, period: str = '6mo', interval: str = '1d',
-                        rsi_period: int = 14, adx_period: int = 14) -> Tuple[Optional[float], Optional[float], Optional[float]]:
+                        rsi_period: int = 14, adx_period: int = 14,
+                        price_data: Optional[pd.DataFrame] = None) -> Tuple[Optional[float], Optional[float], Optional[float]]:
         """
         Compute RSI, ADX, and P/E ratio for the latest available day.
 
@@ -157,11 +164,13 @@ class TechnicalIndicators:
             interval (str): Data interval. Default: '1d'.
             rsi_period (int): RSI lookback period. Default: 14.
             adx_period (int): ADX lookback period. Default: 14.
+            price_data (pd.DataFrame, optional): OHLC history already fetched (e.g. from
+                PriceFetcher.fetch_price_panel). When omitted it is downloaded.
 
         Returns:
             Tuple[RSI (float), ADX (float), P/E ratio (float)]: Latest values, or None if unavailable.
         """
-        df = self.fetch_price_data(period, interval)
+        df = self.fetch_price_data(period, interval) if price_data is None else price_data
         if df.empty:
             return None, None, None
 
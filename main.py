@@ -1,13 +1,66 @@
-from flask import Flask, render_template, request
-from data.price_fetcher import PriceFetcher
-from data.sentiment_fetcher import SentimentFetcher
-from data.sentiment_cleaner import SentimentCleaner
-from sentiment.sentiment_analyzer import SentimentAnalyzer
-from indicators.indicator_fetcher import TechnicalIndicators
-from strategy.strategy_computation import HybridStrategy
-from evaluation.report_generator import GenerateReport
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, jsonify, make_response, render_template, request, url_for
+from config.services import get_services
+from monitoring.logs import configure_logging
+from monitoring.metrics import CONTENT_TYPE, REGISTRY
+from monitoring.profiling import PROFILE_HEADER, profile_settings, profiled
+from pipeline.analysis import analyze_ticker
+from pipeline.jobs import JobWorkerPool
+from pipeline.watchlist import MAX_WATCHLIST_SIZE, analyze_watchlist
+from strategy.strategy_computation import RSI_MODES
 
 app = Flask(__name__)
+configure_logging()
+logger = logging.getLogger(__name__)
+
+# Configurazione e client condivisi, creati una sola volta all'avvio (in background: l'app risponde subito)
+services = get_services()
+if os.environ.get("HTA_WARM_UP", "1") != "0":
+    services.warm_up(background=True)
+
+# Worker locali per le analisi asincrone (/jobs): le richieste web non aspettano le API esterne.
+# Partono con la prima richiesta, così importare l'app non crea la coda su disco né avvia thread
+_job_workers = None
+_job_workers_lock = threading.Lock()
+
+SSE_KEEPALIVE_SECONDS = 15
+LLM_REPORTS = (services.settings.get('report') or {}).get('llm_enhanced', True)
+PROFILE_REQUESTS = profile_settings(services.settings)['allow_requests']
+
+
+def job_workers() -> JobWorkerPool:
+    """The process's job worker pool, created and started on first use."""
+    global _job_workers
+    with _job_workers_lock:
+        if _job_workers is None:
+            _job_workers = JobWorkerPool(services, services.job_store,
+                                         workers=(services.settings.get('jobs') or {}).get('workers', 4)).start()
+        return _job_workers
+
+
+@app.before_request
+def start_job_workers():
+    # I job rimasti in coda da un processo precedente ripartono alla prima richiesta di qualsiasi tipo
+    if _job_workers is None:
+        job_workers()
+
+
+def sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def profiling_requested() -> bool:
+    """?profile=1 or the X-HTA-Profile header, honoured only if profiling.allow_requests is set."""
+    if not PROFILE_REQUESTS:
+        return False
+    flag = request.headers.get(PROFILE_HEADER) or request.args.get('profile') or ''
+    return flag.lower() in ('1', 'true', 'yes')
 
 
 @app.route('/analyze', methods=['POST'])
@@ -15,45 +68,50 @@ def analyze():
     ticker = request.form['ticker'].strip().upper()
     rsi_mode = request.form.get('rsi_mode', 'standard')
     
+    profile_path = None
     try:
-        
-        price_fetcher = PriceFetcher()
-        sentiment_fetcher = SentimentFetcher()
-        sentiment_cleaner = SentimentCleaner()
-        sentiment_analyzer = SentimentAnalyzer()
-        indicators_computation = TechnicalIndicators(ticker)
-        report_generator = GenerateReport()
-
-        # 1. Estrazione dati
-        price_df = price_fetcher.fetch_price_data(ticker, period="30d")
-        sentiment_df = sentiment_fetcher.fetch_sentiment_data(ticker, period="7d")
-
-        # 2. Pulizia e analisi sentiment
-        cleaned_df = sentiment_cleaner.clean_sentiment_data(sentiment_df)
-        analyzed_df, sentiment_score = sentiment_analyzer.analyze_sentiment(cleaned_df)
-
-        # 3. Calcolo indicatori tecnici
-        rsi, adx, pe_ratio = indicators_computation.compute_indicators()
-        print(f"RSI: {rsi}, ADX: {adx}, P/E Ratio: {pe_ratio}")
-
-        # 4. Calcolo segnale strategico
-        strategy = HybridStrategy()
-        final_signal, confidence, total_score, explanation = strategy.generate_trading_signal(rsi, adx, pe_ratio, sentiment_score, rsi_mode)
+        def run_pipeline(executor=services.stage_executor):
+            with services.request_handles(ticker) as handles:
+                # Ramo indicatori e ramo sentiment (fetch -> pulizia -> analisi) in parallelo,
+                # poi segnale strategico e report
+                return analyze_ticker(handles, ticker, rsi_mode, executor=executor)
+
+        if profiling_requested():
+            # Esecuzione profilata: niente cache, stage su un pool privato campionato insieme
+            # al thread della richiesta e ai thread di scoring
+            prefix = f"profile-{uuid.uuid4().hex[:8]}"
+            with profiled(f"analyze-{ticker}-{rsi_mode}", services.settings,
+                          thread_prefixes=(prefix, "scoring")) as profiler:
+                with ThreadPoolExecutor(max_workers=services.stage_workers, thread_name_prefix=prefix) as executor:
+                    result = run_pipeline(executor)
+            profile_path = profiler.path
+        else:
+            # Richieste uguali nella stessa finestra di validità condividono un'unica esecuzione
+            # (o il risultato già precalcolato per la watchlist)
+            result = services.analysis(ticker, rsi_mode, run_pipeline)
+
+        final_signal = result['final_signal']
+        confidence = result['confidence']
+        report = result['report']
 
         # Format sentiment_score for display
-        sentiment_score = f"{sentiment_score:.2f}"
+        sentiment_score = f"{result['sentiment_score']:.2f}"
 
-        # 5. report
-        report = report_generator.generate_report(ticker, sentiment_score, final_signal, confidence, explanation)
-        
-        return render_template("index.html", 
+        # Il report del modello arriva dopo, in streaming, al posto di quello istantaneo
+        report_stream_url = url_for('stream_report', ticker=ticker, rsi_mode=rsi_mode) if LLM_REPORTS else None
+
+        response = make_response(render_template("index.html", 
                             ticker=ticker,
                             sentiment_score=sentiment_score,
                             final_signal=final_signal,
                             confidence=confidence,
                             error=None,
                             rsi_mode=rsi_mode,
-                            report=report)
+                            report=report,
+                            report_stream_url=report_stream_url))
+        if profile_path:
+            response.headers[PROFILE_HEADER] = os.path.basename(profile_path)
+        return response
 
     except Exception as e:
         return render_template("index.html", 
@@ -65,6 +123,111 @@ def analyze():
                             rsi_mode=rsi_mode,
                             report=None)
 
+@app.route('/api/analyze', methods=['POST'])
+def analyze_batch():
+    """JSON API: {"tickers": [...], "rsi_mode": "standard"} -> per-ticker signals."""
+    payload = request.get_json(silent=True) or {}
+    tickers = payload.get('tickers')
+    rsi_mode = payload.get('rsi_mode', 'standard')
+
+    if not isinstance(tickers, list) or not tickers or not all(isinstance(t, str) for t in tickers):
+        return jsonify(error="'tickers' must be a non-empty list of strings"), 400
+    if len(tickers) > MAX_WATCHLIST_SIZE:
+        return jsonify(error=f"At most {MAX_WATCHLIST_SIZE} tickers per request"), 400
+    if rsi_mode not in RSI_MODES:
+        return jsonify(error=f"'rsi_mode' must be one of {list(RSI_MODES)}"), 400
+
+    return jsonify(analyze_watchlist(services, tickers, rsi_mode))
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue an analysis; accepts the same fields as /analyze, as a form or JSON."""
+    payload = request.get_json(silent=True) or request.form
+    ticker = (payload.get('ticker') or '').strip().upper()
+    rsi_mode = payload.get('rsi_mode', 'standard')
+
+    if not ticker:
+        return jsonify(error="'ticker' is required"), 400
+    if rsi_mode not in RSI_MODES:
+        return jsonify(error=f"'rsi_mode' must be one of {list(RSI_MODES)}"), 400
+
+    job_id = job_workers().submit(ticker, rsi_mode)
+    report_stream_url = url_for('stream_report', ticker=ticker, rsi_mode=rsi_mode) if LLM_REPORTS else None
+    return jsonify(job_id=job_id,
+                   status_url=url_for('job_status', job_id=job_id),
+                   events_url=url_for('job_events', job_id=job_id),
+                   report_stream_url=report_stream_url), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Polling: status, progress events so far and, when done, the result."""
+    job = services.job_store.get(job_id)
+    if job is None:
+        return jsonify(error="Unknown job"), 404
+    job['events'] = services.job_store.events(job_id)
+    return jsonify(job)
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """Server-Sent Events: one event per completed stage, then 'done' or 'failed'."""
+    if services.job_store.get(job_id) is None:
+        return jsonify(error="Unknown job"), 404
+    try:
+        after = int(request.headers.get('Last-Event-ID') or request.args.get('after', 0))
+    except ValueError:
+        return jsonify(error="'Last-Event-ID' / 'after' must be an integer"), 400
+
+    def stream(after):
+        last_sent = time.monotonic()
+        while True:
+            for event in services.job_store.events(job_id, after):
+                after = event['seq']
+                last_sent = time.monotonic()
+                yield f"id: {after}\nevent: {event['stage']}\ndata: {json.dumps(event['payload'], default=str)}\n\n"
+                if event['stage'] in ('done', 'failed'):
+                    return
+            if time.monotonic() - last_sent > SSE_KEEPALIVE_SECONDS:
+                last_sent = time.monotonic()
+                yield ": keep-alive\n\n"
+            time.sleep(job_workers().poll_interval)
+
+    return Response(stream(after), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/report/stream', methods=['GET'])
+def stream_report():
+    """
+    Server-Sent Events: the LLM report of an analysis already computed in the
+    current cache window, as 'token' events followed by 'done' (the full text).
+    """
+    ticker = request.args.get('ticker', '').strip().upper()
+    rsi_mode = request.args.get('rsi_mode', 'standard')
+    result = services.precomputed(ticker, rsi_mode) or services.result_cache.get(ticker, rsi_mode)
+    if result is None:
+        return jsonify(error="No recent analysis for this ticker; run it first"), 404
+
+    inputs = (ticker, f"{result['sentiment_score']:.2f}", result['final_signal'],
+              result['confidence'], result['explanation'])
+
+    def stream():
+        parts = []
+        try:
+            for piece in services.report_generator.stream_report(*inputs):
+                parts.append(piece)
+                yield sse('token', piece)
+            yield sse('done', "".join(parts).strip())
+        except Exception as e:
+            logger.warning("Report streaming failed for %s: %s", ticker, e)
+            yield sse('failed', str(e))
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    # Tempi per stage, chiamate esterne (esiti, latenze, retry) e cache, in formato Prometheus
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
 @app.route('/', methods=['GET'])
 def home():
     # Pagina iniziale pulita senza risultati
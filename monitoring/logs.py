@@ -0,0 +1,26 @@
+import logging
+import os
+from config.settings_loader import load_settings
+
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(threadName)s] %(name)s: %(message)s"
+
+
+def configure_logging(settings: dict = None, config_path: str = None, level: str = None):
+    """
+    Configure the root logger of an entry point from the 'logging' section of settings.yaml.
+
+    The HTA_LOG_LEVEL environment variable takes precedence over the file, so
+    e.g. HTA_LOG_LEVEL=DEBUG shows every post, article and backtest day.
+
+    Args:
+        settings (dict, optional): Already loaded settings.
+        config_path (str, optional): settings.yaml path, used when settings is not given.
+        level (str, optional): Level name overriding both (e.g. 'WARNING').
+    """
+    if settings is None:
+        settings = load_settings(config_path)
+
+    section = (settings or {}).get('logging') or {}
+    level = level or os.environ.get("HTA_LOG_LEVEL") or section.get('level') or "INFO"
+    logging.basicConfig(level=level.upper(), format=LOG_FORMAT)
+    logging.getLogger().setLevel(level.upper())
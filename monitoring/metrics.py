@@ -0,0 +1,208 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Limiti degli istogrammi di latenza (secondi): da una lettura in cache a una chiamata LLM lenta
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(labelnames: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def samples(self) -> list:
+        with self._lock:
+            return [(self.name, _format_labels(self.labelnames, key), value)
+                    for key, value in sorted(self._values.items())]
+
+
+class Histogram:
+    """Cumulative histogram (Prometheus semantics) with optional labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Conteggi per bucket (+Inf in fondo), somma, numero di osservazioni
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            return series[2] if series else 0
+
+    def samples(self) -> list:
+        samples = []
+        with self._lock:
+            series_items = sorted((key, (list(counts), total, count))
+                                  for key, (counts, total, count) in self._series.items())
+        for key, (counts, total, count) in series_items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                samples.append((f"{self.name}_bucket", _format_labels(self.labelnames, key, le), cumulative))
+            samples.append((f"{self.name}_sum", _format_labels(self.labelnames, key), total))
+            samples.append((f"{self.name}_count", _format_labels(self.labelnames, key), count))
+        return samples
+
+
+class MetricsRegistry:
+    """Process-wide set of metrics, rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric '{metric.name}' already registered with a different type or labels")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (),
+                  buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines += [f"{name}{labels} {_format_value(value)}" for name, labels, value in metric.samples()]
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "hta_stage_duration_seconds", "Wall-clock time of pipeline stages.", ("stage",))
+STAGE_ERRORS = REGISTRY.counter(
+    "hta_stage_errors_total", "Pipeline stages that raised.", ("stage",))
+EXTERNAL_CALLS = REGISTRY.counter(
+    "hta_external_calls_total", "Calls to external providers by outcome (ok, error).", ("provider", "outcome"))
+EXTERNAL_SECONDS = REGISTRY.histogram(
+    "hta_external_call_duration_seconds", "Latency of calls to external providers, retries included.", ("provider",))
+EXTERNAL_RETRIES = REGISTRY.counter(
+    "hta_external_retries_total", "HTTP retries made by provider clients.", ("provider",))
+CACHE_REQUESTS = REGISTRY.counter(
+    "hta_cache_requests_total", "Cache lookups in front of providers and pipeline by result (hit, miss).",
+    ("cache", "provider", "result"))
+
+_current = threading.local()
+
+
+@contextmanager
+def external_call(provider: str):
+    """
+    Time and count one logical call to a provider.
+
+    HTTP retries made inside the block by the instrumented clients (see
+    note_request and note_retry) are attributed to provider.
+    """
+    outer = getattr(_current, "call", None)
+    call = _current.call = {"provider": provider, "requests": 0, "retries": 0}
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        EXTERNAL_CALLS.inc(provider=provider, outcome="error")
+        raise
+    else:
+        EXTERNAL_CALLS.inc(provider=provider, outcome="ok")
+    finally:
+        EXTERNAL_SECONDS.observe(time.perf_counter() - start, provider=provider)
+        retries = call["retries"] + max(call["requests"] - 1, 0)
+        if retries:
+            EXTERNAL_RETRIES.inc(retries, provider=provider)
+        _current.call = outer
+
+
+def note_request(*args):
+    """HTTP client hook: one request sent for the current external_call (attempts after the first are retries)."""
+    call = getattr(_current, "call", None)
+    if call is not None:
+        call["requests"] += 1
+
+
+def note_retry():
+    """HTTP client hook: one retry made for the current external_call."""
+    call = getattr(_current, "call", None)
+    if call is not None:
+        call["retries"] += 1
+
+
+def cache_lookup(cache: str, provider: str, hit: bool, count: int = 1):
+    if count:
+        CACHE_REQUESTS.inc(count, cache=cache, provider=provider, result="hit" if hit else "miss")
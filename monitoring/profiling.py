@@ -0,0 +1,175 @@
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from itertools import count
+from contextlib import contextmanager
+from config.settings_loader import load_settings
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+PROFILE_HEADER = "X-HTA-Profile"
+MAX_DEPTH = 256
+
+_sequence = count(1)
+
+logger = logging.getLogger(__name__)
+
+
+def _frame_label(code, labels: dict) -> str:
+    label = labels.get(code)
+    if label is None:
+        path = os.path.abspath(code.co_filename)
+        if path.startswith(PROJECT_ROOT + os.sep):
+            path = os.path.relpath(path, PROJECT_ROOT)
+        elif "site-packages" + os.sep in path:
+            path = path.split("site-packages" + os.sep, 1)[1]
+        else:
+            path = os.path.basename(path)
+        label = labels[code] = f"{code.co_name} ({path}:{code.co_firstlineno})"
+    return label
+
+
+def _is_idle_worker(codes: list) -> bool:
+    """True if the stack (root first) is a ThreadPoolExecutor worker waiting for work."""
+    for position, code in enumerate(codes):
+        if code.co_name == "_worker" and code.co_filename.endswith(os.path.join("concurrent", "futures", "thread.py")):
+            # In attesa sulla coda (chiamata C, nessun frame Python) o su un lock: non sta eseguendo un task
+            return position + 1 == len(codes) or codes[position + 1].co_name != "run"
+    return False
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler producing folded stacks.
+
+    A daemon thread takes the Python stack of the selected threads every
+    interval seconds; identical stacks are counted. The result is written in
+    the folded ("collapsed") format read by flamegraph.pl, inferno, speedscope
+    and most flamegraph viewers: one line per stack, frames separated by ';'
+    from the root (the thread) to the leaf, then the number of samples.
+    Idle thread-pool workers are not sampled.
+    """
+
+    def __init__(self, interval: float = 0.005, thread_prefixes: tuple = None):
+        """
+        Args:
+            interval (float): Seconds between samples. Default: 0.005.
+            thread_prefixes (tuple, optional): Sample only the thread that calls start()
+                and the threads whose name starts with one of these prefixes. Default:
+                every thread of the process.
+        """
+        self.interval = interval
+        self.thread_prefixes = tuple(thread_prefixes) if thread_prefixes else None
+        self.stacks = Counter()
+        self.samples = 0
+        self.elapsed = 0.0
+        self.path = None
+        self._started = None
+        self._labels = {}
+        self._owner = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        self._owner = threading.get_ident()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self._started
+
+    def _thread_root(self, ident: int, name: str) -> str:
+        if ident == self._owner:
+            return "caller"
+        # I thread dei pool si chiamano prefisso_N: un'unica radice per pool
+        return re.sub(r"_\d+$", "", name)
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                name = names.get(ident, str(ident))
+                if (self.thread_prefixes is not None and ident != self._owner
+                        and not name.startswith(self.thread_prefixes)):
+                    continue
+                codes = []
+                while frame is not None and len(codes) < MAX_DEPTH:
+                    codes.append(frame.f_code)
+                    frame = frame.f_back
+                codes.reverse()
+                if _is_idle_worker(codes):
+                    continue
+                stack = (self._thread_root(ident, name),) + tuple(_frame_label(code, self._labels) for code in codes)
+                self.stacks[stack] += 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+    def write(self, path: str) -> str:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(self.folded())
+        return path
+
+
+def profile_settings(settings: dict = None, config_path: str = None) -> dict:
+    """
+    The 'profiling' section of settings.yaml with defaults, the output
+    directory resolved against the project root.
+    """
+    if settings is None:
+        settings = load_settings(config_path)
+
+    section = dict((settings or {}).get('profiling') or {})
+    path = section.get('path') or "cache/profiles"
+    if not os.path.isabs(path):
+        # I percorsi relativi in settings.yaml sono relativi alla radice del progetto
+        path = os.path.join(PROJECT_ROOT, path)
+    section['path'] = path
+    section.setdefault('interval_ms', 5)
+    section.setdefault('allow_requests', False)
+    return section
+
+
+@contextmanager
+def profiled(label: str, settings: dict = None, thread_prefixes: tuple = None):
+    """
+    Profile the enclosed block and write its folded stacks to the profiling directory.
+
+    The file is named '<time>-<label>-<pid>-<n>.folded'; its path is left in the
+    profiler's 'path' attribute and logged.
+
+    Args:
+        label (str): Name of the run, e.g. 'analyze-AAPL-standard'.
+        settings (dict, optional): Already loaded settings. Default: config/settings.yaml.
+        thread_prefixes (tuple, optional): See SamplingProfiler. Default: every thread.
+
+    Yields:
+        SamplingProfiler: The running profiler.
+    """
+    options = profile_settings(settings)
+    profiler = SamplingProfiler(options['interval_ms'] / 1000, thread_prefixes)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        name = (f"{time.strftime('%Y%m%d-%H%M%S')}-{re.sub(r'[^A-Za-z0-9._-]', '_', label)}"
+                f"-{os.getpid()}-{next(_sequence)}.folded")
+        try:
+            profiler.path = profiler.write(os.path.join(options['path'], name))
+            logger.info("Profile of %s: %d samples over %.2fs written to %s",
+                        label, profiler.samples, profiler.elapsed, profiler.path)
+        except OSError as e:
+            logger.warning("Could not write profile of %s: %s", label, e)
@@ -0,0 +1,113 @@
+import logging
+from strategy.strategy_computation import HybridStrategy
+from evaluation.report_generator import template_report
+from pipeline.stage_graph import StageGraph
+
+REPORT_MODES = ("template", "llm")
+
+logger = logging.getLogger(__name__)
+
+
+def stage_summary(name: str, result) -> dict:
+    """JSON-friendly partial result of a stage, for progress reporting."""
+    if name in ("sentiment_fetch", "sentiment_clean"):
+        return {"items": int(len(result))}
+    if name == "sentiment_score":
+        return {"sentiment_score": float(result[1])}
+    if name == "indicators":
+        rsi, adx, pe_ratio = result
+        return {"rsi": rsi, "adx": adx, "pe_ratio": pe_ratio}
+    if name == "strategy":
+        final_signal, confidence, total_score, explanation = result
+        return {"final_signal": final_signal, "confidence": confidence,
+                "total_score": float(total_score), "explanation": explanation}
+    if name == "report":
+        return {"report": result}
+    return {}
+
+
+def build_analysis_graph(handles, ticker: str, rsi_mode: str, price_data=None,
+                         report: str = "template") -> StageGraph:
+    """
+    Stages of the /analyze pipeline.
+
+    The indicator branch and the sentiment branch (fetch -> clean -> score) are
+    independent until the strategy stage, so they run concurrently.
+
+    Args:
+        handles (RequestHandles): Pipeline objects (see config.services).
+        ticker (str): Upper-case ticker.
+        rsi_mode (str): RSI profile.
+        price_data (pd.DataFrame, optional): Daily OHLC history already fetched (watchlists);
+            replaces the price fetch stages.
+        report (str, optional): Report stage: 'template' (instant, deterministic), 'llm'
+            (blocking model call) or None (no report). Default: 'template'.
+    """
+    if report is not None and report not in REPORT_MODES:
+        raise ValueError(f"Invalid report mode '{report}', expected one of {REPORT_MODES} or None")
+    strategy = HybridStrategy()
+
+    def signal(sentiment_score, indicators):
+        rsi, adx, pe_ratio = indicators
+        logger.debug("%s: RSI: %s, ADX: %s, P/E Ratio: %s", ticker, rsi, adx, pe_ratio)
+        return strategy.generate_trading_signal(rsi, adx, pe_ratio, sentiment_score[1], rsi_mode)
+
+    def write_report(sentiment_score, strategy):
+        final_signal, confidence, total_score, explanation = strategy
+        if report == "template":
+            return template_report(ticker, sentiment_score[1], final_signal, confidence, explanation)
+        return handles.report_generator.generate_report(
+            ticker, f"{sentiment_score[1]:.2f}", final_signal, confidence, explanation
+        )
+
+    graph = StageGraph()
+    if price_data is None:
+        graph.add("price_fetch", lambda: handles.price_fetcher.fetch_price_data(ticker, period="30d"))
+    graph.add("sentiment_fetch", lambda: handles.sentiment_fetcher.fetch_sentiment_data(ticker, period="7d"))
+    graph.add("sentiment_clean", lambda sentiment_fetch: handles.sentiment_cleaner.clean_sentiment_data(sentiment_fetch),
+              deps=("sentiment_fetch",))
+    graph.add("sentiment_score", lambda sentiment_clean: handles.sentiment_analyzer.analyze_sentiment(sentiment_clean),
+              deps=("sentiment_clean",))
+    graph.add("indicators", lambda: handles.indicators.compute_indicators(price_data=price_data))
+    graph.add("strategy", signal, deps=("sentiment_score", "indicators"))
+    if report is not None:
+        graph.add("report", write_report, deps=("sentiment_score", "strategy"))
+    return graph
+
+
+def analyze_ticker(handles, ticker: str, rsi_mode: str, executor=None, on_stage_complete=None,
+                   price_data=None, report: str = "template") -> dict:
+    """
+    Run the full analysis for one ticker.
+
+    Args:
+        handles (RequestHandles): Pipeline objects (see config.services).
+        ticker (str): Upper-case ticker.
+        rsi_mode (str): RSI profile.
+        executor (ThreadPoolExecutor, optional): Shared pool for the stages.
+        on_stage_complete (callable, optional): Progress callback, see StageGraph.run.
+        price_data, report: See build_analysis_graph.
+
+    Returns:
+        dict: ticker, rsi_mode, sentiment_score, rsi, adx, pe_ratio, final_signal,
+        confidence, total_score, explanation, report (None without the report stage)
+        and timings (seconds per stage).
+    """
+    graph = build_analysis_graph(handles, ticker, rsi_mode, price_data, report)
+    results = graph.run(executor, on_stage_complete)
+    rsi, adx, pe_ratio = results["indicators"]
+    final_signal, confidence, total_score, explanation = results["strategy"]
+    return {
+        "ticker": ticker,
+        "rsi_mode": rsi_mode,
+        "sentiment_score": results["sentiment_score"][1],
+        "rsi": rsi,
+        "adx": adx,
+        "pe_ratio": pe_ratio,
+        "final_signal": final_signal,
+        "confidence": confidence,
+        "total_score": total_score,
+        "explanation": explanation,
+        "report": results.get("report"),
+        "timings": dict(graph.timings),
+    }
@@ -0,0 +1,201 @@
+import logging
+import os
+import socket
+import threading
+import time
+from collections import Counter
+
+import pandas as pd
+
+from data.work_queue import task_id
+from pipeline.analysis import analyze_ticker
+
+SENTIMENT_COLUMNS = ['NewsSentiment', 'RedditSentiment']
+ANALYSIS_COLUMNS = ['signal', 'confidence', 'total_score', 'sentiment_score', 'rsi', 'adx', 'pe_ratio', 'explanation']
+
+logger = logging.getLogger(__name__)
+
+
+def _json_number(value):
+    return None if value is None else float(value)
+
+
+def analysis_tasks(tickers: list, rsi_modes: tuple = ("standard",)) -> list:
+    """One 'analyze' task per ticker, covering every RSI profile (they share the corpus)."""
+    tickers = list(dict.fromkeys(ticker.strip().upper() for ticker in tickers if ticker.strip()))
+    return [{'id': task_id("analyze", ticker), 'kind': "analyze",
+             'payload': {'ticker': ticker, 'rsi_modes': list(rsi_modes)}} for ticker in tickers]
+
+
+def sentiment_day_tasks(tickers: list, start_date, end_date, period: str = "7d") -> list:
+    """One 'sentiment_day' task per ticker and business day: the backtest's per-source sentiment of that day."""
+    tickers = list(dict.fromkeys(ticker.strip().upper() for ticker in tickers if ticker.strip()))
+    days = [day.strftime("%Y-%m-%d") for day in pd.bdate_range(start_date, end_date)]
+    return [{'id': task_id("sentiment_day", ticker, day), 'kind': "sentiment_day",
+             'payload': {'ticker': ticker, 'date': day, 'period': period}} for ticker in tickers for day in days]
+
+
+def task_handlers(services, sentiment_workers=None) -> dict:
+    """
+    Handlers of the task kinds: kind -> callable(payload) -> JSON-serializable result.
+
+    Args:
+        services (ServiceContainer): Shared clients and pools, for 'analyze'.
+        sentiment_workers (SentimentWorkers, optional): Backtest sentiment modules
+            (see run_backtest), for 'sentiment_day'; without them that kind is not handled.
+    """
+    def analyze(payload):
+        ticker = payload['ticker']
+        results = {}
+        with services.request_handles(ticker) as handles:
+            for rsi_mode in payload['rsi_modes']:
+                # Dal secondo profilo in poi il corpus arriva dalla cache del fetcher
+                result = services.analysis(
+                    ticker, rsi_mode, lambda: analyze_ticker(handles, ticker, rsi_mode,
+                                                             executor=services.stage_executor, report=None),
+                    variant="signal")
+                results[rsi_mode] = {
+                    "signal": result["final_signal"],
+                    "confidence": result["confidence"],
+                    "total_score": _json_number(result["total_score"]),
+                    "sentiment_score": _json_number(result["sentiment_score"]),
+                    "rsi": _json_number(result["rsi"]),
+                    "adx": _json_number(result["adx"]),
+                    "pe_ratio": _json_number(result["pe_ratio"]),
+                    "explanation": result["explanation"],
+                }
+        return results
+
+    def sentiment_day(payload):
+        # Stessa finestra di build_feature_table: [giorno - period, giorno]
+        date = pd.Timestamp(payload['date'])
+        means, errors = sentiment_workers.source_means(payload['ticker'], date - pd.Timedelta(payload['period']), date)
+        if errors:
+            # Un giorno incompleto è un tentativo fallito: la coda lo riprova
+            raise RuntimeError("incomplete sentiment: " + "; ".join(errors))
+        return {column: _json_number(means[column]) for column in SENTIMENT_COLUMNS}
+
+    handlers = {"analyze": analyze}
+    if sentiment_workers is not None:
+        handlers["sentiment_day"] = sentiment_day
+    return handlers
+
+
+class QueueWorker:
+    """
+    Drains the tasks of one run from a work queue (see data.work_queue).
+
+    Each leased task is renewed by a heartbeat thread while its handler runs, so
+    long tasks keep their lease and a crashed worker's tasks are leased again
+    once the lease expires. A handler error is a failed attempt (retried with
+    backoff by the queue); a result is written once, so a task done twice
+    (e.g. after a lease expired during a long pause) keeps its first result.
+    """
+
+    def __init__(self, queue, run_id: str, handlers: dict, worker_id: str = None,
+                 lease_seconds: float = 300, poll_seconds: float = 2.0):
+        """
+        Args:
+            queue (SqliteWorkQueue): Shared queue.
+            run_id (str): Run to work on.
+            handlers (dict): kind -> callable(payload), see task_handlers.
+            worker_id (str, optional): Lease owner. Default: '<host>-<pid>-<thread>'.
+            lease_seconds (float): Lease length, renewed every third of it. Default: 300.
+            poll_seconds (float): Wait when no task is ready. Default: 2.
+        """
+        self.queue = queue
+        self.run_id = run_id
+        self.handlers = handlers
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+
+    def _heartbeat(self, task: dict, stop: threading.Event):
+        while not stop.wait(self.lease_seconds / 3):
+            if not self.queue.renew(task, self.lease_seconds):
+                logger.warning("Lease lost for %s; its result is kept only if it is the first one", task['id'])
+                return
+
+    def process(self, task: dict) -> str:
+        """
+        Run one leased task.
+
+        Returns:
+            str: 'done', 'duplicate' (another worker wrote the result first), 'retried',
+            'failed' or 'lost' (the lease had been taken over when the task failed).
+        """
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(task, stop), daemon=True)
+        heartbeat.start()
+        start = time.perf_counter()
+        try:
+            handler = self.handlers.get(task['kind'])
+            if handler is None:
+                raise ValueError(f"No handler for task kind '{task['kind']}'")
+            result = handler(task['payload'])
+        except Exception as e:
+            status = self.queue.fail(task, f"{type(e).__name__}: {e}")
+            logger.warning("Task %s failed (attempt %d): %s", task['id'], task['attempt'], e)
+            return {'queued': "retried", 'failed': "failed"}.get(status, "lost")
+        finally:
+            stop.set()
+            heartbeat.join()
+        written = self.queue.complete(task, result)
+        logger.info("Task %s done in %.1fs%s", task['id'], time.perf_counter() - start,
+                    "" if written else " (already done elsewhere, result discarded)")
+        return "done" if written else "duplicate"
+
+    def run(self, drain: bool = True, stop: threading.Event = None) -> Counter:
+        """
+        Lease and process tasks until the run has nothing queued or leased
+        (drain=True) or until stop is set.
+
+        Returns:
+            Counter: Outcomes of process() by name.
+        """
+        worker_id = self.worker_id or f"{socket.gethostname()}-{os.getpid()}-{threading.get_ident()}"
+        stop = stop or threading.Event()
+        outcomes = Counter()
+        while not stop.is_set():
+            task = self.queue.lease(self.run_id, worker_id, self.lease_seconds)
+            if task is not None:
+                outcomes[self.process(task)] += 1
+                continue
+            counts = self.queue.counts(self.run_id)
+            # Nulla di pronto: i task in backoff o in lease altrove possono ancora tornare disponibili
+            if drain and counts['queued'] == 0 and counts['leased'] == 0:
+                break
+            stop.wait(self.poll_seconds)
+        return outcomes
+
+
+def merge_results(results: list) -> dict:
+    """
+    Deterministic tables from the completed tasks of a run (queue.results(run_id)).
+
+    Returns:
+        dict: kind -> pd.DataFrame. 'analyze': one row per (ticker, rsi_mode) with
+        ANALYSIS_COLUMNS; 'sentiment_day': index (ticker, date) with the window period and
+        SENTIMENT_COLUMNS (see run_backtest.checkpoint_sentiment_days).
+        Rows are sorted by their keys, so the output does not depend on which
+        worker ran which task or in what order.
+    """
+    analysis_rows, sentiment_rows = [], []
+    for task in results:
+        payload, result = task['payload'], task['result']
+        if task['kind'] == "analyze":
+            for rsi_mode, values in result.items():
+                analysis_rows.append({'ticker': payload['ticker'], 'rsi_mode': rsi_mode,
+                                      **{column: values.get(column) for column in ANALYSIS_COLUMNS}})
+        elif task['kind'] == "sentiment_day":
+            sentiment_rows.append({'ticker': payload['ticker'], 'date': pd.Timestamp(payload['date']),
+                                   'period': payload['period'], **{column: result.get(column) for column in SENTIMENT_COLUMNS}})
+
+    tables = {}
+    if analysis_rows:
+        tables["analyze"] = (pd.DataFrame(analysis_rows).sort_values(['ticker', 'rsi_mode'])
+                             .set_index(['ticker', 'rsi_mode']))
+    if sentiment_rows:
+        tables["sentiment_day"] = (pd.DataFrame(sentiment_rows).sort_values(['ticker', 'date'])
+                                   .set_index(['ticker', 'date']))
+    return tables
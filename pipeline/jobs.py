@@ -0,0 +1,92 @@
+import logging
+import threading
+
+from pipeline.analysis import analyze_ticker, stage_summary
+
+logger = logging.getLogger(__name__)
+
+
+class JobWorkerPool:
+    """
+    Local worker threads that execute queued /analyze jobs.
+
+    Each worker claims a job from the JobStore, runs the analysis pipeline
+    (unless it is precomputed or cached) and records a progress event with the partial
+    result of every stage, then the final result. Web requests only enqueue
+    and read jobs, so they never wait on external APIs.
+    """
+
+    def __init__(self, services, store, workers: int = 4, poll_interval: float = 0.5,
+                 stale_after: float = 900):
+        """
+        Args:
+            services (ServiceContainer): Shared clients, pools and result cache.
+            store (JobStore): Job queue.
+            workers (int): Worker threads. Default: 4.
+            poll_interval (float): Seconds between queue polls when idle. Default: 0.5.
+            stale_after (float): Seconds after which a 'running' job is considered
+                abandoned (crashed process) and re-queued. Default: 900.
+        """
+        self.services = services
+        self.store = store
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        requeued = self.store.requeue_stale(self.stale_after)
+        if requeued:
+            logger.info("Re-queued %d abandoned jobs", requeued)
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._loop, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout: float = None):
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def submit(self, ticker: str, rsi_mode: str) -> str:
+        """Queue an analysis and wake an idle worker; returns the job ID."""
+        job_id = self.store.submit(ticker, rsi_mode)
+        self._wakeup.set()
+        return job_id
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                job = self.store.claim()
+            except Exception as e:
+                logger.error("Job queue unavailable: %s", e)
+                job = None
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self.run_job(job)
+
+    def run_job(self, job: dict):
+        job_id, ticker, rsi_mode = job['id'], job['ticker'], job['rsi_mode']
+
+        def on_stage_complete(name, result):
+            self.store.add_event(job_id, name, stage_summary(name, result))
+
+        def run_pipeline():
+            with self.services.request_handles(ticker) as handles:
+                return analyze_ticker(handles, ticker, rsi_mode, executor=self.services.stage_executor,
+                                      on_stage_complete=on_stage_complete)
+
+        try:
+            result = self.services.analysis(ticker, rsi_mode, run_pipeline)
+            self.store.complete(job_id, result)
+            self.store.add_event(job_id, "done", result)
+        except Exception as e:
+            logger.warning("Job %s (%s) failed: %s", job_id, ticker, e)
+            self.store.fail(job_id, str(e))
+            self.store.add_event(job_id, "failed", {"error": str(e)})
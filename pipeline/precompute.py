@@ -0,0 +1,160 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+from pipeline.analysis import analyze_ticker
+
+HISTORY_MONTHS = 6  # Stessa finestra di TechnicalIndicators.compute_indicators (period='6mo')
+
+logger = logging.getLogger(__name__)
+
+
+def _gap_period(last_bar: pd.Timestamp) -> str:
+    """Smallest Yahoo Finance period covering the bars missing since last_bar."""
+    gap_days = (pd.Timestamp.now(tz='UTC') - last_bar).days
+    if gap_days <= 4:
+        return "5d"
+    if gap_days <= 28:
+        return "1mo"
+    if gap_days <= 85:
+        return "3mo"
+    return f"{HISTORY_MONTHS}mo"
+
+
+class WatchlistPrecomputer:
+    """
+    Precomputes the /analyze result of a watchlist into a SignalStore.
+
+    The same stage graph as /analyze is used, with two incremental shortcuts:
+    - bars: only the days missing since the last run are downloaded and
+      appended to the stored history;
+    - sentiment: the corpus is fetched again, but only documents without a
+      stored score are sent to the model.
+    """
+
+    def __init__(self, services, store, watchlist: list, rsi_modes: tuple = ("standard",), max_workers: int = 4):
+        """
+        Args:
+            services (ServiceContainer): Shared clients and pools.
+            store (SignalStore): Destination of the results and incremental state.
+            watchlist (list): Tickers to precompute.
+            rsi_modes (tuple): RSI profiles to precompute for each ticker. Default: ('standard',).
+            max_workers (int): Tickers refreshed at the same time. Default: 4.
+        """
+        self.services = services
+        self.store = store
+        self.watchlist = [ticker.strip().upper() for ticker in watchlist]
+        self.rsi_modes = tuple(rsi_modes)
+        self.max_workers = max_workers
+
+    def update_bars(self, ticker: str, price_fetcher) -> pd.DataFrame:
+        """Append the new daily bars of ticker, drop those older than the indicator window and return the window."""
+        last_bar = self.store.last_bar_time(ticker)
+        period = f"{HISTORY_MONTHS}mo" if last_bar is None else _gap_period(last_bar)
+        new_bars = price_fetcher.fetch_price_data(ticker, period=period)
+        written = self.store.append_bars(ticker, new_bars)
+        logger.debug("%s: %d bars fetched (%s)", ticker, written, period)
+        since = pd.Timestamp.now(tz='UTC') - pd.DateOffset(months=HISTORY_MONTHS)
+        # Le barre fuori dalla finestra degli indicatori non servono più: il database non cresce
+        pruned = self.store.prune_bars(ticker, since)
+        if pruned:
+            logger.debug("%s: %d old bars pruned", ticker, pruned)
+        return self.store.load_bars(ticker, since=since)
+
+    def refresh_ticker(self, ticker: str) -> dict:
+        """Recompute every RSI profile of one ticker; returns {rsi_mode: result}."""
+        score_memo = self.store.load_scores(ticker)
+        known = len(score_memo)
+        scored = {}
+
+        def on_stage_complete(name, result):
+            if name == "sentiment_score":
+                analyzed_df = result[0]
+                if 'sentiment_score' in analyzed_df.columns:
+                    # Solo i punteggi entrati nel memo: gli 0.0 delle chiamate fallite non vanno salvati,
+                    # altrimenti il testo non verrebbe più rivalutato
+                    pairs = zip(analyzed_df['cleaned_text'], analyzed_df['ticker'])
+                    scored.update((pair, score_memo[pair]) for pair in pairs if pair in score_memo)
+
+        results = {}
+        with self.services.request_handles(ticker, score_memo=score_memo) as handles:
+            bars = self.update_bars(ticker, handles.price_fetcher)
+            for rsi_mode in self.rsi_modes:
+                # Dal secondo profilo in poi corpus e punteggi arrivano dalle cache di fetcher e memo
+                results[rsi_mode] = analyze_ticker(handles, ticker, rsi_mode, executor=self.services.stage_executor,
+                                                   on_stage_complete=on_stage_complete, price_data=bars)
+                self.store.put_signal(ticker, rsi_mode, results[rsi_mode])
+
+        # Restano solo i documenti ancora nella finestra del corpus
+        self.store.replace_scores(ticker, scored)
+        logger.info("%s: %d documents, %d newly scored", ticker, len(scored), max(len(score_memo) - known, 0))
+        return results
+
+    def run(self) -> dict:
+        """Refresh the whole watchlist; returns {ticker: {rsi_mode: result}} (failed tickers are left out)."""
+        start = time.perf_counter()
+
+        def refresh(ticker):
+            try:
+                return self.refresh_ticker(ticker)
+            except Exception as e:
+                logger.warning("Precomputation failed for %s: %s", ticker, e)
+                return None
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(self.watchlist)))) as pool:
+            results = dict(zip(self.watchlist, pool.map(refresh, self.watchlist)))
+        results = {ticker: result for ticker, result in results.items() if result is not None}
+        logger.info("Precomputed %d/%d tickers in %.1fs", len(results), len(self.watchlist), time.perf_counter() - start)
+        return results
+
+
+class PrecomputeScheduler:
+    """Runs a WatchlistPrecomputer at fixed times of day and every refresh interval."""
+
+    def __init__(self, precomputer: WatchlistPrecomputer, times: tuple = ("09:00", "16:05"),
+                 timezone: str = "America/New_York", refresh_minutes: float = 30):
+        """
+        Args:
+            precomputer (WatchlistPrecomputer): Job to run.
+            times (tuple): Daily run times as 'HH:MM' (e.g. pre-market and after the close).
+            timezone (str): Time zone of times. Default: 'America/New_York'.
+            refresh_minutes (float): Interval between runs in addition to times; 0 disables. Default: 30.
+        """
+        self.precomputer = precomputer
+        self.timezone = ZoneInfo(timezone)
+        self.times = sorted(datetime.strptime(value, "%H:%M").time() for value in times)
+        self.refresh = timedelta(minutes=refresh_minutes) if refresh_minutes else None
+        self.last_run = None
+
+    def next_run(self, now: datetime) -> datetime:
+        """First scheduled run after now (a tz-aware datetime)."""
+        now = now.astimezone(self.timezone)
+        candidates = []
+        for days in (0, 1):
+            day = now.date() + timedelta(days=days)
+            candidates += [datetime.combine(day, at, tzinfo=self.timezone) for at in self.times]
+        candidates = [candidate for candidate in candidates if candidate > now]
+        if self.refresh is not None:
+            candidates.append(now if self.last_run is None else max(now, self.last_run + self.refresh))
+        return min(candidates)
+
+    def run_forever(self, run_now: bool = True):
+        if run_now:
+            self.run_once()
+        while True:
+            next_run = self.next_run(datetime.now(self.timezone))
+            logger.info("Next precomputation at %s", next_run.isoformat())
+            time.sleep(max(0.0, (next_run - datetime.now(self.timezone)).total_seconds()))
+            self.run_once()
+
+    def run_once(self):
+        self.last_run = datetime.now(self.timezone)
+        try:
+            return self.precomputer.run()
+        except Exception as e:
+            logger.error("Precomputation run failed: %s", e)
+            return {}
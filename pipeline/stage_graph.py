@@ -0,0 +1,84 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from monitoring.metrics import STAGE_ERRORS, STAGE_SECONDS
+
+
+class StageGraph:
+    """Small dependency graph of pipeline stages; independent stages run concurrently."""
+
+    def __init__(self):
+        self.stages = {}
+        self.timings = {}
+
+    def add(self, name: str, func, deps: tuple = ()):
+        """
+        Register a stage.
+
+        Args:
+            name (str): Stage name, also the key of its result.
+            func (callable): Called with the results of its dependencies as keyword
+                arguments (named after the dependency stages).
+            deps (tuple): Names of the stages that must complete first.
+        """
+        missing = [dep for dep in deps if dep not in self.stages]
+        if missing:
+            raise ValueError(f"Stage '{name}' depends on unknown stages: {missing}")
+        self.stages[name] = (func, tuple(deps))
+        return self
+
+    def _timed(self, name: str, func, kwargs: dict):
+        start = time.perf_counter()
+        try:
+            return func(**kwargs)
+        except BaseException:
+            STAGE_ERRORS.inc(stage=name)
+            raise
+        finally:
+            self.timings[name] = time.perf_counter() - start
+            STAGE_SECONDS.observe(self.timings[name], stage=name)
+
+    def run(self, executor: ThreadPoolExecutor = None, on_stage_complete=None) -> dict:
+        """
+        Execute the graph.
+
+        A stage is submitted as soon as all its dependencies are done. The first
+        exception raised by a stage is re-raised after pending stages are
+        cancelled.
+
+        Args:
+            executor (ThreadPoolExecutor, optional): Pool to run stages on. Default:
+                a private pool sized to the graph.
+            on_stage_complete (callable, optional): Called as on_stage_complete(name, result)
+                in the calling thread after each stage finishes.
+
+        Returns:
+            dict: Stage name -> result. Wall-clock seconds of each stage are left in
+            self.timings and recorded in the hta_stage_duration_seconds histogram.
+        """
+        own_executor = executor is None
+        if own_executor:
+            executor = ThreadPoolExecutor(max_workers=max(1, len(self.stages)))
+
+        results = {}
+        running = {}
+        try:
+            while len(results) < len(self.stages):
+                for name, (func, deps) in self.stages.items():
+                    if name in results or name in running.values():
+                        continue
+                    if all(dep in results for dep in deps):
+                        kwargs = {dep: results[dep] for dep in deps}
+                        running[executor.submit(self._timed, name, func, kwargs)] = name
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    results[name] = future.result()
+                    if on_stage_complete is not None:
+                        on_stage_complete(name, results[name])
+        finally:
+            for future in running:
+                future.cancel()
+            if own_executor:
+                executor.shutdown(wait=False)
+        return results
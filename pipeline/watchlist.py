@@ -0,0 +1,112 @@
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+from data.price_fetcher import PriceFetcher
+from pipeline.analysis import analyze_ticker
+
+MAX_WATCHLIST_SIZE = 100
+
+logger = logging.getLogger(__name__)
+
+
+def _json_number(value):
+    return None if value is None else float(value)
+
+
+def analyze_watchlist(services, tickers: list, rsi_mode: str = "standard", max_concurrency: int = 8) -> dict:
+    """
+    Analyze several tickers in one call, sharing work across them.
+
+    - Prices: one Yahoo Finance download for the whole watchlist instead of one
+      history request per ticker.
+    - Corpora: Reddit comment trees are expanded once per submission, even when
+      the post matches several tickers.
+    - News: with newsapi.mode 'bulk', the news of the whole watchlist come from
+      a few OR-combined NewsAPI queries (see data.news_ingest).
+    - Scoring: the texts of every ticker go through the container's shared
+      scoring pool, and repeated texts are scored once.
+    - Results: tickers precomputed by the scheduler or already in the result
+      cache (from /analyze or an earlier watchlist in the same freshness
+      bucket) are not recomputed.
+
+    No report is generated for watchlists.
+
+    Args:
+        services (ServiceContainer): Shared clients and pools.
+        tickers (list): Ticker symbols (case-insensitive, duplicates ignored).
+        rsi_mode (str): RSI profile. Default: 'standard'.
+        max_concurrency (int): Tickers analyzed at the same time. Default: 8.
+
+    Returns:
+        dict: rsi_mode, elapsed (seconds), timings (shared stages) and results, a
+        ticker -> {signal, confidence, total_score, sentiment_score, rsi, adx, pe_ratio,
+        explanation, timings, cached, elapsed} mapping; failed tickers have an 'error' entry instead.
+    """
+    start = time.perf_counter()
+    tickers = list(dict.fromkeys(ticker.strip().upper() for ticker in tickers if ticker.strip()))
+
+    cache = services.result_cache
+    cached = {}
+    for ticker in tickers:
+        # Un risultato completo di /analyze contiene anche tutto ciò che serve qui
+        result = (services.precomputed(ticker, rsi_mode) or cache.get(ticker, rsi_mode)
+                  or cache.get(ticker, rsi_mode, variant="signal"))
+        if result is not None:
+            cached[ticker] = result
+
+    panel_start = time.perf_counter()
+    missing = [ticker for ticker in tickers if ticker not in cached]
+    panel = PriceFetcher(cassette=services.cassette).fetch_price_panel(missing, period="6mo")
+    timings = {"price_panel": time.perf_counter() - panel_start}
+
+    news_ingestor = services.news_ingestor
+    if news_ingestor is not None and missing:
+        # Le notizie dell'intera watchlist in poche query OR, poi ogni ticker le legge dalla memoria
+        news_start = time.perf_counter()
+        news_ingestor.prefetch(missing, datetime.now(timezone.utc) - timedelta(days=7))
+        timings["news"] = time.perf_counter() - news_start
+
+    corpus_cache = {}
+
+    def compute(ticker):
+        if ticker not in panel:
+            raise ValueError(f"No price data for {ticker}")
+        with services.request_handles(ticker, corpus_cache=corpus_cache) as handles:
+            return analyze_ticker(handles, ticker, rsi_mode, executor=services.stage_executor,
+                                  price_data=panel[ticker], report=None)
+
+    def run_ticker(ticker):
+        ticker_start = time.perf_counter()
+        try:
+            result = cached.get(ticker)
+            if result is None:
+                result = services.analysis(ticker, rsi_mode, lambda: compute(ticker), variant="signal")
+            return {
+                "signal": result["final_signal"],
+                "confidence": result["confidence"],
+                "total_score": _json_number(result["total_score"]),
+                "sentiment_score": _json_number(result["sentiment_score"]),
+                "rsi": _json_number(result["rsi"]),
+                "adx": _json_number(result["adx"]),
+                "pe_ratio": _json_number(result["pe_ratio"]),
+                "explanation": result["explanation"],
+                "timings": result["timings"],
+                "cached": ticker in cached,
+                "elapsed": time.perf_counter() - ticker_start,
+            }
+        except Exception as e:
+            logger.warning("Watchlist analysis failed for %s: %s", ticker, e)
+            return {"error": str(e), "elapsed": time.perf_counter() - ticker_start}
+
+    # Un pool dedicato ai ticker: gli stage girano sul pool condiviso, così non si bloccano a vicenda
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(tickers)))) as pool:
+        results = dict(zip(tickers, pool.map(run_ticker, tickers)))
+
+    return {
+        "rsi_mode": rsi_mode,
+        "elapsed": time.perf_counter() - start,
+        "timings": timings,
+        "results": results,
+    }
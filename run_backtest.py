@@ -1,238 +1,452 @@
+import logging
+import threading
+import numpy as np
 import pandas as pd
-import yfinance as yf
-from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from data.price_fetcher import PriceFetcher
 from data.backtest_sentiment_fetcher import SentimentFetcher
 from data.sentiment_cleaner import SentimentCleaner
-from strategy.strategy_computation import HybridStrategy
+from strategy.strategy_computation import HybridStrategy, SIGNAL_LABELS, EXPLANATIONS
 from sentiment.sentiment_analyzer import SentimentAnalyzer
 from indicators.backtest_indicator_fetcher import TechnicalIndicators
 from config.backtest_config import BacktestConfig
-
-# === Inizializza configurazione ===
-config = BacktestConfig()
-ticker = config.ticker
-start_date = config.start_date
-end_date = config.end_date
-initial_cash = config.initial_cash
-
-# === Inizializza moduli ===
-price_fetcher = PriceFetcher()
-strategy = HybridStrategy()
-fetcher = SentimentFetcher()
-cleaner = SentimentCleaner()
-analyzer = SentimentAnalyzer()
-indicators = TechnicalIndicators(ticker)
-
-# Calcolo anticipato degli indicatori per tutte le date
-indicator_df = indicators.compute_indicators_on_date_range(start_date, end_date)
-
-
-# === Ottieni dati storici per RSI/ADX + segnali
-full_price_df = price_fetcher.fetch_price_data(ticker, period="3mo").dropna()  # o 30d se vuoi stare largo
-
-# === Seleziona l'intervallo di giorni per cui generare segnali
-full_price_df.index = full_price_df.index.tz_localize(None)
-
-# Filtra le date esattamente nell'intervallo
-price_df = full_price_df.loc[start_date:end_date].copy()
-start_date = pd.to_datetime(start_date)
-end_date = pd.to_datetime(end_date)
-
-
-#Printo per accertarmi che le date siano corrette
-print(f"Date effettivamente usate ({len(price_df)} giorni):")
-print(price_df.index.tolist())
-
-
-price_df.loc[:,'Final_Signal'] = None
-price_df.loc[:,'SentimentScore'] = None
-price_df.loc[:,'RSI'] = None
-price_df.loc[:,'ADX'] = None
-price_df.loc[:,'PE_ratio'] = None
-price_df.loc[:,'rsi_mode'] = None
-
-# === Backtest ===
-cash = initial_cash
-position = 0
-short_position = 0
-holding = False
-holding_short = False
-portfolio_value = []
-
-records = []  # lista per raccogliere righe da salvare in Excel
-position_log = []  # log di aperture/chiusure
-open_position_date = None
-open_position_type = None
-opening_price = None  # prezzo di apertura della posizione
-
-for date, row in price_df.iterrows():
-    try:
-        # Sentiment
-        sentiment_window_start = date - pd.Timedelta(config.period)
-        sentiment_window_end = date
-
-        sentiment_df = fetcher.fetch_sentiment_data(ticker, sentiment_window_start, sentiment_window_end)
+from evaluation.backtest_engine import BacktestEngine
+from data.backtest_checkpoint import BacktestCheckpoint
+from data.news_ingest import NewsIngestor, bulk_news_enabled
+from config.settings_loader import load_settings
+from sentiment.aggregation import weighted_sentiment, windowed_source_means
+from monitoring.logs import configure_logging
+from monitoring.profiling import profiled
+
+FEATURE_COLUMNS = ['RSI', 'ADX', 'NewsSentiment', 'RedditSentiment']
+
+# Storico massimo di Yahoo Finance per intervallo intraday; serie più lunghe si passano come price_data
+INTRADAY_HISTORY = {'1m': "7d", '2m': "60d", '5m': "60d", '15m': "60d", '30m': "60d", '60m': "730d",
+                    '90m': "60d", '1h': "730d"}
+
+logger = logging.getLogger(__name__)
+
+
+class SentimentWorkers:
+    """
+    One fetcher/cleaner/analyzer per thread: PRAW clients and analyzer state are not thread-safe.
+
+    The news ingestor (newsapi.mode 'bulk') is thread-safe and shared by every fetcher.
+    """
+
+    def __init__(self, fetch_concurrency: int, scoring_concurrency: int, news_ingestor: NewsIngestor = None):
+        self._local = threading.local()
+        self.news_ingestor = news_ingestor
+        self.fetch_slots = threading.BoundedSemaphore(fetch_concurrency)
+        self.scoring_slots = threading.BoundedSemaphore(scoring_concurrency)
+
+    def modules(self):
+        if not hasattr(self._local, 'fetcher'):
+            self._local.fetcher = SentimentFetcher(news_ingestor=self.news_ingestor)
+            self._local.cleaner = SentimentCleaner()
+            self._local.analyzer = SentimentAnalyzer()
+        return self._local.fetcher, self._local.cleaner, self._local.analyzer
+
+    def source_means(self, ticker: str, start_time, end_time):
+        """
+        Per-source sentiment of one window.
+
+        Returns:
+            Tuple[dict, list]: NewsSentiment / RedditSentiment (None for a source without
+            documents), and the errors that made the window incomplete (failed provider
+            fetches, texts whose scoring failed); empty when everything was computed.
+        """
+        fetcher, cleaner, analyzer = self.modules()
+        with self.fetch_slots:
+            sentiment_df = fetcher.fetch_sentiment_data(ticker, start_time, end_time)
+        errors = list(sentiment_df.attrs.get('fetch_errors', []))
         cleaned_df = cleaner.clean_sentiment_data(sentiment_df)
-        analyzed_df, sentiment_score = analyzer.analyze_sentiment(cleaned_df)
+        with self.scoring_slots:
+            analyzer.analyze_sentiment(cleaned_df, at=end_time)
+        if analyzer.last_failed_scores:
+            errors.append(f"openai: {analyzer.last_failed_scores} texts not scored")
+        means = {'NewsSentiment': analyzer.last_source_means['news'],
+                 'RedditSentiment': analyzer.last_source_means['reddit']}
+        return means, errors
+
+
+def _news_ingestor(ticker: str, start_time, end_time) -> NewsIngestor:
+    """With newsapi.mode 'bulk', an ingestor holding the ticker's news of the whole range; otherwise None."""
+    if not bulk_news_enabled(load_settings()):
+        return None
+    # Le notizie di tutto l'intervallo in poche richieste; ogni finestra poi le legge dalla memoria
+    news_ingestor = NewsIngestor.from_settings()
+    news_ingestor.prefetch([ticker], start_time, end_time)
+    return news_ingestor
+
+
+def build_feature_table(config: BacktestConfig, dates, indicator_df: pd.DataFrame,
+                        checkpoint: BacktestCheckpoint = None) -> pd.DataFrame:
+    """
+    Phase 1: compute RSI, ADX and per-source sentiment for every day.
+
+    Days do not depend on each other or on position state, so the sentiment
+    fetch, cleaning and LLM scoring of all days run concurrently on a thread
+    pool. Fetching and scoring have separate concurrency bounds
+    (config.fetch_concurrency, config.scoring_concurrency) to respect provider
+    rate limits. Days already in the checkpoint are not recomputed; only days
+    with indicators and a complete fetch and scoring are checkpointed.
+
+    Returns:
+        pd.DataFrame: Index = dates that have features, columns FEATURE_COLUMNS.
+    """
+    features = {}
+    pending = []
+    for date in dates:
+        if checkpoint is not None and date in checkpoint:
+            features[date] = checkpoint.get(date)
+        else:
+            pending.append(date)
+
+    if pending:
+        news_ingestor = _news_ingestor(config.ticker, min(pending) - pd.Timedelta(config.period), max(pending))
+        workers = SentimentWorkers(config.fetch_concurrency, config.scoring_concurrency, news_ingestor)
+        checkpoint_lock = threading.Lock()
+
+        def compute_day(date):
+            day = {'RSI': None, 'ADX': None, 'NewsSentiment': None, 'RedditSentiment': None}
+            if date not in indicator_df.index:
+                # Senza indicatori il giorno non entra nel checkpoint: al prossimo run si riprova
+                return day
+            day['RSI'] = float(indicator_df.loc[date, 'RSI'])
+            day['ADX'] = float(indicator_df.loc[date, 'ADX'])
+            means, errors = workers.source_means(config.ticker, date - pd.Timedelta(config.period), date)
+            day.update(means)
+            if errors:
+                # Il giorno entra nel backtest con i dati parziali, ma sarà ricalcolato alla ripresa
+                logger.warning("%s: sentiment incompleto, giorno non salvato nel checkpoint (%s)",
+                               date.date(), "; ".join(errors))
+            elif checkpoint is not None:
+                with checkpoint_lock:
+                    checkpoint.append(date, day)
+            return day
+
+        max_workers = config.fetch_concurrency + config.scoring_concurrency
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(compute_day, date): date for date in pending}
+            for future in as_completed(futures):
+                date = futures[future]
+                try:
+                    features[date] = future.result()
+                except Exception as e:
+                    logger.warning("Errore per il giorno %s: %s", date, e)
+
+    table = pd.DataFrame.from_dict(features, orient='index', columns=FEATURE_COLUMNS).sort_index()
+    missing = table['RSI'].isna()
+    for date in table.index[missing]:
+        logger.debug("Indicatori non trovati per la data %s, passo al giorno successivo.", date)
+    return table[~missing].astype(float)
+
+
+def sentiment_window_starts(config: BacktestConfig, bars: pd.DatetimeIndex) -> pd.DatetimeIndex:
+    """
+    Start of the sentiment window of every bar (intraday): config.sentiment_window
+    (a duration, or an int number of bars) before the bar, default config.period.
+    """
+    window = config.period if config.sentiment_window is None else config.sentiment_window
+    if isinstance(window, (int, np.integer)):
+        # Le prime barre della serie (riscaldamento) hanno una finestra più corta
+        return bars[np.maximum(np.arange(len(bars)) - window, 0)]
+    return bars - pd.Timedelta(window)
+
+
+def build_intraday_feature_table(config: BacktestConfig, bars: pd.DatetimeIndex, indicator_df: pd.DataFrame,
+                                 analyzer: SentimentAnalyzer) -> pd.DataFrame:
+    """
+    Intraday phase 1: RSI, ADX and per-source sentiment of every bar.
+
+    The documents of the whole range are fetched, cleaned and scored once, and
+    the window [start, bar) of every bar is aggregated from them in one
+    vectorized pass (sentiment.aggregation.windowed_source_means), so the cost
+    grows with bars + documents instead of bars x window and no document is
+    scored twice. Reddit search returns at most 200 posts per subreddit for the
+    whole range; newsapi.mode 'bulk' reads every page of the news.
+
+    Args:
+        config (BacktestConfig): Ticker, period / sentiment_window, concurrency.
+        bars (pd.DatetimeIndex): Every bar of the series (UTC, naive), warm-up included.
+        indicator_df (pd.DataFrame): RSI and ADX of the bars to trade (see
+            TechnicalIndicators.compute_indicators_on_bars).
+        analyzer (SentimentAnalyzer): Scores the documents; its aggregation and half-lives apply.
+
+    Returns:
+        pd.DataFrame: Index = bars of indicator_df, columns FEATURE_COLUMNS (sentiment NaN
+        where a source has no document in the window).
+    """
+    starts = pd.Series(sentiment_window_starts(config, bars), index=bars).loc[indicator_df.index]
+    table = indicator_df[['RSI', 'ADX']].astype(float)
+    if table.empty:
+        return table.reindex(columns=FEATURE_COLUMNS)
+
+    start_time, end_time = starts.min(), table.index.max()
+    fetcher = SentimentFetcher(news_ingestor=_news_ingestor(config.ticker, start_time, end_time))
+    documents = fetcher.fetch_sentiment_data(config.ticker, start_time.to_pydatetime(), end_time.to_pydatetime())
+    cleaned_df = SentimentCleaner().clean_sentiment_data(documents)
+    scored_df, _ = analyzer.analyze_sentiment(cleaned_df, at=end_time)
+    logger.info("%s: %d documents scored for %d bars", config.ticker, len(scored_df), len(table))
+
+    half_lives = analyzer.half_lives if analyzer.aggregation == "decayed" else None
+    if 'sentiment_score' in scored_df.columns:
+        means = windowed_source_means(scored_df, table.index, starts.to_numpy(), half_lives, analyzer.min_weight)
+    else:
+        means = pd.DataFrame(np.nan, index=table.index, columns=['NewsSentiment', 'RedditSentiment'])
+    return pd.concat([table, means], axis=1)[FEATURE_COLUMNS]
+
+
+def _labels(codes: np.ndarray, labels: dict) -> pd.Categorical:
+    # Colonne testuali come categoriche: una stringa per valore distinto invece che per riga (backtest intraday)
+    values = np.array(sorted(labels))
+    return pd.Categorical.from_codes(np.searchsorted(values, codes), [labels[value] for value in values])
+
+
+def simulate(config: BacktestConfig, feature_table: pd.DataFrame, price_df: pd.DataFrame,
+             strategy: HybridStrategy, sentiment_weights: dict = None):
+    """
+    Phase 2: signals and positions over the finished feature table.
+
+    Rows with NaN or out-of-range RSI, ADX or sentiment get no signal and no
+    record; the position of the previous row is kept through them.
+
+    Returns:
+        Tuple[pd.DataFrame, BacktestResult]: Per-day records and the simulation result.
+    """
+    feature_table = feature_table.loc[feature_table.index.isin(price_df.index)]
+    sentiment = weighted_sentiment(feature_table['NewsSentiment'].to_numpy(),
+                                   feature_table['RedditSentiment'].to_numpy(), sentiment_weights)
+
+    # Le righe fuori dai limiti della strategia (NaN inclusi) restano senza segnale, come i giorni in errore
+    rsi, adx = feature_table['RSI'].to_numpy(), feature_table['ADX'].to_numpy()
+    valid = (rsi >= 0) & (rsi <= 100) & (adx >= 0) & (adx <= 100) & (sentiment >= -100) & (sentiment <= 100)
+    if not valid.all():
+        logger.warning("%d righe con RSI/ADX/sentiment non validi saltate (prima: %s)",
+                       (~valid).sum(), feature_table.index[~valid][0])
+        feature_table, sentiment = feature_table[valid], sentiment[valid]
+
+    volatility = 0.01  # Placeholder: puoi calcolare una vera volatilità qui
+    if volatility < 0.005:
+        rsi_mode = "aggressive"
+    elif volatility <= 0.03:
+        rsi_mode = "standard"
+    else:
+        rsi_mode = "conservative"
+
+    pe_ratio = 20  # Placeholder fisso, oppure qui puoi calcolarlo se hai i dati
+
+    signals, confidence, total_score, explanations = strategy.generate_signals(
+        feature_table['RSI'].to_numpy(), feature_table['ADX'].to_numpy(), pe_ratio, sentiment, rsi_mode
+    )
+
+    output_df = pd.DataFrame({
+        'Date': feature_table.index,
+        'Close': price_df.loc[feature_table.index, 'Close'].to_numpy(),
+        'SentimentScore': sentiment,
+        'NewsSentiment': feature_table['NewsSentiment'].to_numpy(),
+        'RedditSentiment': feature_table['RedditSentiment'].to_numpy(),
+        'RSI': feature_table['RSI'].to_numpy(),
+        'ADX': feature_table['ADX'].to_numpy(),
+        'PE_ratio': pe_ratio,
+        'RSI_mode': pd.Categorical([rsi_mode] * len(signals)),
+        'Signal': _labels(signals, SIGNAL_LABELS),
+        'Confidence_Level': _labels(confidence, {value: f"{value}%" for value in np.unique(confidence)}),
+        'Total_Score': total_score,
+    })
+
+    if logger.isEnabledFor(logging.DEBUG):
+        for row, code in zip(output_df.itertuples(index=False), explanations):
+            logger.debug("%s,%.2f,%.1f,%s,%s,%s, %s, %s", row.Date, row.Close, row.SentimentScore, row.RSI, row.ADX,
+                         row.Signal.lower(), row.Confidence_Level, EXPLANATIONS[code])
+
+    # I giorni senza segnale (indicatori mancanti o errori) mantengono la posizione del giorno precedente
+    day_signals = pd.Series(signals, index=feature_table.index).reindex(price_df.index).ffill().fillna(0)
+    result = BacktestEngine(config.initial_cash).run(price_df['Close'], day_signals.to_numpy())
+    return output_df, result
+
+
+def run_backtest(config: BacktestConfig, price_data: pd.DataFrame = None):
+    """
+    Run the hybrid strategy backtest for config.ticker over config.start_date..end_date.
+
+    Args:
+        config (BacktestConfig): Ticker, date range, sentiment window and initial cash.
+        price_data (pd.DataFrame, optional): OHLC history covering the indicator warm-up:
+            daily bars (tz-naive index), or with an intraday config.interval bars of that
+            interval (e.g. a long series from a data vendor). When omitted it is downloaded
+            from Yahoo Finance (intraday: as far back as INTRADAY_HISTORY allows).
+
+    Returns:
+        Tuple[pd.DataFrame, BacktestResult]: Per-day (intraday: per-bar) records and the simulation result.
+
+    With config.profile the whole run is sampled and written as folded stacks
+    to the profiling directory (see monitoring.profiling).
+    """
+    if config.profile:
+        with profiled(f"backtest-{config.ticker}"):
+            return _run_backtest(config, price_data)
+    return _run_backtest(config, price_data)
+
+
+def _intraday_bars(price_data: pd.DataFrame) -> pd.DataFrame:
+    """Sorted OHLC bars with a naive UTC index (the convention of the sentiment timestamps)."""
+    bars = price_data.dropna(subset=['Open', 'High', 'Low', 'Close'])
+    if bars.index.tz is not None:
+        bars = bars.tz_convert("UTC").tz_localize(None)
+    bars = bars[~bars.index.duplicated(keep="last")]
+    return bars if bars.index.is_monotonic_increasing else bars.sort_index()
+
+
+def _run_intraday_backtest(config: BacktestConfig, price_data: pd.DataFrame = None):
+    ticker = config.ticker
+    start_date = pd.to_datetime(config.start_date)
+    end_date = pd.to_datetime(config.end_date)
+    if end_date == end_date.normalize():
+        # Una data senza ora comprende tutte le barre di quel giorno
+        end_date += pd.Timedelta(days=1) - pd.Timedelta(1, "ns")
+
+    if price_data is None:
+        period = INTRADAY_HISTORY.get(config.interval, "60d")
+        price_data = PriceFetcher().fetch_price_data(ticker, period=period, interval=config.interval)
+    bars = _intraday_bars(price_data)
+
+    # Indicatori su tutta la serie (le barre prima di start_date fanno da riscaldamento)
+    indicator_df = TechnicalIndicators(ticker).compute_indicators_on_bars(bars, start_date, end_date)
+    price_df = bars.loc[start_date:end_date]
+    logger.info("Barre %s effettivamente usate: %d, da %s a %s", config.interval, len(price_df),
+                price_df.index.min(), price_df.index.max())
+
+    analyzer = SentimentAnalyzer()
+    feature_table = build_intraday_feature_table(config, bars.index, indicator_df, analyzer)
+    return simulate(config, feature_table, price_df, HybridStrategy(), analyzer.weights)
+
+
+def checkpoint_key_fields(ticker: str, period: str, analyzer: SentimentAnalyzer) -> dict:
+    """Fields that identify the daily checkpoint of a ticker and sentiment window (see BacktestCheckpoint)."""
+    key_fields = {
+        'ticker': ticker,
+        'period': period,
+        'model_name': analyzer.model_name,
+    }
+    if analyzer.aggregation != "flat":
+        # Le medie per fonte dipendono dall'aggregazione; i checkpoint 'flat' esistenti restano validi
+        key_fields['aggregation'] = {'mode': analyzer.aggregation, 'half_life_hours': analyzer.half_lives,
+                                     'min_weight': analyzer.min_weight}
+    if bulk_news_enabled(load_settings()):
+        key_fields['news'] = "bulk"
+    return key_fields
+
+
+def checkpoint_sentiment_days(sentiment: pd.DataFrame, checkpoint_dir: str = None) -> int:
+    """
+    Store per-day sentiment computed elsewhere (the merged 'sentiment_day' results of
+    run_universe.py) in the backtest checkpoints, so run_backtest only simulates those days.
+
+    The queue computes the sentiment only: RSI and ADX of every day are computed here,
+    as run_backtest does. Days without indicators and days already checkpointed are skipped.
+
+    Args:
+        sentiment (pd.DataFrame): Index (ticker, date), columns period and SENTIMENT_COLUMNS
+            (see pipeline.distributed.merge_results).
+        checkpoint_dir (str, optional): See BacktestCheckpoint.
+
+    Returns:
+        int: Days added.
+    """
+    analyzer = SentimentAnalyzer()
+    added = 0
+    for (ticker, period), days in sentiment.reset_index().groupby(['ticker', 'period']):
+        checkpoint = BacktestCheckpoint(checkpoint_key_fields(ticker, period, analyzer), checkpoint_dir)
+        days = days[[date not in checkpoint for date in days['date']]]
+        if days.empty:
+            continue
+        indicator_df = TechnicalIndicators(ticker).compute_indicators_on_date_range(days['date'].min(),
+                                                                                    days['date'].max())
+        for day in days.itertuples(index=False):
+            if day.date not in indicator_df.index:
+                # Come in build_feature_table: senza indicatori il giorno non entra nel checkpoint
+                continue
+            checkpoint.append(day.date, {
+                'RSI': float(indicator_df.loc[day.date, 'RSI']),
+                'ADX': float(indicator_df.loc[day.date, 'ADX']),
+                'NewsSentiment': None if pd.isna(day.NewsSentiment) else float(day.NewsSentiment),
+                'RedditSentiment': None if pd.isna(day.RedditSentiment) else float(day.RedditSentiment),
+            })
+            added += 1
+        logger.info("%s (%s): checkpoint %s aggiornato", ticker, period, checkpoint.key)
+    return added
+
+
+def _run_backtest(config: BacktestConfig, price_data: pd.DataFrame = None):
+    if config.intraday:
+        # Niente checkpoint per giorno: ogni documento è valutato una sola volta per l'intero intervallo
+        return _run_intraday_backtest(config, price_data)
+
+    ticker = config.ticker
+    start_date = pd.to_datetime(config.start_date)
+    end_date = pd.to_datetime(config.end_date)
+
+    # === Inizializza moduli ===
+    price_fetcher = PriceFetcher()
+    strategy = HybridStrategy()
+    analyzer = SentimentAnalyzer()
+    indicators = TechnicalIndicators(ticker)
+
+    # Calcolo anticipato degli indicatori per tutte le date
+    indicator_df = indicators.compute_indicators_on_date_range(start_date, end_date, price_data=price_data)
+
+
+    # === Ottieni dati storici per RSI/ADX + segnali
+    if price_data is None:
+        full_price_df = price_fetcher.fetch_price_data(ticker, period="3mo").dropna()  # o 30d se vuoi stare largo
+
+        # === Seleziona l'intervallo di giorni per cui generare segnali
+        full_price_df.index = full_price_df.index.tz_localize(None)
+    else:
+        full_price_df = price_data.dropna()
 
+    # Filtra le date esattamente nell'intervallo
+    price_df = full_price_df.loc[start_date:end_date].copy()
 
-        try:
-            rsi = float(indicator_df.loc[date, 'RSI'])
-            adx = float(indicator_df.loc[date, 'ADX'])
-        except KeyError:
-            print(f"Indicatori non trovati per la data {date}, passo al giorno successivo.")
-            portfolio_value.append(cash + position * row['Close'])
-            continue
 
-            pe_ratio = 20  # Inserisci qui il P/E ratio per il giorno
+    # Log per accertarmi che le date siano corrette
+    logger.info("Date effettivamente usate: %d giorni, da %s a %s", len(price_df),
+                price_df.index.min(), price_df.index.max())
+    logger.debug("Date: %s", price_df.index.tolist())
 
 
-        volatility = 0.01  # Placeholder: puoi calcolare una vera volatilità qui
-        if volatility < 0.005:
-            rsi_mode = "aggressive"
-        elif volatility <= 0.03:
-            rsi_mode = "standard"
-        else:
-            rsi_mode = "conservative"
-
-        pe_ratio = 20  # Placeholder fisso, oppure qui puoi calcolarlo se hai i dati  
-
-
-        final_signal, confidence_level, total_score, explanation = strategy.generate_trading_signal(rsi, adx, pe_ratio, sentiment_score, rsi_mode)
-        
-
-    
-        price_df.at[date, 'Signal'] = final_signal
-        price_df.at[date, 'SentimentScore'] = sentiment_score
-        price_df.at[date, 'RSI'] = rsi
-        price_df.at[date, 'ADX'] = adx
-        price_df.at[date, 'PE_ratio'] = pe_ratio
-        price_df.at[date, 'rsi_mode'] = rsi_mode
-
-        price = row['Close']
-
-        # === Tracciamento apertura e chiusura posizioni ===
-        if final_signal in ["Buy"] and not holding:
-            open_position_date = date
-            open_position_type = "long"
-            position_log.append(f"Apertura posizione long il {date.date()}.")
-            holding = True
-            opening_price = price
-
-        elif final_signal in ["Sell"] and not holding_short:
-            open_position_date = date
-            open_position_type = "short"
-            position_log.append(f"Apertura posizione short il {date.date()}.")
-            holding_short = True
-            opening_price = price
-
-        # Chiusura long se il segnale è di natura opposta o neutra
-        elif holding and final_signal in ["Hold","Sell"]:
-            position_log.append(f"Chiusura posizione long il {date.date()}.")
-            open_position_date = None
-            open_position_type = None
-            holding = False
-            position = 0
-            openening_price = None
-
-        # Chiusura short se il segnale è di natura opposta o neutra
-        elif holding_short and final_signal in ["Hold", "Buy"]:
-            position_log.append(f"Chiusura posizione short il {date.date()}.")
-            open_position_date = None
-            open_position_type = None
-            holding_short = False
-            short_position = 0
-            opening_price = None
-
-
-        # Salva i dati in una lista per CSV
-        records.append({
-            'Date': date,
-            'Close': price,
-            'SentimentScore': sentiment_score,
-            'RSI': rsi,
-            'ADX': adx,
-            'PE_ratio': pe_ratio,
-            'RSI_mode': rsi_mode,
-            'Signal': final_signal,
-            'Confidence_Level': confidence_level,
-            'Total_Score': total_score
-             })
-
-        print(f"{date},{price:.2f},{sentiment_score:.1f},{rsi},{adx},{final_signal.lower()}, {confidence_level}, {explanation}")
-
-    except Exception as e:
-        print(f"Errore per il giorno {date}: {e}")
-
-
-# === Controllo finale su posizione ancora aperta ===
-if open_position_date:
-    position_log.append(f" Posizione {open_position_type} ancora aperta alla fine del periodo (ultimo giorno: {price_df.index[-1].date()}).")
-
-print("\n=== LOG STRATEGIA: Aperture/Chiusure ===")
-for event in position_log:
-    print(event)
-
-# === Return Calculation ===
-returns = []
-open_type = None
-open_date = None
-
-for event in position_log:
-    if "Apertura posizione" in event:
-        open_type = "long" if "long" in event else "short"
-        open_date = pd.to_datetime(event.split("il ")[1].strip())
-
-    elif "Chiusura posizione" in event and open_type and open_date:
-        close_date = pd.to_datetime(event.split("il ")[1].strip())
-        open_price = price_df.loc[open_date, "Close"]
-        close_price = price_df.loc[close_date, "Close"]
-
-        if open_type == "long":
-            ret = (close_price - open_price) / open_price
-        else:
-            ret = (open_price - close_price) / open_price
-        returns.append(ret)
-        open_type = None
-        open_date = None
-
-# === Final Portfolio Evaluation ===
-if end_date not in price_df.index:
-    end_date = price_df.index[price_df.index <= end_date][-1]
-current_price = price_df.loc[end_date, "Close"]
-
-if (holding or holding_short) and not returns:
-    if opening_price is not None:
-        quantity = initial_cash / opening_price
-        if holding:
-            final_cash = quantity * current_price
-        else:
-            final_cash = initial_cash + quantity * (opening_price - current_price)
-        gain_pct = (final_cash - initial_cash) / initial_cash * 100
-        status = "Opened but not closed"
-    else:
-        final_cash = initial_cash
-        gain_pct = 0.0
-        status = "Error: open_price missing"
-
-elif returns:
-    total_return = sum(returns)
-    final_cash = initial_cash * (1 + total_return)
-    gain_pct = total_return * 100
-    status = "Opened and closed"
-
-else:
-    final_cash = initial_cash
-    gain_pct = 0.0
-    status = "No positions opened"
-
-# === Print Summary ===
-print("\n=== FINAL SUMMARY ===")
-print(f"Status: {status}")
-print(f"Final Portfolio Value: ${final_cash:,.2f}")
-print(f"Total Gain/Loss: {gain_pct:.2f}%")
-
-# === Save to CSV ===
-output_df = pd.DataFrame(records)
-output_df.to_csv("backtest_output.csv", index=False)
+    # === Checkpoint: le feature già calcolate per questa configurazione vengono riutilizzate ===
+    checkpoint = None
+    if config.resume:
+        checkpoint = BacktestCheckpoint(checkpoint_key_fields(ticker, config.period, analyzer), config.checkpoint_dir)
+
+    # === Fase 1: feature di tutti i giorni in parallelo ===
+    feature_table = build_feature_table(config, price_df.index, indicator_df, checkpoint)
+
+    # === Fase 2: segnali e simulazione sequenziale ===
+    return simulate(config, feature_table, price_df, strategy, analyzer.weights)
+
+
+if __name__ == "__main__":
+    # === Inizializza configurazione ===
+    configure_logging()
+    config = BacktestConfig()
+    output_df, result = run_backtest(config)
+
+    print("\n=== LOG STRATEGIA: Aperture/Chiusure ===")
+    print(result.ledger.to_dataframe().to_string(index=False))
+
+    summary = result.summary()
+
+    # === Print Summary ===
+    print("\n=== FINAL SUMMARY ===")
+    print(f"Status: {summary['status']}")
+    print(f"Final Portfolio Value: ${summary['final_value']:,.2f}")
+    print(f"Total Gain/Loss: {summary['gain_pct']:.2f}%")
+    print(f"Compounded Equity Return: {summary['equity_return'] * 100:.2f}%")
+    print(f"Max Drawdown: {summary['max_drawdown'] * 100:.2f}%")
+
+    # === Save to CSV ===
+    output_df.to_csv("backtest_output.csv", index=False)
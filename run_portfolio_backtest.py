@@ -0,0 +1,201 @@
+import logging
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from config.backtest_config import BacktestConfig
+from data.price_fetcher import PriceFetcher
+from evaluation.shared_arrays import SharedArrays, attach_shared_arrays
+from monitoring.logs import configure_logging
+from run_backtest import run_backtest
+
+OHLC_COLUMNS = ['Open', 'High', 'Low', 'Close']
+
+logger = logging.getLogger(__name__)
+
+_worker_prices = None
+
+
+def _init_worker(spec):
+    global _worker_prices
+    _worker_prices = attach_shared_arrays(spec)
+
+
+def _backtest_worker(position: int, config: BacktestConfig):
+    """Run one configuration's backtest on its slice of the shared price panel."""
+    ohlc = _worker_prices['ohlc'][position]
+    dates = pd.to_datetime(_worker_prices['dates'])
+    price_data = pd.DataFrame(ohlc, index=dates, columns=OHLC_COLUMNS).dropna()
+    try:
+        output_df, result = run_backtest(config, price_data=price_data)
+        return position, output_df, result, None
+    except Exception as e:
+        return position, None, None, str(e)
+
+
+class PortfolioBacktest:
+    """Runs the backtest for many tickers in parallel and merges them into a portfolio."""
+
+    def __init__(self, configs: list, max_workers: int = None, history_period: str = '1y',
+                 price_fetcher: PriceFetcher = None):
+        """
+        Args:
+            configs (list[BacktestConfig]): One configuration per run (own date range and cash).
+                A ticker may appear more than once, e.g. over separate date ranges; identical
+                configurations are rejected.
+            max_workers (int, optional): Process pool size. Default: os.cpu_count().
+            history_period (str): Price history downloaded per ticker, must cover the
+                indicator warm-up before each start date. Default: '1y'.
+            price_fetcher (PriceFetcher, optional): Defaults to a new PriceFetcher.
+        """
+        if not configs:
+            raise ValueError("At least one backtest configuration is required")
+        seen = set()
+        for config in configs:
+            fields = tuple(sorted(vars(config).items()))
+            if fields in seen:
+                raise ValueError(f"Duplicated backtest configuration for {config.ticker} "
+                                 f"({config.start_date.date()} to {config.end_date.date()})")
+            seen.add(fields)
+        self.configs = configs
+        self.labels = self.run_labels(configs)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.history_period = history_period
+        self.price_fetcher = price_fetcher or PriceFetcher()
+
+    @staticmethod
+    def run_labels(configs: list) -> list:
+        """
+        Name of each configuration in the results: the ticker, plus the date range
+        when the ticker appears more than once (and the position if that is not enough).
+        """
+        tickers = [config.ticker for config in configs]
+        labels = [ticker if tickers.count(ticker) == 1
+                  else f"{ticker} {config.start_date:%Y-%m-%d}..{config.end_date:%Y-%m-%d}"
+                  for ticker, config in zip(tickers, configs)]
+        return [label if labels.count(label) == 1 else f"{label} #{position}"
+                for position, label in enumerate(labels)]
+
+    @classmethod
+    def from_tickers(cls, tickers: list, start_date, end_date, period: str = "7d",
+                     initial_cash: float = 10000, **kwargs):
+        """Same date range and cash for every ticker."""
+        configs = [BacktestConfig(ticker, start_date, end_date, period, initial_cash) for ticker in tickers]
+        return cls(configs, **kwargs)
+
+    def fetch_price_panel(self):
+        """
+        Download every ticker once and align them on a common date index.
+
+        Returns:
+            Tuple[np.ndarray, pd.DatetimeIndex]: OHLC panel of shape
+            (n_configs, n_dates, 4), NaN where a ticker has no bar, and the dates.
+        """
+        histories = {}
+        for ticker in dict.fromkeys(config.ticker for config in self.configs):
+            df = self.price_fetcher.fetch_price_data(ticker, period=self.history_period)
+            if not df.empty:
+                df = df[OHLC_COLUMNS]
+                df.index = df.index.tz_localize(None).normalize()
+            histories[ticker] = df
+        frames = [histories[config.ticker] for config in self.configs]
+
+        dates = pd.DatetimeIndex(sorted(set().union(*(df.index for df in frames))))
+        panel = np.full((len(frames), len(dates), len(OHLC_COLUMNS)), np.nan)
+        for i, df in enumerate(frames):
+            if not df.empty:
+                panel[i] = df.reindex(dates).to_numpy(dtype=float)
+        return panel, dates
+
+    def run(self):
+        """
+        Fan the per-ticker backtests out across a process pool.
+
+        The price panel is fetched once in the parent and shared read-only with
+        the workers through shared memory; only configurations and results cross
+        process boundaries.
+
+        Returns:
+            Tuple[pd.DataFrame, pd.DataFrame, dict]: Portfolio equity curve (one
+            column per configuration plus 'Portfolio'), per-configuration summary,
+            and the daily records, all keyed by the labels of run_labels (the
+            ticker when it appears once).
+        """
+        panel, dates = self.fetch_price_panel()
+        results, outputs, errors = {}, {}, {}
+
+        with SharedArrays({'ohlc': panel, 'dates': dates.values}) as shared:
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(self.configs)),
+                                     initializer=_init_worker, initargs=(shared.spec,)) as pool:
+                futures = [pool.submit(_backtest_worker, i, config) for i, config in enumerate(self.configs)]
+                for future in as_completed(futures):
+                    position, output_df, result, error = future.result()
+                    if error is not None:
+                        logger.warning("Backtest fallito per %s: %s", self.labels[position], error)
+                        errors[position] = error
+                        continue
+                    results[position] = result
+                    outputs[self.labels[position]] = output_df
+
+        return self.merge(results, errors), self.summarize(results, errors), outputs
+
+    def merge(self, results: dict, errors: dict = None) -> pd.DataFrame:
+        """
+        Combine the equity curves of the configurations into the portfolio equity curve.
+
+        Args:
+            results (dict): BacktestResult by configuration position.
+
+        Each configuration trades its own initial cash; before its first bar and
+        after its last bar it holds its starting or final value. Configurations
+        that failed keep their cash idle.
+        """
+        curves = {}
+        for position, label in enumerate(self.labels):
+            result = results.get(position)
+            if result is None or not len(result.equity):
+                continue
+            curves[label] = pd.Series(result.equity, index=result.index)
+
+        equity = pd.DataFrame(curves, columns=list(curves)).sort_index()
+        if equity.empty:
+            return equity
+        equity = equity.ffill()
+        for position, label in enumerate(self.labels):
+            if label in equity.columns:
+                equity[label] = equity[label].fillna(results[position].initial_cash)
+
+        idle_cash = sum(config.initial_cash for config, label in zip(self.configs, self.labels) if label not in curves)
+        equity['Portfolio'] = equity.sum(axis=1) + idle_cash
+        return equity
+
+    def summarize(self, results: dict, errors: dict = None) -> pd.DataFrame:
+        """Per-configuration summary table (see BacktestResult.summary), indexed by run_labels."""
+        rows = []
+        for position, (config, label) in enumerate(zip(self.configs, self.labels)):
+            if position in results:
+                row = results[position].summary()
+            else:
+                row = {'status': f"Error: {(errors or {}).get(position, 'no result')}"}
+            rows.append({'run': label, 'ticker': config.ticker, 'start_date': config.start_date,
+                         'end_date': config.end_date, **row})
+        return pd.DataFrame(rows).set_index('run')
+
+
+if __name__ == "__main__":
+    configure_logging()
+    config = BacktestConfig()
+    portfolio = PortfolioBacktest.from_tickers(
+        ["NVDA", "AAPL", "MSFT", "AMZN", "META"], config.start_date, config.end_date, config.period, config.initial_cash
+    )
+    equity, summary, outputs = portfolio.run()
+
+    print("\n=== PORTFOLIO SUMMARY ===")
+    print(summary.to_string())
+    if not equity.empty:
+        initial_value = sum(c.initial_cash for c in portfolio.configs)
+        final_value = equity['Portfolio'].iloc[-1]
+        print(f"\nFinal Portfolio Value: ${final_value:,.2f} ({(final_value / initial_value - 1) * 100:.2f}%)")
+        equity.to_csv("portfolio_equity.csv")
+    summary.to_csv("portfolio_summary.csv")
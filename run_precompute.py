@@ -0,0 +1,34 @@
+import argparse
+from config.services import get_services
+from monitoring.logs import configure_logging
+from pipeline.precompute import PrecomputeScheduler, WatchlistPrecomputer
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute the watchlist signals served by main.py")
+    parser.add_argument("--once", action="store_true", help="refresh the watchlist once and exit")
+    args = parser.parse_args()
+
+    # === Configurazione dalla sezione 'precompute' di settings.yaml ===
+    services = get_services()
+    configure_logging(services.settings)
+    services.warm_up()
+    settings = services.settings.get('precompute') or {}
+
+    precomputer = WatchlistPrecomputer(
+        services,
+        services.signal_store,
+        watchlist=settings.get('watchlist', []),
+        rsi_modes=settings.get('rsi_modes', ["standard"]),
+    )
+
+    if args.once:
+        precomputer.run()
+    else:
+        scheduler = PrecomputeScheduler(
+            precomputer,
+            times=settings.get('times', ["09:00", "16:05"]),
+            timezone=settings.get('timezone', "America/New_York"),
+            refresh_minutes=settings.get('refresh_minutes', 30),
+        )
+        scheduler.run_forever()
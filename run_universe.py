@@ -0,0 +1,119 @@
+import argparse
+import os
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+from config.backtest_config import BacktestConfig
+from config.settings_loader import load_settings
+from data.work_queue import work_queue_from_settings
+from monitoring.logs import configure_logging
+from pipeline.distributed import QueueWorker, analysis_tasks, merge_results, sentiment_day_tasks, task_handlers
+
+
+def _work_process(queue_url: str, run_id: str, threads: int, drain: bool) -> Counter:
+    """One worker process: its own ServiceContainer and `threads` queue workers sharing it."""
+    from config.services import get_services
+    from run_backtest import SentimentWorkers
+
+    services = get_services()
+    configure_logging(services.settings)
+    services.warm_up()
+    section = services.settings.get('work_queue') or {}
+    queue = work_queue_from_settings(services.settings, url=queue_url)
+    defaults = BacktestConfig()
+    # Con newsapi.mode 'bulk' le notizie arrivano dall'ingestor come in run_backtest (stessa chiave di checkpoint)
+    handlers = task_handlers(services, SentimentWorkers(defaults.fetch_concurrency, defaults.scoring_concurrency,
+                                                        services.news_ingestor))
+    worker = QueueWorker(queue, run_id, handlers, lease_seconds=float(section.get('lease_seconds', 300)))
+
+    outcomes = [Counter() for _ in range(threads)]
+
+    def run(position):
+        outcomes[position] = worker.run(drain=drain)
+
+    workers = [threading.Thread(target=run, args=(position,)) for position in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return sum(outcomes, Counter())
+
+
+def _tickers(args, settings: dict) -> list:
+    if args.tickers_file:
+        with open(args.tickers_file) as f:
+            return [line.split('#')[0].strip() for line in f if line.split('#')[0].strip()]
+    return args.tickers or (settings.get('precompute') or {}).get('watchlist', [])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Universe-wide analysis distributed over worker processes and hosts")
+    parser.add_argument("--queue", help="queue URL (sqlite file path); default: work_queue.url")
+    parser.add_argument("--run-id", default=f"universe-{date.today():%Y-%m-%d}", help="run to act on")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit = commands.add_parser("submit", help="enqueue the tasks of a run (tasks already in it are skipped)")
+    submit.add_argument("--tickers", nargs="+", help="default: precompute.watchlist")
+    submit.add_argument("--tickers-file", help="one ticker per line ('#' starts a comment)")
+    submit.add_argument("--rsi-modes", nargs="+", default=["standard"])
+    submit.add_argument("--days", nargs=2, metavar=("START", "END"),
+                        help="also enqueue the backtest sentiment of every business day in [START, END]")
+    submit.add_argument("--period", default="7d", help="sentiment window of each day (with --days)")
+    submit.add_argument("--no-analysis", action="store_true", help="only the per-day sentiment tasks")
+
+    work = commands.add_parser("work", help="drain the run on this host")
+    work.add_argument("--processes", type=int, default=1)
+    work.add_argument("--threads", type=int, default=4, help="tasks run at the same time in each process")
+    work.add_argument("--forever", action="store_true", help="keep polling after the run is drained")
+
+    commands.add_parser("status", help="task counts and failures of the run")
+    commands.add_parser("retry", help="queue the failed tasks of the run again")
+
+    merge = commands.add_parser("merge", help="write the results of the run as CSV files")
+    merge.add_argument("--out-dir", default=".")
+    merge.add_argument("--checkpoint", action="store_true",
+                       help="also store the per-day sentiment in the backtest checkpoints")
+    merge.add_argument("--checkpoint-dir", help="default: the project's 'checkpoints' directory")
+
+    args = parser.parse_args()
+    settings = load_settings()
+    configure_logging(settings)
+    queue = work_queue_from_settings(settings, url=args.queue)
+
+    if args.command == "submit":
+        tickers = _tickers(args, settings)
+        tasks = [] if args.no_analysis else analysis_tasks(tickers, args.rsi_modes)
+        if args.days:
+            tasks += sentiment_day_tasks(tickers, *args.days, period=args.period)
+        added = queue.enqueue(args.run_id, tasks)
+        print(f"{args.run_id}: {added} new tasks ({len(tasks) - added} already submitted)")
+
+    elif args.command == "work":
+        with ProcessPoolExecutor(max_workers=args.processes) as pool:
+            futures = [pool.submit(_work_process, args.queue, args.run_id, args.threads, not args.forever)
+                       for _ in range(args.processes)]
+            outcomes = sum((future.result() for future in futures), Counter())
+        print(f"{args.run_id}: " + ", ".join(f"{name} {count}" for name, count in sorted(outcomes.items())))
+
+    elif args.command == "status":
+        counts = queue.counts(args.run_id)
+        print(f"{args.run_id}: " + ", ".join(f"{status} {count}" for status, count in counts.items()))
+        for failure in queue.failures(args.run_id):
+            print(f"  {failure['id']} (attempts {failure['attempts']}): {failure['error']}")
+
+    elif args.command == "retry":
+        print(f"{args.run_id}: {queue.retry_failed(args.run_id)} tasks queued again")
+
+    elif args.command == "merge":
+        os.makedirs(args.out_dir, exist_ok=True)
+        tables = merge_results(queue.results(args.run_id))
+        for kind, table in tables.items():
+            path = os.path.join(args.out_dir, f"{args.run_id}-{kind}.csv")
+            table.to_csv(path)
+            print(f"{path}: {len(table)} rows")
+        if args.checkpoint and "sentiment_day" in tables:
+            from run_backtest import checkpoint_sentiment_days
+            added = checkpoint_sentiment_days(tables["sentiment_day"], args.checkpoint_dir)
+            print(f"{args.run_id}: {added} days added to the backtest checkpoints")
@@ -0,0 +1,308 @@
+import math
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Pesi di default per la media pesata news/reddit
+SOURCE_WEIGHTS = {'news': 0.7, 'reddit': 0.3}
+
+
+def weighted_sentiment(news_mean, reddit_mean, weights: dict = None):
+    """
+    Blend per-source mean sentiment scores into the overall score.
+
+    A missing source (None or NaN) is dropped and the remaining weights are
+    renormalized, exactly as SentimentAnalyzer has always done. Works on scalars
+    and on NumPy arrays, so backtests and parameter sweeps can re-blend
+    precomputed source means without calling the LLM again.
+
+    Args:
+        news_mean (float or array-like): Mean score of 'news' documents.
+        reddit_mean (float or array-like): Mean score of 'reddit_*' documents.
+        weights (dict, optional): {'news': w, 'reddit': w}. Default: SOURCE_WEIGHTS.
+
+    Returns:
+        float or np.ndarray: Overall score clipped to [-100, 100] (0.0 if no source).
+    """
+    if weights is None:
+        weights = SOURCE_WEIGHTS
+
+    means = {
+        'news': np.asarray(np.nan if news_mean is None else news_mean, dtype=float),
+        'reddit': np.asarray(np.nan if reddit_mean is None else reddit_mean, dtype=float),
+    }
+
+    weighted_sum = 0.0
+    total_weight = 0.0
+    for source, weight in weights.items():
+        present = ~np.isnan(means[source])
+        weighted_sum = weighted_sum + np.where(present, means[source] * weight, 0.0)
+        total_weight = total_weight + np.where(present, weight, 0.0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        overall = np.where(total_weight > 0, weighted_sum / total_weight * sum(weights.values()), 0.0)
+    overall = np.clip(overall, -100, 100)
+
+    return float(overall) if overall.ndim == 0 else overall
+
+
+# Emivita (ore) del peso di un documento, per fonte: le news restano rilevanti più a lungo dei post
+DEFAULT_HALF_LIVES = {'news': 24.0, 'reddit': 12.0}
+_NS_PER_HOUR = 3600 * 10 ** 9
+
+
+def source_type(source: str):
+    """'news', 'reddit' (for 'reddit_<subreddit>') or None, as grouped by SentimentAnalyzer."""
+    if source == 'news':
+        return 'news'
+    if isinstance(source, str) and source.startswith('reddit_'):
+        return 'reddit'
+    return None
+
+
+def _to_ns(timestamp) -> int:
+    # Orari senza fuso = UTC, come in SentimentCorpus.between
+    timestamp = pd.Timestamp(timestamp)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize("UTC")
+    return timestamp.as_unit("ns").value
+
+
+class DecayedSentiment:
+    """
+    Streaming, exponentially time-decayed sentiment of one ticker.
+
+    Each source keeps a decayed sum of scores and of weights, both expressed
+    at the time of its latest document. A document scored at time t weighs
+    0.5 ** (age / half_life) at any later time, so the per-source mean is
+    sum / weight and adding a document costs O(1). Queries do not change the
+    state.
+
+    Documents added in timestamp order give exactly the same floats as
+    decayed_source_means over the same documents: it replays them through
+    this class (ties keep their input order). A document older than the
+    latest one of its source is still weighted exactly, but the rounding can
+    differ in the last bits.
+
+    A live aggregator is kept per ticker by the ServiceContainer and fed with
+    ingest(), which skips the documents of earlier, overlapping windows.
+    """
+
+    def __init__(self, half_lives: dict = None, weights: dict = None, min_weight: float = 0.0):
+        """
+        Args:
+            half_lives (dict, optional): {'news': hours, 'reddit': hours}. Default: DEFAULT_HALF_LIVES.
+            weights (dict, optional): Source blend of score(), see weighted_sentiment. Default: SOURCE_WEIGHTS.
+            min_weight (float): A source whose decayed weight (number of documents, each
+                discounted by its age) is below this counts as missing. Default: 0.
+        """
+        half_lives = dict(DEFAULT_HALF_LIVES, **(half_lives or {}))
+        self.weights = weights or SOURCE_WEIGHTS
+        self.min_weight = min_weight
+        # Costante di decadimento per nanosecondo
+        self._rates = {source: math.log(2) / (hours * _NS_PER_HOUR) for source, hours in half_lives.items()}
+        # Fonte -> [somma pesata dei punteggi, somma dei pesi, istante (ns) a cui sono riferite]
+        self._state = {source: [0.0, 0.0, None] for source in self._rates}
+        self.last_update = None
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def update(self, timestamp, score: float, source: str):
+        """Add one scored document; sources other than news and reddit_* are ignored."""
+        kind = source_type(source)
+        if kind is not None:
+            self._update(kind, _to_ns(timestamp), float(score))
+
+    def _update(self, kind: str, time_ns: int, score: float):
+        if math.isnan(score):
+            return
+        state = self._state[kind]
+        if state[2] is None:
+            state[:] = [score, 1.0, time_ns]
+        elif time_ns >= state[2]:
+            decay = math.exp(-self._rates[kind] * (time_ns - state[2]))
+            state[:] = [state[0] * decay + score, state[1] * decay + 1.0, time_ns]
+        else:
+            # Documento in ritardo: entra con il peso che ha all'istante corrente dello stato
+            decay = math.exp(-self._rates[kind] * (state[2] - time_ns))
+            state[0] += score * decay
+            state[1] += decay
+        if self.last_update is None or time_ns > self.last_update:
+            self.last_update = time_ns
+
+    def update_frame(self, df: pd.DataFrame):
+        """Add the rows of a scored DataFrame (timestamp, source, sentiment_score), in timestamp order."""
+        for kind, time_ns, score in _scored_rows(df):
+            self._update(kind, time_ns, score)
+
+    def ingest(self, df: pd.DataFrame, at=None) -> dict:
+        """
+        Add the documents of a scored DataFrame that were not added before, then
+        return source_means(at). Thread-safe.
+
+        Successive live analyses fetch overlapping windows: a document (source,
+        timestamp, text) already added is skipped, so each one counts once, and
+        late documents are weighted by their own timestamp. Documents older than
+        the oldest one of df are forgotten, as later windows will not return them.
+        """
+        text_column = next((column for column in ('cleaned_text', 'text') if column in df.columns), None)
+        rows = _scored_rows(df, text_column)
+        with self._lock:
+            if rows:
+                self._seen = {key for key in self._seen if key[1] >= rows[0][1]}
+            for kind, time_ns, score, text in rows:
+                if (kind, time_ns, text) in self._seen:
+                    continue
+                self._seen.add((kind, time_ns, text))
+                self._update(kind, time_ns, score)
+            if self.last_update is None:
+                return {'news': None, 'reddit': None}
+            return self.source_means(at)
+
+    def effective_weights(self, at=None) -> dict:
+        """Decayed weight of each source at time at (default: latest document)."""
+        at_ns = self.last_update if at is None else _to_ns(at)
+        weights = {}
+        for kind, (_, weight, time_ns) in self._state.items():
+            if time_ns is None:
+                weights[kind] = 0.0
+                continue
+            if at_ns < time_ns:
+                raise ValueError(f"Cannot query {kind} sentiment at {pd.Timestamp(at_ns, tz='UTC')}: "
+                                 f"it already includes documents up to {pd.Timestamp(time_ns, tz='UTC')}")
+            weights[kind] = weight * math.exp(-self._rates[kind] * (at_ns - time_ns))
+        return weights
+
+    def source_means(self, at=None) -> dict:
+        """{'news': mean or None, 'reddit': mean or None} at time at (default: latest document)."""
+        weights = self.effective_weights(at)
+        means = {}
+        for kind, (total, weight, _) in self._state.items():
+            # Il rapporto somma/peso non cambia col tempo: il decadimento agisce su entrambi
+            means[kind] = total / weight if weight > 0 and weights[kind] > self.min_weight else None
+        return means
+
+    def score(self, at=None) -> float:
+        """Overall score at time at, blended as in SentimentAnalyzer."""
+        means = self.source_means(at)
+        return weighted_sentiment(means.get('news'), means.get('reddit'), self.weights)
+
+
+def _scored_rows(df: pd.DataFrame, text_column: str = None) -> list:
+    """
+    (source kind, timestamp ns, score) of the scored news/reddit rows, stably sorted
+    by timestamp; with text_column, (source kind, timestamp ns, score, text).
+    """
+    if df.empty or not {'timestamp', 'source', 'sentiment_score'}.issubset(df.columns):
+        return []
+    times = pd.DatetimeIndex(pd.to_datetime(df['timestamp'], utc=True)).as_unit("ns").asi8
+    order = np.argsort(times, kind="stable")
+    kinds = [source_type(source) for source in df['source'].to_numpy(dtype=object)]
+    scores = df['sentiment_score'].to_numpy(dtype=float)
+    if text_column is None:
+        return [(kinds[i], int(times[i]), float(scores[i])) for i in order if kinds[i] is not None]
+    texts = df[text_column].to_numpy(dtype=object)
+    return [(kinds[i], int(times[i]), float(scores[i]), texts[i]) for i in order if kinds[i] is not None]
+
+
+def decayed_source_means(df: pd.DataFrame, at=None, half_lives: dict = None, min_weight: float = 0.0) -> dict:
+    """
+    Per-source decayed means of a scored DataFrame at time at (default: its
+    latest document); documents after at are left out.
+    """
+    aggregator = DecayedSentiment(half_lives, min_weight=min_weight)
+    at_ns = None if at is None else _to_ns(at)
+    for row in _scored_rows(df):
+        if at_ns is not None and row[1] > at_ns:
+            break
+        aggregator._update(*row)
+    if aggregator.last_update is None:
+        return {'news': None, 'reddit': None}
+    return aggregator.source_means(at_ns)
+
+
+def _to_ns_array(values) -> np.ndarray:
+    # Come _to_ns, su un intero array
+    index = pd.DatetimeIndex(pd.to_datetime(values))
+    if index.tz is None:
+        index = index.tz_localize("UTC")
+    return index.as_unit("ns").asi8
+
+
+def windowed_source_means(df: pd.DataFrame, times, starts, half_lives: dict = None,
+                          min_weight: float = 0.0) -> pd.DataFrame:
+    """
+    Per-source sentiment of many windows [start, time) in one vectorized pass.
+
+    Each window gets the values SentimentAnalyzer gives the documents of that
+    window (the flat mean, or with half_lives the decayed mean at the window's
+    time), but documents are scored and sorted once and every window costs two
+    binary searches: prefix sums give the flat means, and decayed sums are
+    rebased from the state at the window's last and first documents. Meant
+    for intraday backtests with one window per bar.
+
+    Args:
+        df (pd.DataFrame): Scored documents (timestamp, source, sentiment_score) of one ticker.
+        times, starts (array-like): Window ends (excluded) and starts (included); naive times are UTC.
+        half_lives (dict, optional): Decayed aggregation with these half-lives
+            (see DecayedSentiment). Default: flat means.
+        min_weight (float): See DecayedSentiment. Only with half_lives.
+
+    Returns:
+        pd.DataFrame: Index = times; float columns NewsSentiment and RedditSentiment,
+        NaN where the window has no scored document of that source.
+    """
+    times_index = pd.Index(times)
+    end_ns, start_ns = _to_ns_array(times), _to_ns_array(starts)
+    rows = _scored_rows(df)
+    columns = {}
+    rates = None
+    if half_lives is not None:
+        rates = {source: math.log(2) / (hours * _NS_PER_HOUR)
+                 for source, hours in dict(DEFAULT_HALF_LIVES, **half_lives).items()}
+
+    for kind, column in (('news', 'NewsSentiment'), ('reddit', 'RedditSentiment')):
+        selected = [(time_ns, score) for row_kind, time_ns, score in rows if row_kind == kind and score == score]
+        means = np.full(len(end_ns), np.nan)
+        if selected:
+            doc_ns = np.fromiter((time_ns for time_ns, _ in selected), np.int64, len(selected))
+            scores = np.fromiter((score for _, score in selected), float, len(selected))
+            lo = np.searchsorted(doc_ns, start_ns, side="left")
+            hi = np.searchsorted(doc_ns, end_ns, side="left")
+            counts = hi - lo
+            if rates is None:
+                prefix = np.concatenate([[0.0], np.cumsum(scores)])
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    means = np.where(counts > 0, (prefix[hi] - prefix[lo]) / counts, np.nan)
+            else:
+                means = _windowed_decayed_means(doc_ns, scores, rates[kind], lo, hi, end_ns, min_weight)
+                means[counts == 0] = np.nan
+        columns[column] = means
+    return pd.DataFrame(columns, index=times_index)
+
+
+def _windowed_decayed_means(doc_ns: np.ndarray, scores: np.ndarray, rate: float, lo: np.ndarray,
+                            hi: np.ndarray, end_ns: np.ndarray, min_weight: float) -> np.ndarray:
+    # Stato decaduto (somme pesate di punteggi e pesi) riferito all'istante di ogni documento
+    totals = np.empty(len(scores))
+    weights = np.empty(len(scores))
+    total = weight = 0.0
+    previous = doc_ns[0]
+    for position, (time_ns, score) in enumerate(zip(doc_ns.tolist(), scores.tolist())):
+        decay = math.exp(-rate * (time_ns - previous))
+        total, weight, previous = total * decay + score, weight * decay + 1.0, time_ns
+        totals[position], weights[position] = total, weight
+
+    def at_end(count):
+        # Stato dei primi `count` documenti portato a fine finestra (0 se nessuno)
+        last = np.maximum(count - 1, 0)
+        decay = np.where(count > 0, np.exp(-rate * (end_ns - doc_ns[last]).astype(float)), 0.0)
+        return totals[last] * decay, weights[last] * decay
+
+    inside_total, inside_weight = at_end(hi)
+    before_total, before_weight = at_end(lo)
+    # I documenti prima dell'inizio della finestra escono dalla somma
+    window_total, window_weight = inside_total - before_total, inside_weight - before_weight
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where((window_weight > 0) & (window_weight > min_weight), window_total / window_weight, np.nan)
@@ -1,26 +1,64 @@
+import logging
 import pandas as pd
-from openai import OpenAI
 import re
 import os
 import numpy as np
-import yaml
+from config.settings_loader import load_settings
+from monitoring.metrics import cache_lookup
+from sentiment.aggregation import (DEFAULT_HALF_LIVES, SOURCE_WEIGHTS, DecayedSentiment, decayed_source_means,
+                                   weighted_sentiment)
+from data.cassette import Cassette, CassetteMissError
+from typing import TYPE_CHECKING
 
-class SentimentAnalyzer:
-    """Analyzes sentiment using OpenAI's GPT model."""
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+logger = logging.getLogger(__name__)
 
-    def __init__(self, config_path: str = None):
-        """Initialize the OpenAI API client with settings from config/settings.yaml."""
-        if config_path is None:
-            config_path = os.path.join(os.path.dirname(__file__), "..", "config", "settings.yaml")
-        
-        config_path = os.path.abspath(config_path)
+AGGREGATIONS = ("flat", "decayed")
 
-        with open(config_path, 'r') as file:
-            settings = yaml.safe_load(file)
+class SentimentAnalyzer:
+    """Analyzes sentiment using OpenAI's GPT model."""
 
-        os.environ["OPENAI_API_KEY"] = settings['openai']['api_key']
-        self.client = OpenAI()
+    def __init__(self, config_path: str = None, weights: dict = None, cassette: Cassette = None,
+                 settings: dict = None, client: 'OpenAI' = None, executor=None, score_memo: dict = None,
+                 decayed: DecayedSentiment = None):
+        """
+        Initialize the OpenAI API client with settings from config/settings.yaml (or a shared client).
+
+        When an executor (e.g. a ThreadPoolExecutor shared by a watchlist) is given,
+        the texts of a DataFrame are scored concurrently on it. score_memo maps
+        (text, ticker) to an already known score; those texts are not re-scored
+        and new scores are added to it.
+
+        The per-source means are flat averages over the window, or time-decayed
+        averages (see sentiment.aggregation.DecayedSentiment) when the 'sentiment'
+        section of settings.yaml sets aggregation: decayed. With decayed (the live
+        aggregator of the ticker, see ServiceContainer.decayed_sentiment) the scored
+        documents are fed into it and its means are used, so documents that left the
+        fetch window keep counting with their decayed weight.
+        """
+        settings = settings or load_settings(config_path)
+
+        if client is None:
+            from openai import OpenAI
+            os.environ["OPENAI_API_KEY"] = settings['openai']['api_key']
+            client = OpenAI(base_url=settings['openai'].get('base_url'))
+        self.client = client
+        self.cassette = cassette or Cassette.from_settings(settings)
         self.model_name = settings['openai']['model_name']
+        self.weights = weights or SOURCE_WEIGHTS
+        sentiment_config = settings.get('sentiment') or {}
+        self.aggregation = sentiment_config.get('aggregation', "flat")
+        if self.aggregation not in AGGREGATIONS:
+            raise ValueError(f"Invalid sentiment aggregation '{self.aggregation}', expected one of {AGGREGATIONS}")
+        self.half_lives = dict(DEFAULT_HALF_LIVES, **(sentiment_config.get('half_life_hours') or {}))
+        self.min_weight = float(sentiment_config.get('min_weight', 0.0))
+        self.executor = executor
+        self.score_memo = score_memo
+        self.decayed = decayed
+        self.last_source_means = {'news': None, 'reddit': None}
+        self.last_failed_scores = 0   # testi dell'ultima analisi il cui scoring è fallito (contati come 0.0)
         self.prompt_template = (
             "You are a helpful assistant. Rate the sentiment, based on a financial point of view, of the following text with respect to the stock ticker {ticker} "
             "between -100 for very negative and 100 for very positive, where 0 is neutral. "
@@ -30,21 +68,31 @@ class SentimentAnalyzer:
 
     def get_sentiment_score(self, text: str, ticker: str, num_trials: int = 1) -> float:
         """Get the average sentiment score using OpenAI API."""
+        return self._sentiment_score(text, ticker, num_trials)[0]
+
+    def _sentiment_score(self, text: str, ticker: str, num_trials: int = 1) -> tuple:
+        # (punteggio medio, numero di chiamate fallite): un errore conta come 0.0 nel punteggio
         scores = []
+        failures = 0
         prompt = self.prompt_template.format(ticker=ticker, text=text)
 
-        for _ in range(num_trials):
+        messages = [
+            {"role": "system", "content": "You are a sentiment analysis expert."},
+            {"role": "user", "content": prompt}
+        ]
+
+        for trial in range(num_trials):
             try:
-                response = self.client.chat.completions.create(
-                    model=self.model_name,
-                    messages=[
-                        {"role": "system", "content": "You are a sentiment analysis expert."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.5,
-                    max_tokens=10,
+                reply = self.cassette.call(
+                    "openai.chat",
+                    {"model": self.model_name, "messages": messages, "temperature": 0.5, "max_tokens": 10, "trial": trial},
+                    lambda: self.client.chat.completions.create(
+                        model=self.model_name,
+                        messages=messages,
+                        temperature=0.5,
+                        max_tokens=10,
+                    ).choices[0].message.content,
                 )
-                reply = response.choices[0].message.content
                 match = re.search(r'-?\d+', reply)
                 if match:
                     score = int(match.group())
@@ -52,23 +100,43 @@ class SentimentAnalyzer:
                     scores.append(score)
                 else:
                     scores.append(0.0)
+            except CassetteMissError:
+                raise
             except Exception as e:
-                print(f"Error during OpenAI API call: {e}")
+                logger.warning("Error during OpenAI API call: %s", e)
                 scores.append(0.0)
-
-        return sum(scores) / len(scores) if scores else 0.0
-
-    def analyze_sentiment(self, df: pd.DataFrame) -> tuple[pd.DataFrame, float]:
-        """Analyze sentiment for each text and compute a weighted overall score."""
-        if df.empty or 'cleaned_text' not in df.columns or 'source' not in df.columns or 'ticker' not in df.columns:
-            print("Warning: Empty DataFrame or missing required columns.")
-            return df, 0.0
-
-        df['sentiment_score'] = df.apply(
-            lambda row: self.get_sentiment_score(row['cleaned_text'], row['ticker']),
-            axis=1
-        )
-
+                failures += 1
+
+        return (sum(scores) / len(scores) if scores else 0.0), failures
+
+    def score_texts(self, texts, tickers) -> list:
+        """
+        Score (text, ticker) pairs in order; repeated pairs are sent to the model once.
+
+        Texts whose scoring failed count as 0.0 and are not memoized; their number
+        is left in last_failed_scores.
+        """
+        pairs = list(zip(texts, tickers))
+        memo = self.score_memo if self.score_memo is not None else {}
+        unique = [pair for pair in dict.fromkeys(pairs) if pair not in memo]
+        cache_lookup("score_memo", "openai.chat", hit=True, count=len(pairs) - len(unique))
+        cache_lookup("score_memo", "openai.chat", hit=False, count=len(unique))
+        if self.executor is None:
+            results = [self._sentiment_score(text, ticker) for text, ticker in unique]
+        else:
+            results = list(self.executor.map(lambda pair: self._sentiment_score(*pair), unique))
+        scores = [score for score, _ in results]
+        failed = {pair for pair, (_, failures) in zip(unique, results) if failures}
+        self.last_failed_scores = len(failed)
+        lookup = {pair: memo[pair] for pair in pairs if pair in memo}
+        lookup.update(zip(unique, scores))
+        if self.score_memo is not None:
+            # Un punteggio fallito non va riusato: il testo sarà rivalutato alla prossima richiesta
+            self.score_memo.update((pair, score) for pair, score in zip(unique, scores) if pair not in failed)
+        return [lookup[pair] for pair in pairs]
+
+    @staticmethod
+    def _flat_source_means(df: pd.DataFrame) -> dict:
         source_means = {}
         for source_type in ['reddit', 'news']:
             if source_type == 'reddit':
@@ -79,21 +147,43 @@ class SentimentAnalyzer:
                 source_means[source_type] = df[mask]['sentiment_score'].mean()
             else:
                 source_means[source_type] = None
+        return source_means
+
+    def analyze_sentiment(self, df: pd.DataFrame, at=None) -> tuple[pd.DataFrame, float]:
+        """
+        Analyze sentiment for each text and compute a weighted overall score.
+
+        Args:
+            df (pd.DataFrame): Cleaned documents (cleaned_text, source, ticker, timestamp).
+            at (optional): Time of the decayed aggregation (e.g. the end of a backtest
+                window). Default: the latest document. Ignored by the flat aggregation.
+
+        Returns:
+            Tuple[pd.DataFrame, float]: df with a sentiment_score column, and the overall score.
+        """
+        if df.empty or 'cleaned_text' not in df.columns or 'source' not in df.columns or 'ticker' not in df.columns:
+            logger.warning("Empty DataFrame or missing required columns.")
+            self.last_source_means = {'news': None, 'reddit': None}
+            self.last_failed_scores = 0
+            return df, 0.0
 
-        weights = {'news': 0.7, 'reddit': 0.3}
-        total_weight = 0.0
-        weighted_sum = 0.0
+        df['sentiment_score'] = self.score_texts(df['cleaned_text'], df['ticker'])
 
-        for source, weight in weights.items():
-            if source_means[source] is not None:
-                weighted_sum += source_means[source] * weight
-                total_weight += weight
+        if self.aggregation == "decayed" and self.decayed is not None and not self.last_failed_scores:
+            # Aggregatore vivo del ticker: i documenti già visti non vengono contati due volte
+            source_means = self.decayed.ingest(df, at)
+        elif self.aggregation == "decayed":
+            # I documenti recenti pesano di più (emivita per fonte); gli 0.0 dei fallimenti
+            # non entrano nell'aggregatore vivo, dove resterebbero
+            source_means = decayed_source_means(df, at, self.half_lives, self.min_weight)
+        else:
+            source_means = self._flat_source_means(df)
 
-        overall_score = (weighted_sum / total_weight * sum(weights.values())) if total_weight > 0 else 0.0
-        overall_score = max(min(overall_score, 100), -100)
+        self.last_source_means = source_means
+        overall_score = weighted_sentiment(source_means['news'], source_means['reddit'], self.weights)
 
-        print("Source means:", {k: v for k, v in source_means.items() if v is not None})
-        print(f"Overall sentiment score: {overall_score:.2f}")
+        logger.debug("Source means: %s", {k: v for k, v in source_means.items() if v is not None})
+        logger.debug("Overall sentiment score: %.2f", overall_score)
 
         return df, overall_score
 
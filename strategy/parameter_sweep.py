@@ -0,0 +1,227 @@
+import itertools
+import logging
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from strategy.strategy_computation import DEFAULT_PARAMS, HybridStrategy
+from sentiment.aggregation import SOURCE_WEIGHTS, weighted_sentiment
+from evaluation.performance import performance_metrics, positions_from_signals, strategy_returns
+from evaluation.shared_arrays import SharedArrays, attach_shared_arrays
+
+# Colonne del CSV prodotto da run_backtest.py -> nomi delle feature usate dallo sweep
+FEATURE_COLUMNS = {
+    'Close': 'close',
+    'RSI': 'rsi',
+    'ADX': 'adx',
+    'PE_ratio': 'pe_ratio',
+    'SentimentScore': 'sentiment',
+    'NewsSentiment': 'news_sentiment',
+    'RedditSentiment': 'reddit_sentiment',
+}
+
+# Parametri che non appartengono a HybridStrategy ma vengono gestiti dallo sweep
+SWEEP_ONLY_PARAMS = ('oversold', 'overbought', 'news_weight', 'reddit_weight')
+
+METRICS = ('total_return', 'sharpe', 'max_drawdown', 'hit_rate', 'exposure', 'n_trades')
+
+logger = logging.getLogger(__name__)
+
+_worker_features = None
+
+
+def _init_worker(spec):
+    global _worker_features
+    _worker_features = attach_shared_arrays(spec)
+
+
+def rsi_thresholds(config: dict, rsi_mode: str = 'standard') -> tuple:
+    """(oversold, overbought) of a configuration, defaults of rsi_mode for the keys it does not set."""
+    oversold, overbought = DEFAULT_PARAMS['rsi_thresholds'][rsi_mode]
+    return config.get('oversold', oversold), config.get('overbought', overbought)
+
+
+def evaluate_configuration(features: dict, config: dict, rsi_mode: str = 'standard') -> dict:
+    """
+    Run the vectorized strategy over precomputed features for one configuration.
+
+    Args:
+        features (dict): Arrays 'close', 'rsi', 'adx', 'pe_ratio' and either
+            'news_sentiment'/'reddit_sentiment' (NaN where a source had no
+            documents) or an already blended 'sentiment'.
+        config (dict): Overrides for DEFAULT_PARAMS plus the sweep-only keys
+            'oversold', 'overbought' (thresholds of rsi_mode, oversold below
+            overbought), 'news_weight' and 'reddit_weight'.
+        rsi_mode (str): RSI profile used for every day. Default: 'standard'.
+
+    Returns:
+        dict: Performance metrics (see evaluation.performance.performance_metrics).
+
+    A configuration with oversold >= overbought raises ValueError: the vectorized
+    and per-day signals would disagree on it, so its metrics would be meaningless.
+    """
+    params = {k: v for k, v in config.items() if k not in SWEEP_ONLY_PARAMS}
+    if 'oversold' in config or 'overbought' in config:
+        oversold, overbought = rsi_thresholds(config, rsi_mode)
+        if oversold >= overbought:
+            raise ValueError(f"Invalid RSI thresholds: oversold {oversold} >= overbought {overbought}")
+        params['rsi_thresholds'] = {**DEFAULT_PARAMS['rsi_thresholds'], rsi_mode: (oversold, overbought)}
+
+    if 'news_sentiment' in features:
+        weights = {
+            'news': config.get('news_weight', SOURCE_WEIGHTS['news']),
+            'reddit': config.get('reddit_weight', SOURCE_WEIGHTS['reddit']),
+        }
+        sentiment = weighted_sentiment(features['news_sentiment'], features['reddit_sentiment'], weights)
+    else:
+        sentiment = features['sentiment']
+
+    strategy = HybridStrategy(params)
+    signals, _, _, _ = strategy.generate_signals(
+        features['rsi'], features['adx'], features['pe_ratio'], sentiment, rsi_mode
+    )
+    positions = positions_from_signals(signals)
+    returns = strategy_returns(positions, features['close'])
+    return performance_metrics(returns, positions)
+
+
+def _evaluate_chunk(configs, rsi_mode):
+    return [evaluate_configuration(_worker_features, config, rsi_mode) for config in configs]
+
+
+class ParameterSweep:
+    """Evaluates many strategy configurations in parallel over precomputed features."""
+
+    def __init__(self, features, rsi_mode: str = 'standard', max_workers: int = None):
+        """
+        Args:
+            features (pd.DataFrame or dict): Feature table, e.g. backtest_output.csv
+                (columns as in FEATURE_COLUMNS) or a dict of arrays using the
+                feature names directly. Rows with missing RSI/ADX are dropped.
+            rsi_mode (str): RSI profile to tune. Default: 'standard'.
+            max_workers (int, optional): Process pool size. Default: os.cpu_count().
+        """
+        if isinstance(features, pd.DataFrame):
+            features = {name: features[col].to_numpy(dtype=float)
+                        for col, name in FEATURE_COLUMNS.items() if col in features.columns}
+        features = {name: np.asarray(values, dtype=float) for name, values in features.items()}
+
+        valid = ~(np.isnan(features['rsi']) | np.isnan(features['adx']) | np.isnan(features['close']))
+        self.features = {name: np.ascontiguousarray(values[valid]) for name, values in features.items()}
+        if 'news_sentiment' not in self.features and 'sentiment' not in self.features:
+            raise ValueError("Features must include 'sentiment' or 'news_sentiment'/'reddit_sentiment'")
+
+        self.rsi_mode = rsi_mode
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    @staticmethod
+    def grid(param_grid: dict) -> list:
+        """
+        Expand a parameter grid into the list of all combinations.
+
+        Args:
+            param_grid (dict): Parameter name -> list of values.
+
+        Returns:
+            list[dict]: One configuration per combination.
+        """
+        names = list(param_grid)
+        return [dict(zip(names, values)) for values in itertools.product(*param_grid.values())]
+
+    @staticmethod
+    def random_search(space: dict, n_iter: int, seed: int = None) -> list:
+        """
+        Sample configurations from a search space.
+
+        Args:
+            space (dict): Parameter name -> list of choices, or (low, high) tuple
+                sampled uniformly (integers if both bounds are int).
+            n_iter (int): Number of configurations.
+            seed (int, optional): Random seed for reproducibility.
+
+        Returns:
+            list[dict]: Sampled configurations.
+        """
+        rng = np.random.default_rng(seed)
+        columns = {}
+        for name, values in space.items():
+            if isinstance(values, tuple):
+                low, high = values
+                if isinstance(low, int) and isinstance(high, int):
+                    columns[name] = rng.integers(low, high, endpoint=True, size=n_iter).tolist()
+                else:
+                    columns[name] = rng.uniform(low, high, size=n_iter).tolist()
+            else:
+                columns[name] = [values[i] for i in rng.integers(0, len(values), size=n_iter)]
+        return [{name: columns[name][i] for name in space} for i in range(n_iter)]
+
+    def run(self, configs: list, sort_by: str = 'sharpe', ascending: bool = False,
+            chunk_size: int = None) -> pd.DataFrame:
+        """
+        Evaluate every configuration and rank the results.
+
+        Feature arrays are placed in shared memory once and each worker process
+        maps them at start-up, so only the small configuration dicts travel
+        through the pool.
+
+        Args:
+            configs (list[dict]): Configurations (see grid / random_search).
+            sort_by (str): Metric used for ranking. Default: 'sharpe'.
+            ascending (bool): Sort order. Default: False (best first).
+            chunk_size (int, optional): Configurations per task. Default: spread
+                evenly, about four tasks per worker.
+
+        Returns:
+            pd.DataFrame: One row per configuration with parameters and METRICS,
+            ranked by sort_by. Configurations with oversold >= overbought are skipped.
+        """
+        valid = []
+        for config in configs:
+            oversold, overbought = rsi_thresholds(config, self.rsi_mode)
+            if oversold < overbought:
+                valid.append(config)
+        if len(valid) < len(configs):
+            logger.warning("Skipping %d configurations with oversold >= overbought", len(configs) - len(valid))
+        configs = valid
+        if not configs:
+            return pd.DataFrame(columns=list(METRICS))
+
+        if self.max_workers == 1:
+            results = [evaluate_configuration(self.features, config, self.rsi_mode) for config in configs]
+        else:
+            if chunk_size is None:
+                chunk_size = max(1, -(-len(configs) // (self.max_workers * 4)))
+            chunks = [configs[i:i + chunk_size] for i in range(0, len(configs), chunk_size)]
+
+            with SharedArrays(self.features) as shared:
+                with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                         initargs=(shared.spec,)) as pool:
+                    results = [metrics
+                               for chunk_result in pool.map(_evaluate_chunk, chunks, itertools.repeat(self.rsi_mode))
+                               for metrics in chunk_result]
+
+        ranking = pd.concat([pd.DataFrame(configs), pd.DataFrame(results)], axis=1)
+        ranking = ranking.sort_values(sort_by, ascending=ascending, kind='stable').reset_index(drop=True)
+        ranking.index.name = 'rank'
+        return ranking
+
+
+if __name__ == "__main__":
+    # Esempio: tuning sulle feature salvate dall'ultimo backtest
+    features_df = pd.read_csv("backtest_output.csv")
+    sweep = ParameterSweep(features_df, rsi_mode='standard')
+    configs = ParameterSweep.grid({
+        'oversold': [30, 35, 40, 45],
+        'overbought': [55, 60, 65, 70],
+        'adx_threshold': [10, 15, 20],
+        'sentiment_threshold': [15, 25, 35],
+        'technical_weight': [0.4, 0.6, 0.8],
+        'news_weight': [0.5, 0.7, 0.9],
+    })
+    for config in configs:
+        config['sentiment_weight'] = 1 - config['technical_weight']
+        config['reddit_weight'] = 1 - config['news_weight']
+
+    ranking = sweep.run(configs)
+    print(ranking.head(20))
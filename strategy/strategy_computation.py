@@ -1,9 +1,65 @@
+import numpy as np
+
+# Codici numerici usati dalla versione vettoriale della strategia
+SIGNAL_HOLD = 0
+SIGNAL_BUY = 1
+SIGNAL_SELL = -1
+SIGNAL_LABELS = {SIGNAL_HOLD: "Hold", SIGNAL_BUY: "Buy", SIGNAL_SELL: "Sell"}
+SIGNAL_CODES = {label: code for code, label in SIGNAL_LABELS.items()}
+
+# Soglie RSI (oversold, overbought) per ciascun profilo
+RSI_MODES = ("conservative", "standard", "aggressive")
+RSI_THRESHOLDS = {
+    "conservative": (35, 65),
+    "standard": (40, 60),
+    "aggressive": (45, 55),
+}
+
+# Parametri di default della strategia (sovrascrivibili via HybridStrategy(params))
+DEFAULT_PARAMS = {
+    "rsi_thresholds": RSI_THRESHOLDS,
+    "adx_threshold": 15,          # ADX minimo per un segnale tecnico
+    "adx_trend_threshold": 20,    # ADX minimo per i casi di continuation
+    "sentiment_threshold": 25,    # |sentiment| minimo per i casi di continuation
+    "technical_weight": 0.6,
+    "sentiment_weight": 0.4,
+    "pe_low": 15,
+    "pe_high": 25,
+    "pe_favorable_multiplier": 1.1,
+    "pe_unfavorable_multiplier": 0.9,
+}
+
+# Spiegazioni indicizzate dal codice restituito da generate_signals
+EXPLANATION_HOLD = 0
+EXPLANATION_BUY_CONTINUATION = 1
+EXPLANATION_BUY_REVERSAL = 2
+EXPLANATION_BUY_MODERATE = 3
+EXPLANATION_SELL_CONTINUATION = 4
+EXPLANATION_SELL_REVERSAL = 5
+EXPLANATION_SELL_MODERATE = 6
+EXPLANATIONS = (
+    "Indicators are not aligned, or momentum is weak: no action recommended.",
+    "Despite overbought condition, strong bullish sentiment suggests a continuation of the uptrend.",
+    "Oversold condition and positive sentiment indicate a likely reversal upward: buying opportunity.",
+    "Moderate bullish sentiment and RSI positioning suggest a possible upward move.",
+    "Despite oversold condition, strong bearish sentiment suggests a continuation of the downtrend.",
+    "Overbought condition and negative sentiment indicate a likely reversal downward: selling opportunity.",
+    "Moderate bearish sentiment and RSI positioning suggest a possible downward move.",
+)
+
+
 class HybridStrategy:
-    def __init__(self):
-        pass  # Per ora non inizializziamo nulla, ma puoi aggiungere parametri in futuro
+    def __init__(self, params: dict = None):
+        """
+        Args:
+            params (dict, optional): Overrides for DEFAULT_PARAMS (thresholds, weights, P/E bands).
+        """
+        self.params = {**DEFAULT_PARAMS, **(params or {})}
 
     def generate_trading_signal(self, RSI, ADX, PE_ratio, sentiment_score, rsi_mode):
 
+        p = self.params
+
         # 0. Input Validation
         if not 0 <= RSI <= 100:
             raise ValueError("RSI must be between 0 and 100")
@@ -11,28 +67,17 @@ class HybridStrategy:
             raise ValueError("ADX must be between 0 and 100")
         if not -100 <= sentiment_score <= 100:
             raise ValueError("Sentiment score must be between -100 and 100")
-        if rsi_mode not in ("conservative", "standard", "aggressive"):
+        if rsi_mode not in RSI_MODES:
             raise ValueError("Invalid rsi_mode")
         if PE_ratio <= 0:
             raise ValueError("P/E ratio must be positive")
 
         # 1. Determine Technical Signal from RSI and ADX
-        if rsi_mode == "conservative":
-            oversold_threshold = 35
-            overbought_threshold = 65
-        elif rsi_mode == "standard":
-            oversold_threshold = 40
-            overbought_threshold = 60
-        elif rsi_mode == "aggressive":
-            oversold_threshold = 45
-            overbought_threshold = 55
-        else:  
-            oversold_threshold = 40
-            overbought_threshold = 60
+        oversold_threshold, overbought_threshold = p["rsi_thresholds"][rsi_mode]
 
-        if RSI < oversold_threshold and ADX > 15:
+        if RSI < oversold_threshold and ADX > p["adx_threshold"]:
             technical_signal = "Buy"
-        elif RSI > overbought_threshold and ADX > 15:
+        elif RSI > overbought_threshold and ADX > p["adx_threshold"]:
             technical_signal = "Sell"
         else:
             technical_signal = "Hold"
@@ -50,9 +95,9 @@ class HybridStrategy:
             final_signal = "Buy"
         elif technical_signal == "Sell" and sentiment_signal == "Sell":
             final_signal = "Sell"
-        elif RSI > overbought_threshold and sentiment_score > 25 and ADX >= 20:
+        elif RSI > overbought_threshold and sentiment_score > p["sentiment_threshold"] and ADX >= p["adx_trend_threshold"]:
             final_signal = "Buy"  # continuation case
-        elif RSI < oversold_threshold and sentiment_score < -25 and ADX >= 20:
+        elif RSI < oversold_threshold and sentiment_score < -p["sentiment_threshold"] and ADX >= p["adx_trend_threshold"]:
             final_signal = "Sell"  # continuation case
         else:
             final_signal = "Hold"
@@ -66,7 +111,7 @@ class HybridStrategy:
             if abs_sentiment_score == 0:
                 total_score = 0
             else:
-                total_score = (0.6 * abs_technical_score + 0.4 * abs_sentiment_score) 
+                total_score = (p["technical_weight"] * abs_technical_score + p["sentiment_weight"] * abs_sentiment_score)
         else:
             total_score = 0  
 
@@ -74,15 +119,15 @@ class HybridStrategy:
         if total_score > 0:
             multiplier = 1.0
             if final_signal == "Buy":
-                if PE_ratio < 15:
-                    multiplier = 1.1
-                elif PE_ratio > 25:
-                    multiplier = 0.9
+                if PE_ratio < p["pe_low"]:
+                    multiplier = p["pe_favorable_multiplier"]
+                elif PE_ratio > p["pe_high"]:
+                    multiplier = p["pe_unfavorable_multiplier"]
             elif final_signal == "Sell":
-                if PE_ratio > 25:
-                    multiplier = 1.1
-                elif PE_ratio < 15:
-                    multiplier = 0.9
+                if PE_ratio > p["pe_high"]:
+                    multiplier = p["pe_favorable_multiplier"]
+                elif PE_ratio < p["pe_low"]:
+                    multiplier = p["pe_unfavorable_multiplier"]
 
             total_score *= multiplier
 
@@ -103,23 +148,120 @@ class HybridStrategy:
 
         # 7. Build Explanation
         if final_signal == "Hold":
-            explanation = "Indicators are not aligned, or momentum is weak: no action recommended."
+            explanation = EXPLANATIONS[EXPLANATION_HOLD]
         elif final_signal == "Buy":
-            if RSI > overbought_threshold and sentiment_score > 25:
-                explanation = "Despite overbought condition, strong bullish sentiment suggests a continuation of the uptrend."
+            if RSI > overbought_threshold and sentiment_score > p["sentiment_threshold"]:
+                explanation = EXPLANATIONS[EXPLANATION_BUY_CONTINUATION]
             elif RSI < oversold_threshold and sentiment_score > 0:
-                explanation = "Oversold condition and positive sentiment indicate a likely reversal upward: buying opportunity."
+                explanation = EXPLANATIONS[EXPLANATION_BUY_REVERSAL]
             else:
-                explanation = "Moderate bullish sentiment and RSI positioning suggest a possible upward move."
+                explanation = EXPLANATIONS[EXPLANATION_BUY_MODERATE]
         elif final_signal == "Sell":
-            if RSI < oversold_threshold and sentiment_score < -25:
-                explanation = "Despite oversold condition, strong bearish sentiment suggests a continuation of the downtrend."
+            if RSI < oversold_threshold and sentiment_score < -p["sentiment_threshold"]:
+                explanation = EXPLANATIONS[EXPLANATION_SELL_CONTINUATION]
             elif RSI > overbought_threshold and sentiment_score < 0:
-                explanation = "Overbought condition and negative sentiment indicate a likely reversal downward: selling opportunity."
+                explanation = EXPLANATIONS[EXPLANATION_SELL_REVERSAL]
             else:
-                explanation = "Moderate bearish sentiment and RSI positioning suggest a possible downward move."
+                explanation = EXPLANATIONS[EXPLANATION_SELL_MODERATE]
         else:
             explanation = "Input conditions are unclear or inconsistent: holding as precaution."
 
 
         return final_signal, confidence_level, total_score, explanation
+
+    def generate_signals(self, RSI, ADX, PE_ratio, sentiment_score, rsi_mode):
+        """
+        Vectorized version of generate_trading_signal.
+
+        Accepts NumPy arrays (or scalars, broadcast together) and evaluates the
+        whole batch with masked array logic, so that a full backtest or a screen
+        over many tickers is a single array operation. The result matches the
+        scalar function element by element.
+
+        Args:
+            RSI, ADX, PE_ratio, sentiment_score (array-like): Input features.
+            rsi_mode (str or array-like of str): RSI profile, per element or shared.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+                signal codes (int8, see SIGNAL_LABELS), confidence in percent
+                (int64, 100 for Hold), total score (float64) and explanation
+                codes (int8, index into EXPLANATIONS).
+        """
+        p = self.params
+        rsi = np.asarray(RSI, dtype=float)
+        adx = np.asarray(ADX, dtype=float)
+        pe = np.asarray(PE_ratio, dtype=float)
+        sentiment = np.asarray(sentiment_score, dtype=float)
+        modes = np.asarray(rsi_mode)
+        rsi, adx, pe, sentiment, modes = np.broadcast_arrays(rsi, adx, pe, sentiment, modes)
+
+        # 0. Input Validation (stessi controlli della versione scalare, NaN inclusi)
+        if not np.all((rsi >= 0) & (rsi <= 100)):
+            raise ValueError("RSI must be between 0 and 100")
+        if not np.all((adx >= 0) & (adx <= 100)):
+            raise ValueError("ADX must be between 0 and 100")
+        if not np.all((sentiment >= -100) & (sentiment <= 100)):
+            raise ValueError("Sentiment score must be between -100 and 100")
+        if not np.all(np.isin(modes, RSI_MODES)):
+            raise ValueError("Invalid rsi_mode")
+        if np.any(pe <= 0):
+            raise ValueError("P/E ratio must be positive")
+
+        # 1. Technical Signal
+        oversold = np.empty(rsi.shape)
+        overbought = np.empty(rsi.shape)
+        for mode, (low, high) in p["rsi_thresholds"].items():
+            mode_mask = modes == mode
+            oversold[mode_mask] = low
+            overbought[mode_mask] = high
+
+        is_oversold = rsi < oversold
+        is_overbought = rsi > overbought
+        technical_buy = is_oversold & (adx > p["adx_threshold"])
+        technical_sell = is_overbought & (adx > p["adx_threshold"])
+
+        # 2-3. Sentiment Signal e combinazione
+        strong_trend = adx >= p["adx_trend_threshold"]
+        strong_bullish = sentiment > p["sentiment_threshold"]
+        strong_bearish = sentiment < -p["sentiment_threshold"]
+        buy = (technical_buy & (sentiment > 0)) | (
+            ~(technical_sell & (sentiment < 0)) & is_overbought & strong_bullish & strong_trend
+        )
+        sell = ~buy & (
+            (technical_sell & (sentiment < 0)) | (is_oversold & strong_bearish & strong_trend)
+        )
+        signals = np.full(rsi.shape, SIGNAL_HOLD, dtype=np.int8)
+        signals[buy] = SIGNAL_BUY
+        signals[sell] = SIGNAL_SELL
+
+        # 4. Total Score
+        active = buy | sell
+        abs_sentiment = np.abs(sentiment)
+        total_score = np.where(
+            active & (abs_sentiment != 0),
+            p["technical_weight"] * (np.abs(rsi - 50) * 2) + p["sentiment_weight"] * abs_sentiment,
+            0.0,
+        )
+
+        # 5. P/E Multiplier
+        multiplier = np.ones(rsi.shape)
+        multiplier[buy & (pe < p["pe_low"])] = p["pe_favorable_multiplier"]
+        multiplier[buy & ~(pe < p["pe_low"]) & (pe > p["pe_high"])] = p["pe_unfavorable_multiplier"]
+        multiplier[sell & (pe > p["pe_high"])] = p["pe_favorable_multiplier"]
+        multiplier[sell & ~(pe > p["pe_high"]) & (pe < p["pe_low"])] = p["pe_unfavorable_multiplier"]
+        total_score = np.where(total_score > 0, total_score * multiplier, total_score)
+
+        # 6. Confidence
+        confidence = np.where(active, np.trunc(total_score), 100).astype(np.int64)
+
+        # 7. Explanation
+        explanations = np.full(rsi.shape, EXPLANATION_HOLD, dtype=np.int8)
+        explanations[buy] = EXPLANATION_BUY_MODERATE
+        explanations[buy & is_oversold & (sentiment > 0)] = EXPLANATION_BUY_REVERSAL
+        explanations[buy & is_overbought & strong_bullish] = EXPLANATION_BUY_CONTINUATION
+        explanations[sell] = EXPLANATION_SELL_MODERATE
+        explanations[sell & is_overbought & (sentiment < 0)] = EXPLANATION_SELL_REVERSAL
+        explanations[sell & is_oversold & strong_bearish] = EXPLANATION_SELL_CONTINUATION
+
+        return signals, confidence, total_score, explanations
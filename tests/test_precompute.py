@@ -0,0 +1,31 @@
+import yaml
+
+from benchmarks.loadtest import loadtest_settings
+from benchmarks.stub_providers import ProviderProfile, StandIns
+
+
+def test_failed_scores_are_not_stored(tmp_path, monkeypatch):
+    """A text whose OpenAI call failed keeps no stored score, so the next refresh scores it again."""
+    stand_ins = StandIns({'openai': ProviderProfile(latency=0, error_rate=1.0)}, seed=1).start()
+    try:
+        settings_path = tmp_path / "settings.yaml"
+        settings_path.write_text(yaml.safe_dump(loadtest_settings(stand_ins, str(tmp_path), 0)))
+        monkeypatch.setenv("HTA_SETTINGS", str(settings_path))
+        import benchmarks.loadtest_app  # noqa: F401  (yfinance -> stand-in)
+        from config.services import ServiceContainer
+        from pipeline.precompute import WatchlistPrecomputer
+
+        services = ServiceContainer(str(settings_path))
+        store = services.signal_store
+        precomputer = WatchlistPrecomputer(services, store, ["AAPL"])
+
+        precomputer.refresh_ticker("AAPL")
+        assert stand_ins.stats()['openai']['errors'] > 0
+        assert store.load_scores("AAPL") == {}
+
+        # L'API torna disponibile: i testi vengono valutati e salvati
+        stand_ins.servers['openai'].profile.error_rate = 0.0
+        precomputer.refresh_ticker("AAPL")
+        assert store.load_scores("AAPL")
+    finally:
+        stand_ins.stop()